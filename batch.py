@@ -0,0 +1,151 @@
+from __future__ import annotations
+import argparse
+from collections.abc import Iterable, Iterator
+import csv
+from itertools import islice
+import json
+import math
+import sys
+from typing import TextIO
+
+import numpy as np
+
+from calculations import OTTO_CYCLE_INPUTS, solve_otto_cycle_batch
+from export import REPORT_FORMATS, ReportWriter
+from profiling import count, enable_from_environment, span
+from properties import GASES, PropertyTable
+from units import UNIT_SYSTEMS, US, UnitSystem
+
+
+FORMATS = ("csv", "jsonl")
+
+# Formats recognized from file extensions, .json is read and written as JSON Lines unless --output-format json is given
+_INPUT_EXTENSIONS = (("csv", (".csv",)), ("jsonl", (".jsonl", ".ndjson", ".json")))
+_OUTPUT_EXTENSIONS = _INPUT_EXTENSIONS + (("html", (".html", ".htm")), ("text", (".txt",)))
+
+
+def read_rows(file: TextIO, input_format: str) -> Iterator[dict[str, object]]:
+    """
+    Read operating points one row at a time from a CSV file with a header or a JSON Lines file
+    """
+    if input_format == "csv":
+        yield from csv.DictReader(file)
+        return
+
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+def read_blocks(rows: Iterable[dict[str, object]], block_size: int, constants: dict[str, float], keep: list[str]) -> Iterator[tuple[dict[str, np.ndarray], list[list[object]]]]:
+    """
+    Group rows into blocks of input arrays, with the kept columns of each row alongside
+    """
+    rows = iter(rows)
+
+    while True:
+        block = list(islice(rows, block_size))
+        if not block:
+            return
+
+        inputs = {}
+        for name in OTTO_CYCLE_INPUTS:
+            if name in constants:
+                inputs[name] = np.full(len(block), constants[name])
+            else:
+                inputs[name] = np.fromiter((_to_float(row.get(name)) for row in block), dtype=np.float64, count=len(block))
+
+        yield (inputs, [[row.get(column) for column in keep] for row in block])
+
+def solve_blocks(blocks: Iterable[tuple[dict[str, np.ndarray], list[list[object]]]], properties: PropertyTable | None = None, units: UnitSystem = US) -> Iterator[tuple[dict[str, np.ndarray], list[list[object]]]]:
+    """
+    Solve each block, returning the inputs and outputs of every row
+    """
+    for inputs, kept in blocks:
+        with span("batch.solve_block"):
+            outputs = solve_otto_cycle_batch(**inputs, properties=properties, units=units)
+        count("batch.rows", len(kept))
+
+        yield (inputs | outputs, kept)
+
+def write_blocks(file: TextIO, blocks: Iterable[tuple[dict[str, np.ndarray], list[list[object]]]], output_format: str, keep: list[str], precision: int = 12, units: UnitSystem = US) -> int:
+    """
+    Write solved blocks in any of the report formats with `precision` significant digits, returning the number of rows written
+    """
+    with ReportWriter(file, output_format, units, keep=keep, precision=precision) as writer:
+        for values, kept in blocks:
+            with span("batch.write_block"):
+                writer.write_block(values, kept)
+
+    return writer.rows_written
+
+def _to_float(value: object) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _detect_format(path: str | None, default: str, known_extensions: tuple[tuple[str, tuple[str, ...]], ...] = _INPUT_EXTENSIONS) -> str:
+    if path is not None:
+        for format_name, extensions in known_extensions:
+            if path.lower().endswith(extensions):
+                return format_name
+
+    return default
+
+def _parse_constant(text: str) -> tuple[str, float]:
+    name, separator, value = text.partition("=")
+    if not separator or name not in OTTO_CYCLE_INPUTS:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE with NAME one of {', '.join(OTTO_CYCLE_INPUTS)}")
+
+    return (name, float(value))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Solve Otto cycles for operating points read from CSV or JSON Lines, streaming the stage-by-stage results as CSV, JSON Lines, JSON, HTML or text reports",
+        epilog=f"Input columns/keys: {', '.join(OTTO_CYCLE_INPUTS)} (psi, °F, in^3, Btu/lb-°R, lbf-ft/lbm-°R, or kPa, °C, cm^3, kJ/kg-K, J/kg-K with --units si). Rows that can't form a valid cycle are written with empty (CSV, HTML) or null (JSON) outputs"
+    )
+    parser.add_argument("input", nargs="?", help="Input file (default: stdin)")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("--input-format", choices=FORMATS, help="Input format (default: from the file extension, otherwise csv)")
+    parser.add_argument("--output-format", choices=REPORT_FORMATS, help="Output format (default: from the file extension, otherwise the input format)")
+    parser.add_argument("--set", dest="constants", action="append", type=_parse_constant, default=[], metavar="NAME=VALUE", help="Use a constant value for an input instead of reading it from each row, can be repeated")
+    parser.add_argument("--keep", action="append", default=[], metavar="COLUMN", help="Copy an input column (e.g. a timestamp) to the output, can be repeated")
+    parser.add_argument("--block-size", type=int, default=16384, help="Rows solved per vectorized block (default: 16384)")
+    parser.add_argument("--precision", type=int, default=12, help="Significant digits written for each value (default: 12)")
+    parser.add_argument("--variable-specific-heats", choices=tuple(GASES), metavar="GAS", help=f"Use temperature-dependent specific heats of {' or '.join(GASES)} instead of the constant C_p and C_v")
+    parser.add_argument("--units", choices=tuple(UNIT_SYSTEMS), default="us", help="Units of the inputs and outputs (default: us)")
+    args = parser.parse_args(argv)
+
+    if args.block_size < 1:
+        parser.error("--block-size must be at least 1")
+
+    input_format = args.input_format or _detect_format(args.input, "csv")
+    output_format = args.output_format or _detect_format(args.output, input_format, _OUTPUT_EXTENSIONS)
+    if args.keep and output_format == "text":
+        parser.error("--keep can't be used with text reports")
+
+    enable_from_environment()
+
+    properties = PropertyTable(args.variable_specific_heats) if args.variable_specific_heats else None
+
+    input_file = open(args.input, newline="") if args.input else sys.stdin
+    output_file = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+
+    try:
+        blocks = read_blocks(read_rows(input_file, input_format), args.block_size, dict(args.constants), args.keep)
+        units = UNIT_SYSTEMS[args.units]
+        rows_written = write_blocks(output_file, solve_blocks(blocks, properties, units), output_format, args.keep, args.precision, units)
+    finally:
+        if args.input:
+            input_file.close()
+        if args.output:
+            output_file.close()
+
+    print(f"Solved {rows_written} operating points", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+"""
+Benchmarks for the calculation, graphing and export hot paths
+
+Runs headless (no Qt import). Results can be saved as a JSON baseline and later runs compared against it:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --compare baseline.json --threshold 0.1
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+from collections.abc import Callable
+import fnmatch
+import io
+import json
+import platform
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+
+from calculations import *
+from compact_results import CompactResults
+from crank_angle import simulate_crank_angle
+from cycles import CYCLES, solve_cycle_batch
+from cycle import OttoCycleInputs, solve
+from export import REPORT_FORMATS, ReportWriter, write_results_report
+from graph import CycleOverlay, get_adiabatic_data, get_cycle_overlay_data
+from monte_carlo import Normal, Triangular, Uniform, run_monte_carlo
+from optimize import optimize_cycle
+from performance_map import EngineDefinition, PerformanceMapGenerator
+from properties import PropertyTable
+from scenarios import ScenarioLibrary
+from server import CycleServer
+
+
+BASELINE_VERSION = 1
+
+DEFAULT_INPUTS = OttoCycleInputs(8, .24, .17, 53.3, 258, 14.7, 70, convert_rankine_to_farhenheit(4130))
+
+# Benchmarks as name -> (setup, batch sizes), where setup(size) returns the function to time for one batch
+BENCHMARKS: dict[str, tuple[Callable[[int], Callable[[], object]], tuple[int, ...]]] = {}
+
+def benchmark(name: str, sizes: tuple[int, ...]) -> Callable[[Callable[[int], Callable[[], object]]], Callable[[int], Callable[[], object]]]:
+    def register(setup: Callable[[int], Callable[[], object]]) -> Callable[[int], Callable[[], object]]:
+        BENCHMARKS[name] = (setup, sizes)
+
+        return setup
+
+    return register
+
+
+def _random_inputs(size: int) -> list[OttoCycleInputs]:
+    generator = np.random.default_rng(0)
+
+    return [
+        OttoCycleInputs(
+            float(generator.uniform(6, 12)),
+            .24,
+            .17,
+            53.3,
+            float(generator.uniform(100, 400)),
+            14.7,
+            float(generator.uniform(40, 100)),
+            float(generator.uniform(3000, 4000))
+        ) for _ in range(size)
+    ]
+
+def _scalar_benchmark(function: Callable[..., float], *args: float) -> Callable[[int], Callable[[], object]]:
+    def setup(size: int) -> Callable[[], object]:
+        def run() -> None:
+            for _ in range(size):
+                function(*args)
+
+        return run
+
+    return setup
+
+
+# Scalar calculation functions, `size` calls per batch
+for _function, _args in (
+    (calculate_adiabatic_index, (.24, .17)),
+    (calculate_initial_volume, (8, .1493)),
+    (calculate_air_mass, (2116.8, 529.67, .1706, 53.3)),
+    (calculate_final_pressure_adiabatic, (8, 1.4118, 2116.8)),
+    (calculate_final_temperature_adiabatic, (8, 1.4118, 529.67)),
+    (calculate_work_adiabatic, (1.4118, 2116.8, .1706, 39868.5, .0213)),
+    (calculate_final_pressure_constant_volume, (39868.5, 4130, 1246.99)),
+    (calculate_heat, (.17, .0128, 4130, 1246.99))
+):
+    benchmark(f"scalar.{_function.__name__}", (1000, 10000, 100000))(_scalar_benchmark(_function, *_args))
+
+
+@benchmark("solve.scalar", (100, 1000, 10000))
+def _solve_scalar(size: int) -> Callable[[], object]:
+    inputs = _random_inputs(size)
+
+    return lambda: [solve(cycle_inputs) for cycle_inputs in inputs]
+
+@benchmark("solve.batch", (1000, 100000, 1000000))
+def _solve_batch(size: int) -> Callable[[], object]:
+    generator = np.random.default_rng(0)
+    compression_ratio = generator.uniform(6, 12, size)
+    engine_displacement = generator.uniform(100, 400, size)
+    initial_temperature = generator.uniform(40, 100, size)
+    operating_temperature = generator.uniform(3000, 4000, size)
+
+    return lambda: solve_otto_cycle_batch(compression_ratio, .24, .17, 53.3, engine_displacement, 14.7, initial_temperature, operating_temperature)
+
+@benchmark("solve.batch.variable_properties", (1000, 100000, 1000000))
+def _solve_batch_variable_properties(size: int) -> Callable[[], object]:
+    generator = np.random.default_rng(0)
+    compression_ratio = generator.uniform(6, 12, size)
+    engine_displacement = generator.uniform(100, 400, size)
+    initial_temperature = generator.uniform(40, 100, size)
+    operating_temperature = generator.uniform(3000, 4000, size)
+    properties = PropertyTable()
+
+    return lambda: solve_otto_cycle_batch(compression_ratio, .24, .17, 53.3, engine_displacement, 14.7, initial_temperature, operating_temperature, properties=properties)
+
+@benchmark("solve.batch.jacobian", (1000, 100000, 1000000))
+def _solve_batch_jacobian(size: int) -> Callable[[], object]:
+    generator = np.random.default_rng(0)
+    compression_ratio = generator.uniform(6, 12, size)
+    engine_displacement = generator.uniform(100, 400, size)
+    initial_temperature = generator.uniform(40, 100, size)
+    operating_temperature = generator.uniform(3000, 4000, size)
+
+    return lambda: solve_otto_cycle_batch(compression_ratio, .24, .17, 53.3, engine_displacement, 14.7, initial_temperature, operating_temperature, jacobian=True)
+
+# Extra inputs of the non-Otto cycles, midway through their usual range
+_CYCLE_EXTRA_INPUTS = {"pressure_ratio": 1.5, "expansion_ratio": 14}
+
+for _cycle in CYCLES:
+    @benchmark(f"cycles.solve_batch[{_cycle}]", (1000, 100000, 1000000))
+    def _cycle_solve_batch(size: int, cycle: str = _cycle) -> Callable[[], object]:
+        generator = np.random.default_rng(0)
+        inputs = dict(zip(OTTO_CYCLE_INPUTS, (generator.uniform(6, 12, size), .24, .17, 53.3, generator.uniform(100, 400, size), 14.7, generator.uniform(40, 100, size), generator.uniform(3000, 4000, size))))
+        inputs |= {name: _CYCLE_EXTRA_INPUTS[name] for name in CYCLES[cycle].extra_inputs}
+
+        return lambda: solve_cycle_batch(cycle, **inputs)
+
+@benchmark("crank_angle.simulate", (10, 100, 1000))
+def _crank_angle(size: int) -> Callable[[], object]:
+    compression_ratio = np.random.default_rng(0).uniform(6, 12, size)
+
+    return lambda: simulate_crank_angle(compression_ratio, .24, .17, 53.3, 258, 14.7, 70, 3670.33, heat_loss=True)
+
+@benchmark("performance_map.generate", (10, 100))
+def _performance_map(size: int) -> Callable[[], object]:
+    engine = EngineDefinition(258)
+    engine_speeds = np.linspace(800, 7000, 200)
+    intake_pressures = np.linspace(3, 14.7, 200)
+
+    # A fresh generator each time so the cycle solutions aren't cached
+    return lambda: [PerformanceMapGenerator().generate(engine, engine_speeds, intake_pressures) for _ in range(size)]
+
+@benchmark("optimize.compression_ratio", (100, 1000, 10000))
+def _optimize(size: int) -> Callable[[], object]:
+    operating_temperature = np.random.default_rng(0).uniform(3000, 4000, size)
+
+    return lambda: optimize_cycle("thermal_efficiency", {"compression_ratio": (4, 20)}, {"stage_2_final_pressure": (None, 1000)}, specific_heat_pressure=.24, specific_heat_volume=.17, gas_constant=53.3, engine_displacement=258, initial_pressure=14.7, initial_temperature=70, operating_temperature=operating_temperature)
+
+@benchmark("monte_carlo.run", (10000, 100000, 1000000))
+def _monte_carlo(size: int) -> Callable[[], object]:
+    return lambda: run_monte_carlo(Uniform(7, 9), Normal(.24, .005), Normal(.17, .003), 53.3, 258, Normal(14.7, .3), Triangular(60, 70, 85), Normal(3670.33, 50), samples=size)
+
+for _points in (100, 1000, 10000):
+    @benchmark(f"graph.get_adiabatic_data[{_points}]", (10, 100, 1000))
+    def _graph(size: int, points: int = _points) -> Callable[[], object]:
+        result = solve(DEFAULT_INPUTS)
+        initial_pressure = convert_psi_to_psf(DEFAULT_INPUTS.initial_pressure)
+        initial_volume = convert_cubic_inches_to_cubic_feet(result.initial_volume)
+        final_volume = convert_cubic_inches_to_cubic_feet(result.stage_1_final_volume)
+
+        return lambda: [get_adiabatic_data(result.adiabatic_index, initial_pressure, initial_volume, final_volume, points) for _ in range(size)]
+
+@benchmark("graph.cycle_overlay", (100, 1000, 10000))
+def _graph_cycle_overlay(size: int) -> Callable[[], object]:
+    inputs = dict(zip(OTTO_CYCLE_INPUTS, (8, .24, .17, 53.3, 258, 14.7, 70, np.linspace(2750, 4600, size))))
+    outputs = solve_otto_cycle_batch(**inputs)
+
+    # Build the packed buffer and clip it to the lower-left quarter of the P-V diagram
+    def run() -> None:
+        overlay = CycleOverlay(*get_cycle_overlay_data(inputs, outputs))
+        x_min, x_max, y_min, y_max = overlay.bounds
+        overlay.display_data((x_min, (x_min + x_max) / 2, y_min, (y_min + y_max) / 2))
+
+    return run
+
+@benchmark("export.text", (10, 100, 1000))
+def _export_text(size: int) -> Callable[[], object]:
+    results = [solve(cycle_inputs) for cycle_inputs in _random_inputs(size)]
+
+    def run() -> None:
+        file = io.StringIO()
+        for result in results:
+            write_results_report(file, result, "benchmark")
+
+    return run
+
+for _output_format in REPORT_FORMATS:
+    @benchmark(f"export.block[{_output_format}]", (1000, 10000, 100000))
+    def _export_block(size: int, output_format: str = _output_format) -> Callable[[], object]:
+        generator = np.random.default_rng(0)
+        inputs = dict(zip(OTTO_CYCLE_INPUTS, (generator.uniform(6, 12, size), .24, .17, 53.3, generator.uniform(100, 400, size), 14.7, generator.uniform(40, 100, size), generator.uniform(3000, 4000, size))))
+        values = inputs | solve_otto_cycle_batch(**inputs)
+
+        def run() -> None:
+            with ReportWriter(io.StringIO(), output_format) as writer:
+                writer.write_block(values)
+
+        return run
+
+def _compact_batch(size: int) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    generator = np.random.default_rng(0)
+    inputs = dict(zip(OTTO_CYCLE_INPUTS, (generator.uniform(6, 12, size), .24, .17, 53.3, 258, 14.7, generator.uniform(40, 100, size), generator.uniform(3000, 4000, size))))
+
+    return (inputs, solve_otto_cycle_batch(**inputs))
+
+for _dtype in ("float32", "float64"):
+    @benchmark(f"compact.from_batch[{_dtype}]", (1000, 100000))
+    def _compact_from_batch(size: int, dtype: str = _dtype) -> Callable[[], object]:
+        inputs, outputs = _compact_batch(size)
+
+        return lambda: CompactResults.from_batch(inputs, outputs, dtype, drop_derived=True)
+
+@benchmark("compact.columns", (1000, 100000))
+def _compact_columns(size: int) -> Callable[[], object]:
+    results = CompactResults.from_batch(*_compact_batch(size), drop_derived=True)
+
+    # Every column, with the dropped outputs recomputed
+    return results.columns
+
+def _scenario_batch(size: int) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    generator = np.random.default_rng(0)
+    inputs = dict(zip(OTTO_CYCLE_INPUTS, (generator.uniform(6, 12, size), .24, .17, 53.3, generator.uniform(100, 400, size), 14.7, generator.uniform(40, 100, size), generator.uniform(3000, 4000, size))))
+
+    return (inputs, solve_otto_cycle_batch(**inputs))
+
+@benchmark("scenarios.save_batch", (1000, 100000))
+def _scenarios_save_batch(size: int) -> Callable[[], object]:
+    inputs, outputs = _scenario_batch(size)
+
+    def run() -> None:
+        with ScenarioLibrary() as scenarios:
+            scenarios.save_batch("benchmark", inputs, outputs)
+
+    return run
+
+@benchmark("scenarios.query", (10000, 100000))
+def _scenarios_query(size: int) -> Callable[[], object]:
+    # A range query over a library of `size` scenarios, counting the matches and loading the newest 100
+    scenarios = ScenarioLibrary()
+    scenarios.save_batch("benchmark", *_scenario_batch(size))
+
+    def run() -> None:
+        scenarios.count(compression_ratio=(9, 9.5), thermal_efficiency=(.55, None))
+        scenarios.query(compression_ratio=(9, 9.5), thermal_efficiency=(.55, None), limit=100)
+
+    return run
+
+@benchmark("server.solve", (1000, 10000))
+def _server_solve(size: int) -> Callable[[], object]:
+    # The server runs on its own event loop thread for the rest of the process, `size` single solves are sent over 32 keep-alive connections
+    loop = asyncio.new_event_loop()
+    server = CycleServer(port=0)
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+
+    body = json.dumps({name: getattr(DEFAULT_INPUTS, name) for name in OTTO_CYCLE_INPUTS}).encode()
+    request = f"POST /solve HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+
+    async def client(requests: int) -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        for _ in range(requests):
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            await reader.readexactly(int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0]))
+        writer.close()
+
+    async def load() -> None:
+        await asyncio.gather(*(client(requests) for requests in np.diff(np.linspace(0, size, 33).astype(int))))
+
+    return lambda: asyncio.run(load())
+
+
+def run_benchmarks(pattern: str = "*", repeat: int = 5, quick: bool = False) -> dict[str, dict[str, float]]:
+    """
+    Run the benchmarks matching `pattern`, returning the best time per item in seconds for each batch size
+    """
+    results = {}
+
+    for name, (setup, sizes) in BENCHMARKS.items():
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+
+        results[name] = {}
+        for size in (sizes[:1] if quick else sizes):
+            run = setup(size)
+            run() # Warm up
+
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+
+            results[name][str(size)] = min(timings) / size
+
+            print(f"{name:<50} {size:>9}  {format_time(min(timings) / size):>10}/item  (median {format_time(statistics.median(timings) / size)})", file=sys.stderr)
+
+    return results
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], threshold: float) -> list[str]:
+    """
+    Compare results against a baseline, returning a line for every benchmark that is more than `threshold` (relative) slower
+    """
+    regressions = []
+
+    for name, sizes in results.items():
+        for size, seconds in sizes.items():
+            baseline_seconds = baseline.get(name, {}).get(size)
+            if baseline_seconds is None or baseline_seconds <= 0:
+                continue
+
+            change = (seconds / baseline_seconds) - 1
+            if change > threshold:
+                regressions.append(f"{name} [{size}]: {format_time(baseline_seconds)} -> {format_time(seconds)} per item ({change:+.1%})")
+
+    return regressions
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Otto Cycle Calculator hot paths")
+    parser.add_argument("--filter", default="*", help="Only run benchmarks whose name matches this glob pattern")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per batch size, the best is kept")
+    parser.add_argument("--quick", action="store_true", help="Only run the smallest batch size of each benchmark")
+    parser.add_argument("--output", help="Save the results as a JSON baseline")
+    parser.add_argument("--compare", help="Compare the results against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=.1, help="Relative slowdown reported as a regression (default 0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.filter, args.repeat, args.quick)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "version": BASELINE_VERSION,
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "results": results
+            }, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+        if baseline.get("version") != BASELINE_VERSION:
+            print(f"Unsupported baseline version {baseline.get('version')}", file=sys.stderr)
+            return 2
+
+        regressions = compare(results, baseline["results"], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+        if regressions:
+            return 1
+
+        print(f"No regressions above {args.threshold:.0%}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+from __future__ import annotations
+from collections import OrderedDict
+import dbm
+import math
+import struct
+import sys
+import threading
+from typing import TYPE_CHECKING
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS, solve_otto_cycle_batch
+from cycles import CYCLES
+from cycle import OttoCycleInputs, OttoCycleResult, solve
+from units import US, UnitSystem
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from properties import PropertyTable
+
+
+# Keys are the quantized inputs as little-endian int64s and values are the outputs as little-endian float64s, the same layout as a NumPy row
+_KEY_FORMAT = struct.Struct(f"<{len(OTTO_CYCLE_INPUTS)}q")
+_VALUE_FORMAT = struct.Struct(f"<{len(OTTO_CYCLE_OUTPUTS)}d")
+
+_TOLERANCE_KEY = b"__tolerance__"
+_PROPERTIES_KEY = b"__properties__"
+_UNITS_KEY = b"__units__"
+_CYCLE_KEY = b"__cycle__"
+
+
+class CycleCache:
+    """
+    LRU cache of solved Otto cycles keyed on the eight inputs quantized to `tolerance` (absolute, in the cache's units)
+
+    If `disk_path` is given, entries are also written through to a dbm file that is checked before solving, so results persist between runs. Cycles are solved with the `properties` table if given and in the `units` system, a cache only ever holds results for one property model and unit system
+
+    With a `cycle` name from `CYCLES`, the cache holds that cycle's batch results instead, keyed on its inputs (constant specific heats only)
+
+    A cache can be shared between threads. Lookups and stores hold a lock, solving the missing cycles doesn't
+    """
+    def __init__(self, max_entries: int = 100000, tolerance: float = 1e-9, disk_path: str | None = None, properties: PropertyTable | None = None, units: UnitSystem = US, cycle: str | None = None) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if tolerance <= 0:
+            raise ValueError("tolerance must be greater than 0")
+        if cycle is not None and cycle not in CYCLES:
+            raise ValueError(f"Unknown cycle {cycle}, expected one of {', '.join(CYCLES)}")
+        if cycle is not None and properties is not None:
+            raise ValueError("Only the Otto solver supports temperature-dependent specific heats")
+
+        self.max_entries = max_entries
+        self.tolerance = tolerance
+        self.properties = properties
+        self.units = units
+        self.cycle = cycle
+        self.inputs = CYCLES[cycle].inputs if cycle is not None else OTTO_CYCLE_INPUTS
+        self.outputs = CYCLES[cycle].outputs if cycle is not None else OTTO_CYCLE_OUTPUTS
+
+        self._key_size = 8 * len(self.inputs)
+
+        # Approximate bytes held per entry: the key and value bytes objects plus the ordered dict's slot and link node
+        self._entry_size = sys.getsizeof(bytes(self._key_size)) + sys.getsizeof(bytes(8 * len(self.outputs))) + 104
+
+        self._entries: OrderedDict[bytes, bytes] = OrderedDict()
+
+        # Guards the entries, the counters and the dbm file, reads reorder the entries so they need it too
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+        self._disk = None
+        if disk_path is not None:
+            self._disk = dbm.open(disk_path, "c")
+
+            # Files from before variable specific heats have no properties key and hold constant-property results
+            properties_description = repr(properties).encode() if properties is not None else b"constant"
+
+            # Files from before unit systems have no units key and hold calculator (US) units
+            units_description = units.name.encode()
+
+            # Files from before other cycles have no cycle key and hold Otto solver results
+            cycle_description = cycle.encode() if cycle is not None else b""
+
+            stored_tolerance = self._disk.get(_TOLERANCE_KEY)
+            if stored_tolerance is None:
+                self._disk[_TOLERANCE_KEY] = repr(tolerance).encode()
+                self._disk[_PROPERTIES_KEY] = properties_description
+                self._disk[_UNITS_KEY] = units_description
+                self._disk[_CYCLE_KEY] = cycle_description
+            elif float(stored_tolerance) != tolerance:
+                self._disk.close()
+                raise ValueError(f"Cache file {disk_path} was created with a tolerance of {float(stored_tolerance)}, not {tolerance}")
+            elif self._disk.get(_PROPERTIES_KEY, b"constant") != properties_description:
+                self._disk.close()
+                raise ValueError(f"Cache file {disk_path} holds results for different specific heats")
+            elif self._disk.get(_UNITS_KEY, US.name.encode()) != units_description:
+                stored_units = self._disk.get(_UNITS_KEY, US.name.encode()).decode()
+                self._disk.close()
+                raise ValueError(f"Cache file {disk_path} holds results in {stored_units} units, not {units.name}")
+            elif self._disk.get(_CYCLE_KEY, b"") != cycle_description:
+                self._disk.close()
+                raise ValueError(f"Cache file {disk_path} holds results for a different cycle")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._entries) * self._entry_size
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+
+        return (self.hits / lookups) if lookups else 0.0
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "hit_rate": self.hit_rate,
+                "memory_bytes": self.memory_bytes
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
+    def solve(self, inputs: OttoCycleInputs) -> OttoCycleResult:
+        """
+        Solve a single cycle, reusing a cached result if one exists for the quantized inputs
+        """
+        if self.cycle is not None:
+            raise ValueError(f"Single solves are only available for the Otto cycle, use solve_batch for the {CYCLES[self.cycle].name} cycle")
+
+        values = tuple(getattr(inputs, name) for name in OTTO_CYCLE_INPUTS)
+        if not all(math.isfinite(value) for value in values):
+            return solve(inputs, self.properties, self.units)
+
+        key = _KEY_FORMAT.pack(*(round(value / self.tolerance) for value in values))
+
+        with self._lock:
+            value = self._get(key)
+        if value is not None:
+            return OttoCycleResult(inputs, *_VALUE_FORMAT.unpack(value), self.units)
+
+        result = solve(inputs, self.properties, self.units)
+        with self._lock:
+            self._put(key, _VALUE_FORMAT.pack(*(getattr(result, name) for name in OTTO_CYCLE_OUTPUTS)))
+
+        return result
+
+    def solve_batch(self, compression_ratio, specific_heat_pressure, specific_heat_volume, gas_constant, engine_displacement, initial_pressure, initial_temperature, operating_temperature, **cycle_inputs) -> dict[str, np.ndarray]:
+        """
+        Cached version of `solve_otto_cycle_batch` (or the cache's cycle, with its extra inputs as keywords), only the rows that aren't cached are solved
+        """
+        inputs = dict(zip(OTTO_CYCLE_INPUTS, (
+            compression_ratio,
+            specific_heat_pressure,
+            specific_heat_volume,
+            gas_constant,
+            engine_displacement,
+            initial_pressure,
+            initial_temperature,
+            operating_temperature
+        ))) | cycle_inputs
+
+        keys, values, missing = self.lookup_batch(inputs)
+        if missing.any():
+            missing_inputs = {name: value[missing] for name, value in self._flatten(inputs).items()}
+            if self.cycle is not None:
+                missing_outputs = CYCLES[self.cycle].solve_batch(self.units, **missing_inputs)
+            else:
+                missing_outputs = solve_otto_cycle_batch(**missing_inputs, properties=self.properties, units=self.units)
+            self.store_batch(keys, values, missing, missing_outputs)
+
+        return self._unpack(values, inputs)
+
+    def lookup_batch(self, inputs: dict[str, np.ndarray]) -> tuple[list[bytes | None], np.ndarray, np.ndarray]:
+        """
+        Look up a batch of inputs, returning the row keys, an (n, outputs) array with the cached rows filled in and a mask of the rows still to be solved
+        """
+        import numpy as np
+
+        columns = self._flatten(inputs)
+        stacked = np.stack([columns[name] for name in self.inputs], axis=1)
+        values = np.full((len(stacked), len(self.outputs)), np.nan)
+        missing = np.ones(len(stacked), dtype=bool)
+
+        # Rows with non-finite inputs can't be quantized, they are always solved and never stored
+        finite = np.isfinite(stacked).all(axis=1)
+        quantized = np.zeros(stacked.shape, dtype="<i8")
+        np.rint(stacked / self.tolerance, out=stacked)
+        quantized[finite] = stacked[finite]
+        keys: list[bytes | None] = quantized.view(np.dtype((np.void, self._key_size))).ravel().tolist()
+
+        with self._lock:
+            for index, key in enumerate(keys):
+                if not finite[index]:
+                    keys[index] = None
+                    continue
+
+                value = self._get(key)
+                if value is not None:
+                    values[index] = np.frombuffer(value, dtype="<f8")
+                    missing[index] = False
+
+        return (keys, values, missing)
+
+    def store_batch(self, keys: list[bytes | None], values: np.ndarray, missing: np.ndarray, missing_outputs: dict[str, np.ndarray]) -> None:
+        """
+        Fill the missing rows of a `lookup_batch` result with newly solved outputs and cache them
+        """
+        import numpy as np
+
+        solved = np.stack([np.ravel(missing_outputs[name]) for name in self.outputs], axis=1).astype("<f8", copy=False)
+        values[missing] = solved
+
+        with self._lock:
+            for index, row in zip(np.flatnonzero(missing).tolist(), solved):
+                key = keys[index]
+                if key is not None:
+                    self._put(key, row.tobytes())
+
+    # _get and _put are called with the lock held
+    def _get(self, key: bytes) -> bytes | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        if self._disk is not None:
+            value = self._disk.get(key)
+            if value is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._put(key, value, write_through=False)
+                return value
+
+        self.misses += 1
+        return None
+
+    def _put(self, key: bytes, value: bytes, write_through: bool = True) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        if write_through and self._disk is not None:
+            self._disk[key] = value
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _flatten(self, inputs: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        import numpy as np
+
+        arrays = np.broadcast_arrays(*(np.asarray(inputs[name], dtype=np.float64) for name in self.inputs))
+
+        return {name: np.ravel(array) for name, array in zip(self.inputs, arrays)}
+
+    def _unpack(self, values: np.ndarray, inputs: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        import numpy as np
+
+        shape = np.broadcast_shapes(*(np.shape(inputs[name]) for name in self.inputs))
+
+        return {name: np.ascontiguousarray(values[:, index]).reshape(shape) for index, name in enumerate(self.outputs)}
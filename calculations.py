@@ -1,3 +1,16 @@
+from __future__ import annotations
+from functools import partial
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    import numpy as np
+
+    from properties import PropertyTable
+    from units import UnitSystem
+
+
 def convert_rankine_to_farhenheit(temperature: float) -> float:
     return temperature - 459.67
 
@@ -47,12 +60,21 @@ def calculate_final_temperature_adiabatic(compression_ratio: float, adiabatic_in
         return ((initial_temperature * (compression_ratio ** (adiabatic_index - 1))))
     return ((initial_temperature * ((1 / compression_ratio) ** (adiabatic_index - 1))))
 
+def calculate_temperature_adiabatic(adiabatic_index: float, initial_temperature: float, initial_volume: float, final_volume: float) -> float:
+    return (initial_temperature * ((initial_volume / final_volume) ** (adiabatic_index - 1)))
+
 def calculate_final_volume(compression_ratio: float, initial_volume: float) -> float:
     return (initial_volume / compression_ratio)
 
+def calculate_final_volume_constant_pressure(initial_volume: float, final_temperature: float, initial_temperature: float) -> float:
+    return (initial_volume * (final_temperature / initial_temperature))
+
 def calculate_work_adiabatic(adiabatic_index: float, initial_pressure: float, initial_volume: float, final_pressure: float, final_volume: float) -> float:
     return (((final_pressure * final_volume) - (initial_pressure * initial_volume)) / (1 - adiabatic_index))
 
+def calculate_work_constant_pressure(pressure: float, initial_volume: float, final_volume: float) -> float:
+    return (pressure * (final_volume - initial_volume))
+
 def calculate_final_pressure_constant_volume(initial_pressure: float, final_temperature: float, initial_temperature: float) -> float:
     return (initial_pressure * (final_temperature / initial_temperature))
 
@@ -63,4 +85,185 @@ def calculate_total_work(*works: float) -> float:
     return sum(works)
 
 def calculate_thermal_efficiency(total_work: float, heat_added: float) -> float:
-    return (total_work / heat_added)
\ No newline at end of file
+    return (total_work / heat_added)
+
+
+OTTO_CYCLE_INPUTS = (
+    "compression_ratio",
+    "specific_heat_pressure",
+    "specific_heat_volume",
+    "gas_constant",
+    "engine_displacement",
+    "initial_pressure",
+    "initial_temperature",
+    "operating_temperature"
+)
+
+OTTO_CYCLE_OUTPUTS = (
+    "adiabatic_index",
+    "initial_volume",
+    "air_mass",
+    "stage_1_final_pressure",
+    "stage_1_final_temperature",
+    "stage_1_final_volume",
+    "stage_1_work",
+    "stage_2_final_pressure",
+    "stage_2_heat",
+    "stage_3_final_pressure",
+    "stage_3_final_temperature",
+    "stage_3_work",
+    "stage_4_heat",
+    "total_work",
+    "thermal_efficiency"
+)
+
+def _work_adiabatic_btu(adiabatic_index: float, initial_pressure: float, initial_volume: float, final_pressure: float, final_volume: float) -> float:
+    return convert_ft_lbf_to_btu(calculate_work_adiabatic(adiabatic_index, initial_pressure, initial_volume, final_pressure, final_volume))
+
+# The Otto cycle as (output, function, dependencies) steps in evaluation order, each function is called with the values named by its dependencies. Steps work in the internal units (psf, °R, ft^3, lbm, Btu) and run on floats, arrays or dual numbers alike
+OTTO_CYCLE_STEPS: tuple[tuple[str, Callable[..., float], tuple[str, ...]], ...] = (
+    ("adiabatic_index", calculate_adiabatic_index, ("specific_heat_pressure", "specific_heat_volume")),
+    ("initial_volume", calculate_initial_volume, ("compression_ratio", "engine_displacement")),
+    ("air_mass", calculate_air_mass, ("initial_pressure", "initial_temperature", "initial_volume", "gas_constant")),
+
+    # Stage 1 -> 2 (Adiabatic Compression)
+    ("stage_1_final_pressure", calculate_final_pressure_adiabatic, ("compression_ratio", "adiabatic_index", "initial_pressure")),
+    ("stage_1_final_temperature", calculate_final_temperature_adiabatic, ("compression_ratio", "adiabatic_index", "initial_temperature")),
+    ("stage_1_final_volume", calculate_final_volume, ("compression_ratio", "initial_volume")),
+    ("stage_1_work", _work_adiabatic_btu, ("adiabatic_index", "initial_pressure", "initial_volume", "stage_1_final_pressure", "stage_1_final_volume")),
+
+    # Stage 2 -> 3 (Combustion)
+    ("stage_2_final_pressure", calculate_final_pressure_constant_volume, ("stage_1_final_pressure", "operating_temperature", "stage_1_final_temperature")),
+    ("stage_2_heat", calculate_heat, ("specific_heat_volume", "air_mass", "operating_temperature", "stage_1_final_temperature")),
+
+    # Stage 3 -> 4 (Adiabatic Expansion)
+    ("stage_3_final_pressure", partial(calculate_final_pressure_adiabatic, compression=False), ("compression_ratio", "adiabatic_index", "stage_2_final_pressure")),
+    ("stage_3_final_temperature", partial(calculate_final_temperature_adiabatic, compression=False), ("compression_ratio", "adiabatic_index", "operating_temperature")),
+    ("stage_3_work", _work_adiabatic_btu, ("adiabatic_index", "stage_2_final_pressure", "stage_1_final_volume", "stage_3_final_pressure", "initial_volume")),
+
+    # Stage 4 -> 1 (Heat Rejection)
+    ("stage_4_heat", calculate_heat, ("specific_heat_volume", "air_mass", "initial_temperature", "stage_3_final_temperature")),
+
+    ("total_work", calculate_total_work, ("stage_1_work", "stage_3_work")),
+    ("thermal_efficiency", calculate_thermal_efficiency, ("total_work", "stage_2_heat"))
+)
+
+def solve_otto_cycle_batch(compression_ratio, specific_heat_pressure, specific_heat_volume, gas_constant, engine_displacement, initial_pressure, initial_temperature, operating_temperature, properties: PropertyTable | None = None, jacobian: bool = False, units: UnitSystem | None = None) -> dict[str, np.ndarray] | tuple[dict[str, np.ndarray], dict[str, dict[str, np.ndarray]]]:
+    """
+    Solve the full Otto cycle for arrays (or broadcastable scalars) of inputs in one vectorized pass
+    
+    Inputs and outputs use the calculator's units (psi, °F, in^3, Btu) unless another `units` system is given. Rows with invalid inputs (CR <= 1, C_v = 0, k = 1, ...) are returned as NaN instead of raising. If a `properties` table is given, the specific heats vary with temperature instead of using the constant C_p and C_v
+    
+    With `jacobian`, returns `(outputs, jacobian)` where `jacobian[output][input]` is the exact derivative of each output with respect to each input, computed in the same pass by forward-mode differentiation
+    """
+    if properties is not None:
+        if jacobian:
+            raise ValueError("Derivatives are only available with constant specific heats")
+        return properties.solve_otto_cycle_batch(compression_ratio, specific_heat_pressure, specific_heat_volume, gas_constant, engine_displacement, initial_pressure, initial_temperature, operating_temperature, units=units)
+    
+    # Imported here so the scalar functions can be used without loading NumPy
+    import numpy as np
+    
+    from units import US
+    
+    units = units if units is not None else US
+    
+    inputs = dict(zip(OTTO_CYCLE_INPUTS, np.broadcast_arrays(*(np.asarray(value, dtype=np.float64) for value in (
+        compression_ratio,
+        specific_heat_pressure,
+        specific_heat_volume,
+        gas_constant,
+        engine_displacement,
+        initial_pressure,
+        initial_temperature,
+        operating_temperature
+    )))))
+    
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if not jacobian:
+            outputs = _solve_otto_cycle(units, **inputs)
+        else:
+            outputs, derivatives = _solve_otto_cycle_jacobian(units, inputs)
+    
+    # Mask rows that can't form a valid cycle
+    invalid = ~(
+        (inputs["compression_ratio"] > 1)
+        & (inputs["specific_heat_volume"] != 0)
+        & (outputs["adiabatic_index"] != 1)
+        & (inputs["gas_constant"] != 0)
+        & (units.to_internal("initial_temperature", inputs["initial_temperature"]) != 0)
+        & np.isfinite(outputs["thermal_efficiency"])
+    )
+    outputs = mask_invalid(outputs, invalid)
+    if jacobian and invalid.any():
+        derivatives = {name: {input_name: np.where(invalid, np.nan, value) for input_name, value in row.items()} for name, row in derivatives.items()}
+    
+    if jacobian:
+        return (outputs, derivatives)
+    
+    return outputs
+
+def mask_invalid(values: dict[str, np.ndarray], invalid: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Set the rows where `invalid` is true to NaN in place, returning the values as arrays (0-d for scalar inputs, whose results are NumPy scalars otherwise)
+    """
+    import numpy as np
+    
+    values = {name: (value if isinstance(value, np.ndarray) else np.array(value, dtype=np.float64)) for name, value in values.items()}
+    if np.any(invalid):
+        for value in values.values():
+            np.copyto(value, np.nan, where=invalid)
+    
+    return values
+
+def _solve_otto_cycle_jacobian(units: UnitSystem, inputs: dict[str, np.ndarray], chunk_size: int = 4096) -> tuple[dict[str, np.ndarray], dict[str, dict[str, np.ndarray]]]:
+    """
+    Run the cycle on dual numbers, in chunks small enough that the derivative temporaries stay in cache, writing into preallocated outputs
+    """
+    import numpy as np
+    from dual import Dual
+    
+    shape = np.shape(inputs["compression_ratio"])
+    inputs = {name: np.ravel(value) for name, value in inputs.items()}
+    size = inputs["compression_ratio"].size
+    
+    outputs = {name: np.empty(size) for name in OTTO_CYCLE_OUTPUTS}
+    derivatives = {name: {input_name: np.empty(size) for input_name in OTTO_CYCLE_INPUTS} for name in OTTO_CYCLE_OUTPUTS}
+    
+    for start in range(0, size, chunk_size):
+        stop = min(start + chunk_size, size)
+        chunk = _solve_otto_cycle(units, **{name: Dual.variable(name, value[start:stop]) for name, value in inputs.items()})
+        
+        for name, value in chunk.items():
+            outputs[name][start:stop] = value.value
+            
+            # Outputs that don't depend on an input have no entry
+            for input_name, derivative in derivatives[name].items():
+                derivative[start:stop] = value.derivatives.get(input_name, 0.0)
+    
+    return (
+        {name: value.reshape(shape) for name, value in outputs.items()},
+        {name: {input_name: value.reshape(shape) for input_name, value in row.items()} for name, row in derivatives.items()}
+    )
+
+def _solve_otto_cycle(units: UnitSystem, compression_ratio, specific_heat_pressure, specific_heat_volume, gas_constant, engine_displacement, initial_pressure, initial_temperature, operating_temperature) -> dict:
+    """
+    The cycle itself, the `OTTO_CYCLE_STEPS` written only in terms of arithmetic and the calculation functions so it runs on arrays or dual numbers alike
+    """
+    # Normalize to the internal units once (psf, °R, ft^3, Btu/lbm-°R, lbf-ft/lbm-°R)
+    values = units.values_to_internal({
+        "compression_ratio": compression_ratio,
+        "specific_heat_pressure": specific_heat_pressure,
+        "specific_heat_volume": specific_heat_volume,
+        "gas_constant": gas_constant,
+        "engine_displacement": engine_displacement,
+        "initial_pressure": initial_pressure,
+        "initial_temperature": initial_temperature,
+        "operating_temperature": operating_temperature
+    })
+    
+    for output, function, dependencies in OTTO_CYCLE_STEPS:
+        values[output] = function(*[values[dependency] for dependency in dependencies])
+    
+    # Convert out of the internal units once
+    return units.values_from_internal({name: values[name] for name in OTTO_CYCLE_OUTPUTS})
@@ -0,0 +1,180 @@
+from __future__ import annotations
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from calculations import *
+from units import US, UnitSystem
+
+if TYPE_CHECKING:
+    from properties import PropertyTable
+
+
+# float32 keeps 24 significant bits, so each stored float32 value is within this of the float64 value, relative to itself (over about 1e-38 to 3e38, which every cycle quantity is well inside)
+FLOAT32_RELATIVE_ERROR = 2.0 ** -24
+
+# Outputs recomputed on access from stored values when derived fields are dropped, as (output, function, dependencies). Each relation holds in any unit system and with temperature-dependent specific heats, and is chosen so it doesn't amplify rounding: the volumes aren't rebuilt from the compression ratio (ill-conditioned as CR -> 1) and the expansion work is the total less the (negative) compression work rather than the total being a sum that cancels
+DERIVED_OUTPUTS: list[tuple[str, Callable[..., Any], tuple[str, ...]]] = [
+    ("stage_1_final_volume", calculate_final_volume, ("compression_ratio", "initial_volume")),
+    ("stage_3_work", lambda total_work, stage_1_work: total_work - stage_1_work, ("total_work", "stage_1_work")),
+    ("thermal_efficiency", calculate_thermal_efficiency, ("total_work", "stage_2_heat"))
+]
+
+_DERIVED_NAMES = tuple(output for output, _, _ in DERIVED_OUTPUTS)
+
+# Every output is NaN in the rows that can't form a valid cycle, this one is always stored so derived outputs can be masked the same way
+_VALIDITY_FIELD = "stage_2_heat"
+
+
+class CompactResults:
+    """
+    Batch-solved cycles as one array per input and output in float32 or float64
+
+    float64 takes 184 bytes per cycle for the 8 inputs and 15 outputs. float32 halves that, inputs held constant across the batch are kept as a single value, and with `drop_derived` the stage 1 final volume, stage 3 work and efficiency are recomputed on access instead of stored, so a float32 sweep over one input takes 52 bytes per cycle
+
+    Precision with float32: every stored value is within `FLOAT32_RELATIVE_ERROR` (2^-24, about 6e-8) of the float64 result relative to itself, so about 7 significant digits are kept and reports written with more digits show the rounding. Derived outputs are recomputed in float64 from two rounded values each and are within 2 * `FLOAT32_RELATIVE_ERROR` (plus float64 rounding) for cycles with positive work. Cycles solved again from float32 inputs don't reproduce the stored outputs exactly
+    """
+    def __init__(self, size: int, dtype: Any = np.float32, drop_derived: bool = False, constants: dict[str, float] | None = None, units: UnitSystem = US) -> None:
+        self.size = size
+        self.dtype = np.dtype(dtype)
+        self.drop_derived = drop_derived
+        self.units = units
+
+        if self.dtype not in (np.float32, np.float64):
+            raise ValueError(f"Results can only be held as float32 or float64, not {self.dtype}")
+
+        constants = constants if constants is not None else {}
+        unknown = [name for name in constants if name not in OTTO_CYCLE_INPUTS]
+        if unknown:
+            raise ValueError(f"Only inputs can be constant, not {', '.join(unknown)}")
+
+        self.constants = {name: self.dtype.type(value) for name, value in constants.items()}
+        self._columns = {
+            name: np.empty(size, dtype=self.dtype)
+            for name in (OTTO_CYCLE_INPUTS + OTTO_CYCLE_OUTPUTS)
+            if name not in self.constants and not (drop_derived and name in _DERIVED_NAMES)
+        }
+
+    @classmethod
+    def from_batch(cls, inputs: dict[str, Any], outputs: dict[str, np.ndarray], dtype: Any = np.float32, drop_derived: bool = False, units: UnitSystem = US) -> CompactResults:
+        """
+        Hold the inputs and outputs of `solve_otto_cycle_batch`, keeping inputs that are scalars or the same in every row as a single value
+        """
+        size = np.size(outputs[_VALIDITY_FIELD])
+
+        constants = {}
+        for name in OTTO_CYCLE_INPUTS:
+            values = np.ravel(inputs[name])
+            if values.size == 1 or (values.size > 0 and (values == values[0]).all()):
+                constants[name] = float(values[0])
+
+        results = cls(size, dtype, drop_derived, constants, units)
+        results.set_rows(0, inputs | outputs)
+
+        return results
+
+    def set_rows(self, start: int, values: dict[str, Any]) -> None:
+        """
+        Write rows from `start` for every stored field from equal-length arrays (or scalars), derived outputs and constant inputs given in `values` are skipped
+        """
+        stop = start + np.size(values[_VALIDITY_FIELD])
+        for name, column in self._columns.items():
+            column[start:stop] = np.ravel(values[name]) if np.ndim(values[name]) else values[name]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.column(name)
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return OTTO_CYCLE_INPUTS + OTTO_CYCLE_OUTPUTS
+
+    @property
+    def stored_fields(self) -> tuple[str, ...]:
+        """
+        Fields held as a full column
+        """
+        return tuple(self._columns)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns.values()) + (len(self.constants) * self.dtype.itemsize)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        All rows of one input or output, constant inputs come back as a read-only broadcast view and dropped derived outputs are recomputed as float64
+        """
+        if name in self._columns:
+            return self._columns[name]
+
+        if name in self.constants:
+            return np.broadcast_to(self.constants[name], (self.size,))
+
+        if name not in _DERIVED_NAMES:
+            raise KeyError(name)
+
+        return self._derived()[name]
+
+    def columns(self) -> dict[str, np.ndarray]:
+        derived = self._derived() if self.drop_derived else {}
+
+        return {name: derived[name] if name in derived else self.column(name) for name in self.fields}
+
+    def row(self, index: int) -> dict[str, float]:
+        return {name: float(value[index]) for name, value in self.columns().items()}
+
+    def max_relative_error(self, reference: dict[str, Any]) -> dict[str, float]:
+        """
+        Largest error of each field relative to float64 `reference` values (such as the inputs and outputs of the same batch solve), over the valid rows
+        """
+        valid = np.isfinite(np.ravel(reference[_VALIDITY_FIELD]))
+        errors = {}
+
+        for name, values in self.columns().items():
+            expected = np.broadcast_to(np.asarray(reference[name], dtype=np.float64), (self.size,))[valid]
+            actual = values[valid].astype(np.float64)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                relative = np.abs(actual - expected) / np.abs(expected)
+            relative[actual == expected] = 0.0
+
+            errors[name] = float(relative.max()) if relative.size else 0.0
+
+        return errors
+
+    def _derived(self) -> dict[str, np.ndarray]:
+        values: dict[str, np.ndarray] = {}
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            for output, function, dependencies in DERIVED_OUTPUTS:
+                values[output] = function(*(values[name] if name in values else self.column(name).astype(np.float64) for name in dependencies))
+
+        # The compression ratio is finite in rows that aren't valid cycles
+        invalid = np.isnan(self._columns[_VALIDITY_FIELD])
+        if invalid.any():
+            for value in values.values():
+                value[invalid] = np.nan
+
+        return values
+
+
+def solve_compact(compression_ratio, specific_heat_pressure, specific_heat_volume, gas_constant, engine_displacement, initial_pressure, initial_temperature, operating_temperature, dtype: Any = np.float32, drop_derived: bool = False, properties: PropertyTable | None = None, units: UnitSystem = US) -> CompactResults:
+    """
+    `solve_otto_cycle_batch` with the results held in a `CompactResults`
+    """
+    inputs = dict(zip(OTTO_CYCLE_INPUTS, (
+        compression_ratio,
+        specific_heat_pressure,
+        specific_heat_volume,
+        gas_constant,
+        engine_displacement,
+        initial_pressure,
+        initial_temperature,
+        operating_temperature
+    )))
+    outputs = solve_otto_cycle_batch(**inputs, properties=properties, units=units)
+
+    return CompactResults.from_batch(inputs, outputs, dtype, drop_derived, units)
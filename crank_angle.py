@@ -0,0 +1,230 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import math
+
+import numpy as np
+
+from calculations import *
+
+
+# Woschni gas velocity constants for the closed part of the cycle, C_2 only applies once combustion starts
+_WOSCHNI_C1 = 2.28
+_WOSCHNI_C2 = 3.24e-3
+
+# SI conversions for the Woschni correlation, which is fitted in SI units
+_PSF_TO_KPA = 0.0478803
+_CUBIC_FEET_TO_CUBIC_METERS = 0.0283168
+_INCHES_TO_METERS = 0.0254
+_JOULES_TO_FT_LBF = 0.737562
+
+
+@dataclass(frozen=True, slots=True)
+class CrankAngleResult:
+    """
+    Crank-angle traces of a batch of engines from intake valve closing at BDC (-180°) to exhaust valve opening at BDC (180°)
+
+    Traces are (engines, angles) arrays of pressure (psi), volume (in^3) and temperature (°F), summaries are per engine (Btu, psi, degrees)
+    """
+    crank_angles: np.ndarray
+    pressures: np.ndarray
+    volumes: np.ndarray
+    temperatures: np.ndarray
+
+    heat_added: np.ndarray
+    heat_loss: np.ndarray
+    work: np.ndarray
+    thermal_efficiency: np.ndarray
+    peak_pressure: np.ndarray
+    peak_pressure_angle: np.ndarray
+
+
+def simulate_crank_angle(
+    compression_ratio,
+    specific_heat_pressure,
+    specific_heat_volume,
+    gas_constant,
+    engine_displacement,
+    initial_pressure,
+    initial_temperature,
+    operating_temperature,
+    bore=None,
+    rod_ratio=3.5,
+    combustion_start=-10.0,
+    combustion_duration=40.0,
+    wiebe_efficiency=5.0,
+    wiebe_exponent=2.0,
+    heat_loss: bool = False,
+    engine_speed=3000.0,
+    wall_temperature=200.0,
+    step: float = 1.0
+) -> CrankAngleResult:
+    """
+    Simulate the closed part of the cycle crank angle by crank angle for arrays (or broadcastable scalars) of engines at once
+
+    The cycle inputs are the calculator's (psi, °F, in^3, Btu/lb-°R, lbf-ft/lbm-°R), the heat released is the ideal cycle's stage 2 heat, burned with a Wiebe function from `combustion_start` (degrees after TDC) over `combustion_duration` degrees. `bore` (in) defaults to a square engine and `rod_ratio` is the connecting rod length over the crank radius. If `heat_loss` is set, wall heat transfer uses Woschni's correlation at `engine_speed` (rpm) and `wall_temperature` (°F). Integrated with fixed `step` degree RK4 steps
+    """
+    ideal = solve_otto_cycle_batch(compression_ratio, specific_heat_pressure, specific_heat_volume, gas_constant, engine_displacement, initial_pressure, initial_temperature, operating_temperature)
+
+    (
+        compression_ratio,
+        specific_heat_pressure,
+        specific_heat_volume,
+        gas_constant,
+        engine_displacement,
+        initial_pressure,
+        initial_temperature,
+        operating_temperature,
+        rod_ratio,
+        combustion_start,
+        combustion_duration,
+        wiebe_efficiency,
+        wiebe_exponent,
+        engine_speed,
+        wall_temperature
+    ) = (np.ravel(value) for value in np.broadcast_arrays(*(np.asarray(value, dtype=np.float64) for value in (
+        compression_ratio,
+        specific_heat_pressure,
+        specific_heat_volume,
+        gas_constant,
+        engine_displacement,
+        initial_pressure,
+        initial_temperature,
+        operating_temperature,
+        rod_ratio,
+        combustion_start,
+        combustion_duration,
+        wiebe_efficiency,
+        wiebe_exponent,
+        engine_speed,
+        wall_temperature
+    ))))
+
+    steps = round(360 / step)
+    crank_angles = np.linspace(-180, 180, steps + 1)
+    step = 360 / steps
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        adiabatic_index = specific_heat_pressure / specific_heat_volume
+        air_mass = np.broadcast_to(ideal["air_mass"], compression_ratio.shape).ravel()
+
+        # Heat released by the whole burn (ft-lbf), the ideal cycle's constant-volume heat addition up to the operating temperature
+        total_heat = convert_btu_to_ft_lbf(np.broadcast_to(ideal["stage_2_heat"], compression_ratio.shape).ravel())
+
+        displacement = convert_cubic_inches_to_cubic_feet(engine_displacement)
+        clearance_volume = displacement / (compression_ratio - 1)
+        initial_volume = calculate_initial_volume(compression_ratio, displacement)
+        initial_pressure = convert_psi_to_psf(initial_pressure)
+
+        # Wiebe burn rate, normalized so the full heat is released by the end of combustion
+        wiebe_scale = wiebe_efficiency * (wiebe_exponent + 1) / (combustion_duration * -np.expm1(-wiebe_efficiency))
+
+        if heat_loss:
+            bore = np.ravel(np.broadcast_to(np.asarray(bore, dtype=np.float64), compression_ratio.shape) * _INCHES_TO_METERS) if bore is not None else np.cbrt(4 * displacement * _CUBIC_FEET_TO_CUBIC_METERS / math.pi)
+            stroke = (4 * displacement * _CUBIC_FEET_TO_CUBIC_METERS) / (math.pi * bore ** 2)
+            mean_piston_speed = 2 * stroke * engine_speed / 60
+
+            # Woschni h = 3.26 B^-0.2 p^0.8 T^-0.55 w^0.8 (W/m^2-K), per degree at 6N degrees per second and in ft-lbf
+            woschni_scale = 3.26 * bore ** -0.2 * _JOULES_TO_FT_LBF / (6 * engine_speed)
+            head_area = math.pi * bore ** 2 / 2
+            wall_area_per_volume = 4 * _CUBIC_FEET_TO_CUBIC_METERS / bore
+            wall_temperature = convert_farhenheit_to_rankine(wall_temperature) / 1.8
+            combustion_velocity_scale = _WOSCHNI_C2 * (displacement / initial_volume) * (convert_farhenheit_to_rankine(initial_temperature) / 1.8 / (initial_pressure * _PSF_TO_KPA))
+            heat_loss_total = np.zeros_like(compression_ratio)
+
+        def geometry(angle: float) -> tuple[np.ndarray, np.ndarray]:
+            # Slider-crank volume (ft^3) and its rate of change per degree
+            sine, cosine = math.sin(math.radians(angle)), math.cos(math.radians(angle))
+            root = np.sqrt(rod_ratio ** 2 - sine ** 2)
+            volume = clearance_volume + (displacement / 2) * (rod_ratio + 1 - cosine - root)
+            volume_rate = (displacement / 2) * sine * (1 + cosine / root) * (math.pi / 180)
+
+            return (volume, volume_rate)
+
+        def burn_rate(angle: float) -> np.ndarray:
+            fraction = np.clip((angle - combustion_start) / combustion_duration, 0, 1)
+            rate = wiebe_scale * fraction ** wiebe_exponent * np.exp(-wiebe_efficiency * fraction ** (wiebe_exponent + 1))
+
+            return np.where((angle >= combustion_start) & (angle <= combustion_start + combustion_duration), rate, 0.0)
+
+        def wall_heat_rate(angle: float, pressure: np.ndarray, volume: np.ndarray) -> np.ndarray:
+            temperature = pressure * volume / (air_mass * gas_constant) / 1.8
+            motored_pressure = initial_pressure * (initial_volume / volume) ** adiabatic_index
+
+            velocity = _WOSCHNI_C1 * mean_piston_speed
+            if angle >= combustion_start.min():
+                velocity = velocity + np.where(angle >= combustion_start, combustion_velocity_scale * (pressure - motored_pressure) * _PSF_TO_KPA, 0.0)
+
+            area = head_area + (wall_area_per_volume * (volume - clearance_volume))
+            coefficient = woschni_scale * (pressure * _PSF_TO_KPA) ** 0.8 * temperature ** -0.55 * np.abs(velocity) ** 0.8
+
+            return coefficient * area * (temperature - wall_temperature)
+
+        def pressure_rate(pressure: np.ndarray, volume: np.ndarray, volume_rate: np.ndarray, heat_rate: np.ndarray) -> np.ndarray:
+            # First law for a closed ideal gas, dP/dθ = ((k - 1) dQ/dθ - kP dV/dθ) / V
+            return ((adiabatic_index - 1) * heat_rate - (adiabatic_index * pressure * volume_rate)) / volume
+
+        pressures = np.empty((steps + 1, len(compression_ratio)))
+        volumes = np.empty((steps + 1, len(compression_ratio)))
+        pressures[0] = initial_pressure
+        volumes[0] = initial_volume
+
+        pressure = pressures[0].copy()
+        volume, volume_rate = geometry(-180)
+        heat_rate = total_heat * burn_rate(-180)
+        heat_added = np.zeros_like(compression_ratio)
+
+        for index in range(steps):
+            angle = crank_angles[index]
+            middle_angle = angle + (step / 2)
+            end_angle = crank_angles[index + 1]
+
+            middle_volume, middle_volume_rate = geometry(middle_angle)
+            end_volume, end_volume_rate = geometry(end_angle)
+            middle_heat_rate = total_heat * burn_rate(middle_angle)
+            end_heat_rate = total_heat * burn_rate(end_angle)
+
+            if not heat_loss:
+                k1 = pressure_rate(pressure, volume, volume_rate, heat_rate)
+                k2 = pressure_rate(pressure + (step / 2) * k1, middle_volume, middle_volume_rate, middle_heat_rate)
+                k3 = pressure_rate(pressure + (step / 2) * k2, middle_volume, middle_volume_rate, middle_heat_rate)
+                k4 = pressure_rate(pressure + step * k3, end_volume, end_volume_rate, end_heat_rate)
+            else:
+                w1 = wall_heat_rate(angle, pressure, volume)
+                k1 = pressure_rate(pressure, volume, volume_rate, heat_rate - w1)
+                w2 = wall_heat_rate(middle_angle, pressure + (step / 2) * k1, middle_volume)
+                k2 = pressure_rate(pressure + (step / 2) * k1, middle_volume, middle_volume_rate, middle_heat_rate - w2)
+                w3 = wall_heat_rate(middle_angle, pressure + (step / 2) * k2, middle_volume)
+                k3 = pressure_rate(pressure + (step / 2) * k2, middle_volume, middle_volume_rate, middle_heat_rate - w3)
+                w4 = wall_heat_rate(end_angle, pressure + step * k3, end_volume)
+                k4 = pressure_rate(pressure + step * k3, end_volume, end_volume_rate, end_heat_rate - w4)
+
+                # The heat lost over the step, weighted the same way as the pressure update
+                heat_loss_total += (step / 6) * (w1 + 2 * (w2 + w3) + w4)
+
+            pressure = pressure + (step / 6) * (k1 + 2 * (k2 + k3) + k4)
+            heat_added += (step / 6) * (heat_rate + 4 * middle_heat_rate + end_heat_rate)
+            volume, volume_rate, heat_rate = end_volume, end_volume_rate, end_heat_rate
+
+            pressures[index + 1] = pressure
+            volumes[index + 1] = volume
+
+        # Net work from the first law (W = Q_in - Q_loss - ΔU with U = PV / (k - 1)), consistent with the integrated trace
+        if not heat_loss:
+            heat_loss_total = np.zeros_like(heat_added)
+        work = heat_added - heat_loss_total - ((pressures[-1] * volumes[-1]) - (pressures[0] * volumes[0])) / (adiabatic_index - 1)
+
+        temperatures = pressures * volumes / (air_mass * gas_constant)
+        peak_index = np.argmax(pressures, axis=0)
+
+        return CrankAngleResult(
+            crank_angles,
+            np.ascontiguousarray(convert_psf_to_psi(pressures).T),
+            np.ascontiguousarray(convert_cubic_feet_to_cubic_inches(volumes).T),
+            np.ascontiguousarray(convert_rankine_to_farhenheit(temperatures).T),
+            convert_ft_lbf_to_btu(heat_added),
+            convert_ft_lbf_to_btu(heat_loss_total),
+            convert_ft_lbf_to_btu(work),
+            calculate_thermal_efficiency(work, heat_added),
+            convert_psf_to_psi(pressures[peak_index, np.arange(len(peak_index))]),
+            crank_angles[peak_index]
+        )
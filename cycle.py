@@ -0,0 +1,118 @@
+from __future__ import annotations
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+import math
+from typing import TYPE_CHECKING
+
+from calculations import *
+from profiling import timed_steps
+from units import US, UnitSystem
+
+if TYPE_CHECKING:
+    from properties import PropertyTable
+
+
+@dataclass(frozen=True, slots=True)
+class OttoCycleInputs:
+    """
+    Inputs to the Otto cycle in calculator units (psi, °F, in^3, Btu/lb-°R, lbf-ft/lbm-°R)
+    """
+    compression_ratio: float
+    specific_heat_pressure: float
+    specific_heat_volume: float
+    gas_constant: float
+    engine_displacement: float
+    initial_pressure: float
+    initial_temperature: float
+    operating_temperature: float
+
+
+@dataclass(frozen=True, slots=True)
+class OttoCycleResult:
+    """
+    Solved Otto cycle, in calculator units (psi, °F, in^3, lbm, Btu) unless solved in another unit system
+    """
+    inputs: OttoCycleInputs
+
+    adiabatic_index: float
+    initial_volume: float
+    air_mass: float
+
+    stage_1_final_pressure: float
+    stage_1_final_temperature: float
+    stage_1_final_volume: float
+    stage_1_work: float
+
+    stage_2_final_pressure: float
+    stage_2_heat: float
+
+    stage_3_final_pressure: float
+    stage_3_final_temperature: float
+    stage_3_work: float
+
+    stage_4_heat: float
+
+    total_work: float
+    thermal_efficiency: float
+
+    units: UnitSystem = US
+
+
+# Steps of the cycle in evaluation order as (output, function, dependencies), the same steps the batch solver runs. Steps work in the internal units (psf, °R, ft^3, lbm, Btu)
+CYCLE_STEPS: list[tuple[str, Callable[..., float], tuple[str, ...]]] = list(OTTO_CYCLE_STEPS)
+
+
+def affected_steps(changed: Iterable[str]) -> list[tuple[str, Callable[..., float], tuple[str, ...]]]:
+    """
+    Get the steps, in evaluation order, that depend directly or indirectly on any of the changed values
+    """
+    stale = set(changed)
+    steps = []
+
+    for step in CYCLE_STEPS:
+        output, _, dependencies = step
+        if not stale.isdisjoint(dependencies):
+            stale.add(output)
+            steps.append(step)
+
+    return steps
+
+def recompute(values: dict[str, float], changed: Iterable[str], units: UnitSystem = US) -> list[str]:
+    """
+    Recalculate only the values in `values` (in `units`) that depend on the changed inputs, returning the names of the updated outputs
+
+    `values` has to hold every input and output of a solved cycle, after which the recomputed values are the same as solving the changed inputs in full
+    """
+    internal = units.values_to_internal(values)
+    updated = []
+
+    for output, function, dependencies in timed_steps(affected_steps(changed), "cycle."):
+        internal[output] = function(*[internal[dependency] for dependency in dependencies])
+        values[output] = units.from_internal(output, internal[output])
+        updated.append(output)
+
+    return updated
+
+def solve(inputs: OttoCycleInputs, properties: PropertyTable | None = None, units: UnitSystem = US) -> OttoCycleResult:
+    """
+    Solve the Otto cycle for a single set of inputs given in `units`, with temperature-dependent specific heats from `properties` if given
+    """
+    values = {name: getattr(inputs, name) for name in OTTO_CYCLE_INPUTS}
+
+    # The variable-property cycle isn't split into steps, it goes through the batch solver as a single row
+    if properties is not None:
+        outputs = properties.solve_otto_cycle_batch(**values, units=units)
+        result = OttoCycleResult(inputs, *[float(outputs[name]) for name in OTTO_CYCLE_OUTPUTS], units)
+        if math.isnan(result.thermal_efficiency):
+            raise FloatingPointError("The inputs don't form a valid cycle within the property table's temperature range")
+
+        return result
+
+    # Each step is timed as a span while profiling is on
+    values = units.values_to_internal(values)
+    for output, function, dependencies in timed_steps(CYCLE_STEPS, "cycle."):
+        values[output] = function(*[values[dependency] for dependency in dependencies])
+
+    outputs = units.values_from_internal({name: values[name] for name in OTTO_CYCLE_OUTPUTS})
+
+    return OttoCycleResult(inputs, *outputs.values(), units)
@@ -0,0 +1,262 @@
+from __future__ import annotations
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from calculations import *
+from units import US, UnitSystem
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Each process takes the start state as (pressure, volume, temperature) in psf, ft^3 and °R and the end state's known quantity, and returns the end state, the work done by the gas in ft-lbf and the heat added in Btu
+def adiabatic_process(state: tuple, quantity: str, target, adiabatic_index, air_mass, specific_heat_pressure, specific_heat_volume) -> tuple[tuple, object, object]:
+    pressure, volume, temperature = state
+
+    if quantity == "volume":
+        final_volume = target
+        final_pressure = calculate_pressure_adiabatic(adiabatic_index, pressure, volume, final_volume)
+        final_temperature = calculate_temperature_adiabatic(adiabatic_index, temperature, volume, final_volume)
+    elif quantity == "pressure":
+        final_pressure = target
+        final_volume = volume * ((pressure / final_pressure) ** (1 / adiabatic_index))
+        final_temperature = temperature * ((final_pressure / pressure) ** ((adiabatic_index - 1) / adiabatic_index))
+    else:
+        final_temperature = target
+        final_volume = volume * ((temperature / final_temperature) ** (1 / (adiabatic_index - 1)))
+        final_pressure = calculate_pressure_adiabatic(adiabatic_index, pressure, volume, final_volume)
+
+    work = calculate_work_adiabatic(adiabatic_index, pressure, volume, final_pressure, final_volume)
+
+    return ((final_pressure, final_volume, final_temperature), work, 0 * final_temperature)
+
+def isochoric_process(state: tuple, quantity: str, target, adiabatic_index, air_mass, specific_heat_pressure, specific_heat_volume) -> tuple[tuple, object, object]:
+    pressure, volume, temperature = state
+
+    if quantity == "temperature":
+        final_temperature = target
+        final_pressure = calculate_final_pressure_constant_volume(pressure, final_temperature, temperature)
+    else:
+        final_pressure = target
+        final_temperature = temperature * (final_pressure / pressure)
+
+    heat = calculate_heat(specific_heat_volume, air_mass, final_temperature, temperature)
+
+    return ((final_pressure, volume + (0 * final_temperature), final_temperature), 0 * final_temperature, heat)
+
+def isobaric_process(state: tuple, quantity: str, target, adiabatic_index, air_mass, specific_heat_pressure, specific_heat_volume) -> tuple[tuple, object, object]:
+    pressure, volume, temperature = state
+
+    if quantity == "temperature":
+        final_temperature = target
+        final_volume = calculate_final_volume_constant_pressure(volume, final_temperature, temperature)
+    else:
+        final_volume = target
+        final_temperature = temperature * (final_volume / volume)
+
+    work = calculate_work_constant_pressure(pressure, volume, final_volume)
+    heat = calculate_heat(specific_heat_pressure, air_mass, final_temperature, temperature)
+
+    return ((pressure + (0 * final_temperature), final_volume, final_temperature), work, heat)
+
+# Process functions and the end-state quantities each can be run to
+PROCESSES: dict[str, tuple[Callable[..., tuple[tuple, object, object]], tuple[str, ...]]] = {
+    "adiabatic": (adiabatic_process, ("volume", "pressure", "temperature")),
+    "isochoric": (isochoric_process, ("temperature", "pressure")),
+    "isobaric": (isobaric_process, ("temperature", "volume"))
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Stage:
+    """
+    One process of a cycle, run until the end state's `quantity` reaches the value `target` gives
+
+    `target` is called with the values solved so far in the internal units: the inputs, "initial_volume" and the final pressure, temperature and volume of each earlier stage. Heat added in stages with `adds_heat` is what the thermal efficiency is taken against
+    """
+    name: str
+    process: str
+    quantity: str
+    target: Callable[[dict], object]
+    adds_heat: bool = False
+
+    def __post_init__(self) -> None:
+        if self.process not in PROCESSES:
+            raise ValueError(f"Unknown process {self.process}, expected one of {', '.join(PROCESSES)}")
+        if self.quantity not in PROCESSES[self.process][1]:
+            raise ValueError(f"A {self.process} process can't be run to a final {self.quantity}")
+
+
+@dataclass(frozen=True, slots=True)
+class CycleDefinition:
+    """
+    An air-standard cycle as a sequence of stages starting from the intake state
+
+    Every cycle takes the Otto cycle's inputs plus its `extra_inputs`, which are dimensionless ratios. The operating temperature is the peak temperature of the cycle and the engine displacement is swept over the compression stroke, so cycle types compare at the same design point
+    """
+    name: str
+    stages: tuple[Stage, ...]
+    extra_inputs: tuple[str, ...] = ()
+
+    # The quantity of every output, None for dimensionless values
+    output_quantities: dict[str, str | None] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        quantities: dict[str, str | None] = {"adiabatic_index": None, "initial_volume": "volume", "air_mass": "mass"}
+        for number in range(1, len(self.stages) + 1):
+            quantities |= {
+                f"stage_{number}_final_pressure": "pressure",
+                f"stage_{number}_final_temperature": "temperature",
+                f"stage_{number}_final_volume": "volume",
+                f"stage_{number}_work": "energy",
+                f"stage_{number}_heat": "energy"
+            }
+        quantities |= {"heat_added": "energy", "total_work": "energy", "thermal_efficiency": None, "mean_effective_pressure": "pressure"}
+
+        object.__setattr__(self, "output_quantities", quantities)
+
+    @property
+    def inputs(self) -> tuple[str, ...]:
+        return OTTO_CYCLE_INPUTS + self.extra_inputs
+
+    @property
+    def outputs(self) -> tuple[str, ...]:
+        return tuple(self.output_quantities)
+
+    def solve_batch(self, units: UnitSystem = US, **inputs) -> dict[str, np.ndarray]:
+        """
+        Solve the cycle for arrays (or broadcastable scalars) of every input in one vectorized pass
+
+        Like `solve_otto_cycle_batch`, rows with invalid inputs (CR <= 1, C_v = 0, k = 1, ...) are returned as NaN instead of raising. Inputs outside a cycle's intended range (such as a cutoff past the peak temperature) are solved as written, the same way the Otto solver handles an operating temperature below the compression temperature
+        """
+        # Imported here so cycles can be defined without loading NumPy
+        import numpy as np
+
+        missing = [name for name in self.inputs if name not in inputs]
+        unknown = [name for name in inputs if name not in self.inputs]
+        if missing or unknown:
+            raise ValueError(f"The {self.name} cycle takes {', '.join(self.inputs)}")
+
+        arrays = dict(zip(self.inputs, np.broadcast_arrays(*(np.asarray(inputs[name], dtype=np.float64) for name in self.inputs))))
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            outputs = self._solve(units, arrays)
+
+        # Mask rows that can't form a valid cycle
+        invalid = ~(
+            (arrays["compression_ratio"] > 1)
+            & (arrays["specific_heat_volume"] != 0)
+            & (outputs["adiabatic_index"] != 1)
+            & (arrays["gas_constant"] != 0)
+            & (units.to_internal("initial_temperature", arrays["initial_temperature"]) != 0)
+            & np.isfinite(outputs["thermal_efficiency"])
+            & np.isfinite(outputs["mean_effective_pressure"])
+        )
+
+        return mask_invalid(outputs, invalid)
+
+    def _solve(self, units: UnitSystem, inputs: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        import numpy as np
+
+        # Normalize to the internal units once (psf, °R, ft^3, Btu/lbm-°R, lbf-ft/lbm-°R), the extra inputs are ratios
+        values = units.values_to_internal({name: inputs[name] for name in OTTO_CYCLE_INPUTS}) | {name: inputs[name] for name in self.extra_inputs}
+
+        specific_heat_pressure = values["specific_heat_pressure"]
+        specific_heat_volume = values["specific_heat_volume"]
+        adiabatic_index = specific_heat_pressure / specific_heat_volume
+        values["initial_volume"] = calculate_initial_volume(values["compression_ratio"], values["engine_displacement"])
+        air_mass = calculate_air_mass(values["initial_pressure"], values["initial_temperature"], values["initial_volume"], values["gas_constant"])
+
+        outputs = {"adiabatic_index": adiabatic_index, "initial_volume": values["initial_volume"], "air_mass": air_mass}
+        state = (values["initial_pressure"], values["initial_volume"], values["initial_temperature"])
+        works = []
+        heat_added = 0 * adiabatic_index
+        smallest_volume = largest_volume = state[1]
+
+        for number, stage in enumerate(self.stages, 1):
+            process = PROCESSES[stage.process][0]
+            state, work, heat = process(state, stage.quantity, stage.target(values), adiabatic_index, air_mass, specific_heat_pressure, specific_heat_volume)
+
+            final = {
+                f"stage_{number}_final_pressure": state[0],
+                f"stage_{number}_final_temperature": state[2],
+                f"stage_{number}_final_volume": state[1]
+            }
+            values |= final
+            outputs |= final
+            outputs[f"stage_{number}_work"] = convert_ft_lbf_to_btu(work)
+            outputs[f"stage_{number}_heat"] = heat
+
+            works.append(outputs[f"stage_{number}_work"])
+            if stage.adds_heat:
+                heat_added = heat_added + heat
+            smallest_volume = np.minimum(smallest_volume, state[1])
+            largest_volume = np.maximum(largest_volume, state[1])
+
+        outputs["heat_added"] = heat_added
+        outputs["total_work"] = calculate_total_work(*works)
+        outputs["thermal_efficiency"] = calculate_thermal_efficiency(outputs["total_work"], heat_added)
+        outputs["mean_effective_pressure"] = convert_btu_to_ft_lbf(outputs["total_work"]) / (largest_volume - smallest_volume)
+
+        # Convert out of the internal units once, into new arrays so masking never writes through to an input
+        converted = {}
+        for name, value in outputs.items():
+            quantity = self.output_quantities[name]
+            value = getattr(units, quantity).from_internal(value) if quantity is not None else value
+            converted[name] = np.array(value, dtype=np.float64)
+
+        return converted
+
+
+_COMPRESSION = Stage("Adiabatic Compression", "adiabatic", "volume", lambda values: calculate_final_volume(values["compression_ratio"], values["initial_volume"]))
+_CONSTANT_VOLUME_COMBUSTION = Stage("Combustion", "isochoric", "temperature", lambda values: values["operating_temperature"], adds_heat=True)
+_EXPANSION = Stage("Adiabatic Expansion", "adiabatic", "volume", lambda values: values["initial_volume"])
+_HEAT_REJECTION = Stage("Heat Rejection", "isochoric", "temperature", lambda values: values["initial_temperature"])
+_EXHAUST = Stage("Exhaust", "isobaric", "volume", lambda values: values["initial_volume"])
+
+# Built-in cycles by name. Sweeps and caches refer to cycles by name so worker processes can look them up
+CYCLES: dict[str, CycleDefinition] = {
+    "otto": CycleDefinition("Otto", (
+        _COMPRESSION,
+        _CONSTANT_VOLUME_COMBUSTION,
+        _EXPANSION,
+        _HEAT_REJECTION
+    )),
+    # Heat is added at constant pressure up to the peak temperature, the cutoff ratio follows from it
+    "diesel": CycleDefinition("Diesel", (
+        _COMPRESSION,
+        Stage("Combustion", "isobaric", "temperature", lambda values: values["operating_temperature"], adds_heat=True),
+        _EXPANSION,
+        _HEAT_REJECTION
+    )),
+    # Heat is added at constant volume up to `pressure_ratio` times the compression pressure, then at constant pressure up to the peak temperature
+    "dual": CycleDefinition("Dual", (
+        _COMPRESSION,
+        Stage("Constant Volume Combustion", "isochoric", "pressure", lambda values: values["stage_1_final_pressure"] * values["pressure_ratio"], adds_heat=True),
+        Stage("Constant Pressure Combustion", "isobaric", "temperature", lambda values: values["operating_temperature"], adds_heat=True),
+        _EXPANSION,
+        _HEAT_REJECTION
+    ), ("pressure_ratio",)),
+    # The expansion continues down to the intake pressure
+    "atkinson": CycleDefinition("Atkinson", (
+        _COMPRESSION,
+        _CONSTANT_VOLUME_COMBUSTION,
+        Stage("Adiabatic Expansion", "adiabatic", "pressure", lambda values: values["initial_pressure"]),
+        _EXHAUST
+    )),
+    # The expansion runs over `expansion_ratio` (at least the compression ratio and at most the Atkinson cycle's), with the rest of the heat rejected at constant volume down to the intake pressure
+    "miller": CycleDefinition("Miller", (
+        _COMPRESSION,
+        _CONSTANT_VOLUME_COMBUSTION,
+        Stage("Adiabatic Expansion", "adiabatic", "volume", lambda values: values["stage_1_final_volume"] * values["expansion_ratio"]),
+        Stage("Heat Rejection", "isochoric", "pressure", lambda values: values["initial_pressure"]),
+        _EXHAUST
+    ), ("expansion_ratio",))
+}
+
+def solve_cycle_batch(cycle: str, units: UnitSystem = US, **inputs) -> dict[str, np.ndarray]:
+    """
+    Solve one of the `CYCLES` by name, see `CycleDefinition.solve_batch`
+    """
+    return CYCLES[cycle].solve_batch(units, **inputs)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class Dual:
+    """
+    Forward-mode dual number over NumPy arrays, carrying the derivatives with respect to named inputs alongside the value
+
+    Derivatives are kept sparsely, an input that a value doesn't depend on has no entry, so values that only depend on a few inputs only carry those. Supports the arithmetic the calculation functions use (+, -, *, / and **)
+    """
+    __slots__ = ("value", "derivatives")
+
+    # Make NumPy defer to the reflected operators instead of treating a Dual as an object array
+    __array_ufunc__ = None
+
+    def __init__(self, value: np.ndarray, derivatives: dict[str, np.ndarray | float] | None = None) -> None:
+        self.value = value
+        self.derivatives = derivatives if derivatives is not None else {}
+
+    @classmethod
+    def variable(cls, name: str, value: np.ndarray) -> Dual:
+        """
+        An input, with a derivative of 1 with respect to itself
+
+        The seed is a plain 1 that broadcasts against the value, so derivatives only become arrays once they're scaled by one
+        """
+        return cls(value, {name: 1.0})
+
+    def __repr__(self) -> str:
+        return f"Dual({self.value!r}, {self.derivatives!r})"
+
+    def __neg__(self) -> Dual:
+        return Dual(-self.value, {name: -derivative for name, derivative in self.derivatives.items()})
+
+    def __add__(self, other: Dual | float | np.ndarray) -> Dual:
+        if not isinstance(other, Dual):
+            return Dual(self.value + other, self.derivatives)
+
+        return Dual(self.value + other.value, _combine(self.derivatives, 1, other.derivatives, 1))
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Dual | float | np.ndarray) -> Dual:
+        if not isinstance(other, Dual):
+            return Dual(self.value - other, self.derivatives)
+
+        return Dual(self.value - other.value, _combine(self.derivatives, 1, other.derivatives, -1))
+
+    def __rsub__(self, other: float | np.ndarray) -> Dual:
+        return Dual(other - self.value, {name: -derivative for name, derivative in self.derivatives.items()})
+
+    def __mul__(self, other: Dual | float | np.ndarray) -> Dual:
+        if not isinstance(other, Dual):
+            return Dual(self.value * other, {name: derivative * other for name, derivative in self.derivatives.items()})
+
+        # (ab)' = b a' + a b'
+        return Dual(self.value * other.value, _combine(self.derivatives, other.value, other.derivatives, self.value))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Dual | float | np.ndarray) -> Dual:
+        if not isinstance(other, Dual):
+            return Dual(self.value / other, {name: derivative / other for name, derivative in self.derivatives.items()})
+
+        # (a/b)' = a'/b - (a/b) b'/b
+        value = self.value / other.value
+        reciprocal = 1 / other.value
+
+        return Dual(value, _combine(self.derivatives, reciprocal, other.derivatives, -value * reciprocal))
+
+    def __rtruediv__(self, other: float | np.ndarray) -> Dual:
+        # (c/b)' = -(c/b) b'/b
+        value = other / self.value
+
+        return Dual(value, {name: derivative * (-value / self.value) for name, derivative in self.derivatives.items()})
+
+    def __pow__(self, exponent: Dual | float | np.ndarray) -> Dual:
+        value = self.value ** exponent.value if isinstance(exponent, Dual) else self.value ** exponent
+
+        if not isinstance(exponent, Dual):
+            # (a^c)' = c a^(c - 1) a'
+            scale = exponent * (self.value ** (exponent - 1))
+            return Dual(value, {name: derivative * scale for name, derivative in self.derivatives.items()})
+
+        # (a^b)' = a^b (b a'/a + ln(a) b')
+        return Dual(value, _combine(self.derivatives, value * exponent.value / self.value, exponent.derivatives, value * np.log(self.value)))
+
+    def __rpow__(self, base: float | np.ndarray) -> Dual:
+        # (c^b)' = c^b ln(c) b'
+        value = base ** self.value
+        scale = value * np.log(base)
+
+        return Dual(value, {name: derivative * scale for name, derivative in self.derivatives.items()})
+
+
+def _combine(first: dict[str, np.ndarray], first_scale, second: dict[str, np.ndarray], second_scale) -> dict[str, np.ndarray]:
+    """
+    first_scale * first + second_scale * second, for derivative dicts where a missing entry is zero
+    """
+    combined = {name: _scale(derivative, first_scale) for name, derivative in first.items() if name not in second}
+
+    for name, derivative in second.items():
+        if name in first:
+            combined[name] = _scale(first[name], first_scale) + _scale(derivative, second_scale)
+        else:
+            combined[name] = _scale(derivative, second_scale)
+
+    return combined
+
+def _scale(derivative: np.ndarray, scale) -> np.ndarray:
+    if isinstance(scale, int):
+        if scale == 1:
+            return derivative
+        if scale == -1:
+            return -derivative
+
+    return derivative * scale
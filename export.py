@@ -0,0 +1,386 @@
+from __future__ import annotations
+from bisect import bisect_left
+from collections.abc import Iterable
+import datetime as dt
+from functools import lru_cache
+import html
+from itertools import islice
+import json
+import math
+from operator import attrgetter
+from string import Formatter
+from typing import TYPE_CHECKING, TextIO
+
+from calculations import OTTO_CYCLE_INPUTS
+from cycle import OttoCycleResult
+from units import US, UnitSystem
+
+# NumPy is only needed for blocks of arrays, keeping it out of the calculator's startup path
+if TYPE_CHECKING:
+    import numpy as np
+
+
+REPORT_FORMATS = ("text", "csv", "jsonl", "json", "html")
+
+
+# Columns of an exported result in report order as (column, source), where the source is an input or output name, or None for values that are always 0
+REPORT_COLUMNS: tuple[tuple[str, str | None], ...] = (
+    # Inputs
+    ("compression_ratio", "compression_ratio"),
+    ("specific_heat_pressure", "specific_heat_pressure"),
+    ("specific_heat_volume", "specific_heat_volume"),
+    ("adiabatic_index", "adiabatic_index"),
+    ("gas_constant", "gas_constant"),
+    ("engine_displacement", "engine_displacement"),
+    ("initial_pressure", "initial_pressure"),
+    ("initial_temperature", "initial_temperature"),
+    ("operating_temperature", "operating_temperature"),
+    
+    # General
+    ("air_mass", "air_mass"),
+    ("total_work", "total_work"),
+    ("thermal_efficiency", "thermal_efficiency"),
+    
+    # Stage 1 -> 2 (Adiabatic Compression)
+    ("stage_1_initial_pressure", "initial_pressure"),
+    ("stage_1_initial_temperature", "initial_temperature"),
+    ("stage_1_initial_volume", "initial_volume"),
+    ("stage_1_final_pressure", "stage_1_final_pressure"),
+    ("stage_1_final_temperature", "stage_1_final_temperature"),
+    ("stage_1_final_volume", "stage_1_final_volume"),
+    ("stage_1_heat", None),
+    ("stage_1_work", "stage_1_work"),
+    
+    # Stage 2 -> 3 (Combustion)
+    ("stage_2_initial_pressure", "stage_1_final_pressure"),
+    ("stage_2_initial_temperature", "stage_1_final_temperature"),
+    ("stage_2_initial_volume", "stage_1_final_volume"),
+    ("stage_2_final_pressure", "stage_2_final_pressure"),
+    ("stage_2_final_temperature", "operating_temperature"),
+    ("stage_2_final_volume", "stage_1_final_volume"),
+    ("stage_2_heat", "stage_2_heat"),
+    ("stage_2_work", None),
+    
+    # Stage 3 -> 4 (Adiabatic Expansion)
+    ("stage_3_initial_pressure", "stage_2_final_pressure"),
+    ("stage_3_initial_temperature", "operating_temperature"),
+    ("stage_3_initial_volume", "stage_1_final_volume"),
+    ("stage_3_final_pressure", "stage_3_final_pressure"),
+    ("stage_3_final_temperature", "stage_3_final_temperature"),
+    ("stage_3_final_volume", "initial_volume"),
+    ("stage_3_heat", None),
+    ("stage_3_work", "stage_3_work"),
+    
+    # Stage 4 -> 1 (Heat Rejection)
+    ("stage_4_initial_pressure", "stage_3_final_pressure"),
+    ("stage_4_initial_temperature", "stage_3_final_temperature"),
+    ("stage_4_initial_volume", "initial_volume"),
+    ("stage_4_final_pressure", "initial_pressure"),
+    ("stage_4_final_temperature", "initial_temperature"),
+    ("stage_4_final_volume", "initial_volume"),
+    ("stage_4_heat", "stage_4_heat"),
+    ("stage_4_work", None)
+)
+
+
+# Body of the text report of one cycle, {name:format} fields are input or output values and {quantity} fields are unit symbols
+_TEXT_REPORT = """Inputs:
+	Compression Ratio (CR): {compression_ratio:.2f}
+	Specific Heat at Constant Pressure (C_p): {specific_heat_pressure:.3f} {specific_heat}
+	Specific Heat at Constant Volume (C_v): {specific_heat_volume:.3f} {specific_heat}
+	Adiabatic Index (k): {adiabatic_index:.4f}
+	Gas Constant (R): {gas_constant:.4f} {gas_constant_unit}
+	Engine Displacement (deltaV): {engine_displacement:.2f} {volume}
+	Initial Pressure (P_1): {initial_pressure:.2f} {pressure}
+	Initial Temperature (T_1): {initial_temperature:.2f} {temperature}
+	Operating Temperature (T_3): {operating_temperature:.2f} {temperature}
+
+
+Outputs:
+	General:
+		Air Mass (m_air): {air_mass:.4f} {mass}
+		Total Work (Work_total): {total_work:.2f} {energy}
+		Thermal Efficiency (Efficiency): {thermal_efficiency_percent:.2f}%
+
+	Stage 1 -> 2 (Adiabatic Compression):
+		Initial Pressure (P_1): {initial_pressure:.2f} {pressure}
+		Initial Temperature (T_1): {initial_temperature:.2f} {temperature}
+		Initial Volume (V_1): {initial_volume:.2f} {volume}
+		Final Pressure (P_2): {stage_1_final_pressure:.2f} {pressure}
+		Final Temperature (T_2): {stage_1_final_temperature:.2f} {temperature}
+		Final Volume (V_2): {stage_1_final_volume:.2f} {volume}
+		Heat (Q_1): 0 {energy}
+		Work (Work_1): {stage_1_work:.2f} {energy}
+
+	Stage 2 -> 3 (Combustion):
+		Initial Pressure (P_2): {stage_1_final_pressure:.2f} {pressure}
+		Initial Temperature (T_2): {stage_1_final_temperature:.2f} {temperature}
+		Initial Volume (V_2): {stage_1_final_volume:.2f} {volume}
+		Final Pressure (P_3): {stage_2_final_pressure:.2f} {pressure}
+		Final Temperature (T_3): {operating_temperature:.2f} {temperature}
+		Final Volume (V_3): {stage_1_final_volume:.2f} {volume}
+		Heat (Q_2): {stage_2_heat:.2f} {energy}
+		Work (Work_2): 0 {energy}
+
+	Stage 3 -> 4 (Adiabatic Expansion):
+		Initial Pressure (P_3): {stage_2_final_pressure:.2f} {pressure}
+		Initial Temperature (T_3): {operating_temperature:.2f} {temperature}
+		Initial Volume (V_3): {stage_1_final_volume:.2f} {volume}
+		Final Pressure (P_4): {stage_3_final_pressure:.2f} {pressure}
+		Final Temperature (T_4): {stage_3_final_temperature:.2f} {temperature}
+		Final Volume (V_4): {initial_volume:.2f} {volume}
+		Heat (Q_3): 0 {energy}
+		Work (Work_3): {stage_3_work:.2f} {energy}
+
+	Stage 4 -> 1 (Heat Rejection):
+		Initial Pressure (P_4): {stage_3_final_pressure:.2f} {pressure}
+		Initial Temperature (T_4): {stage_3_final_temperature:.2f} {temperature}
+		Initial Volume (V_4): {initial_volume:.2f} {volume}
+		Final Pressure (P_1): {initial_pressure:.2f} {pressure}
+		Final Temperature (T_1): {initial_temperature:.2f} {temperature}
+		Final Volume (V_1): {initial_volume:.2f} {volume}
+		Heat (Q_4): {stage_4_heat:.2f} {energy}
+		Work (Work_4): 0 {energy}
+
+
+"""
+
+_TEXT_FOOTER = "Otto Cycle Calcultor. © 2025 Nicholas Ewing. All rights reserved."
+
+# Rows formatted and written together, bounding the size of each write
+_ROWS_PER_WRITE = 2048
+
+
+class ReportWriter:
+    """
+    Writes solved cycles to a file as text reports, CSV, JSON Lines, a JSON array or an HTML table
+
+    Each format's row template is compiled once, and each run of rows is formatted with one `%` per row and written with a single `write`, so exports stream in bounded memory however many cycles there are. Use it as a context manager to write the format's header and footer. Text reports use the calculator's fixed decimals, the other formats `precision` significant digits with empty (CSV, HTML) or null (JSON) values where a cycle isn't valid
+    """
+    def __init__(self, file: TextIO, output_format: str = "text", units: UnitSystem = US, app_version: str | None = None, keep: list[str] | None = None, precision: int = 12) -> None:
+        if output_format not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format {output_format!r}, expected one of {', '.join(REPORT_FORMATS)}")
+        if keep and output_format == "text":
+            raise ValueError("Kept columns can't be written to text reports")
+
+        self.file = file
+        self.output_format = output_format
+        self.units = units
+        self.app_version = app_version
+        self.keep = list(keep or [])
+        self.precision = precision
+        self.rows_written = 0
+
+        self._template = _text_template(units) if output_format == "text" else _row_template(output_format, precision)
+
+    def __enter__(self) -> ReportWriter:
+        self.write_header()
+
+        return self
+
+    def __exit__(self, exception_type: type[BaseException] | None, *_: object) -> None:
+        if exception_type is None:
+            self.write_footer()
+
+    def write_header(self) -> None:
+        generated = f"Generated by Otto Cycle Calculator{f' {self.app_version}' if self.app_version is not None else ''} on {dt.datetime.now().strftime('%B %d, %Y %I:%M:%S %p')}"
+
+        if self.output_format == "text":
+            self.file.write(f"Otto Cycle Calculator Results:\n{generated}\n\n\n")
+        elif self.output_format == "csv":
+            self.file.write(",".join(_csv_field(column) for column in self.keep + [column for column, _ in REPORT_COLUMNS]) + "\n")
+        elif self.output_format == "json":
+            self.file.write("[\n")
+        elif self.output_format == "html":
+            header_cells = "".join(f"<th>{html.escape(column)}</th>" for column in self.keep)
+            header_cells += "".join(f"<th>{html.escape(column)}{f' ({html.escape(symbol)})' if (symbol := self.units.symbol(source)) else ''}</th>" if source is not None else f"<th>{html.escape(column)}</th>" for column, source in REPORT_COLUMNS)
+            self.file.write(
+                "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>Otto Cycle Calculator Results</title>\n"
+                "<style>table { border-collapse: collapse; font-family: sans-serif; font-size: 10pt; } th, td { border: 1px solid #ccc; padding: 2px 6px; text-align: right; white-space: nowrap; }</style>\n"
+                f"</head>\n<body>\n<h1>Otto Cycle Calculator Results</h1>\n<p>{html.escape(generated)} ({html.escape(self.units.name)} units)</p>\n"
+                f"<table>\n<thead>\n<tr>{header_cells}</tr>\n</thead>\n<tbody>\n"
+            )
+
+    def write_footer(self) -> None:
+        if self.output_format == "text":
+            self.file.write(_TEXT_FOOTER)
+        elif self.output_format == "json":
+            self.file.write("\n]\n" if self.rows_written else "]\n")
+        elif self.output_format == "html":
+            self.file.write(f"</tbody>\n</table>\n<p>{html.escape(_TEXT_FOOTER)}</p>\n</body>\n</html>\n")
+
+    def write_block(self, values: dict[str, np.ndarray], kept: list[list[object]] | None = None) -> int:
+        """
+        Write a block of solved cycles given as arrays of the inputs and outputs (e.g. `inputs | solve_otto_cycle_batch(**inputs)`), with `kept` holding the kept columns of each row, returning the number of rows written
+        """
+        import numpy as np
+
+        count = len(np.atleast_1d(values["thermal_efficiency"]))
+        zeros = np.zeros(count)
+        columns = [
+            np.broadcast_to(np.asarray(_source_value(values, source), dtype=np.float64), count) if source is not None else zeros
+            for source in self._template.sources
+        ]
+
+        # Only rows with non-finite values need fixing up after formatting
+        invalid = np.flatnonzero(~np.isfinite(np.stack(columns)).all(axis=0)).tolist() if self.output_format != "text" else []
+
+        for start in range(0, count, _ROWS_PER_WRITE):
+            stop = min(start + _ROWS_PER_WRITE, count)
+            rows = list(zip(*(column[start:stop].tolist() for column in columns)))
+            row_invalid = [index - start for index in islice(invalid, bisect_left(invalid, start), bisect_left(invalid, stop))]
+
+            self._write_rows(rows, row_invalid, kept[start:stop] if kept is not None else None)
+
+        return count
+
+    def write_results(self, results: Iterable[OttoCycleResult]) -> int:
+        """
+        Write solved cycles, which must be in this writer's units, returning the number written
+        """
+        count = 0
+        results = iter(results)
+
+        while block := list(islice(results, _ROWS_PER_WRITE)):
+            rows = []
+            for result in block:
+                if result.units is not self.units:
+                    raise ValueError(f"Result in {result.units.name} units can't be written to a report in {self.units.name} units")
+
+                rows.append(self._template.result_row(result))
+
+            invalid = [index for index, row in enumerate(rows) if not all(map(math.isfinite, row))] if self.output_format != "text" else []
+            self._write_rows(rows, invalid, None)
+            count += len(rows)
+
+        return count
+
+    def _write_rows(self, rows: list[tuple[float, ...]], invalid: list[int], kept: list[list[object]] | None) -> None:
+        template = self._template.template
+        lines = [template % row for row in rows]
+
+        if invalid:
+            missing = "null" if self.output_format in ("json", "jsonl") else ""
+            for index in invalid:
+                lines[index] = (template % tuple((value if math.isfinite(value) else math.nan) for value in rows[index])).replace("nan", missing)
+
+        output_format = self.output_format
+        if output_format == "text":
+            text = "".join(lines)
+        elif output_format == "csv":
+            if self.keep:
+                lines = [",".join(_csv_field(value) for value in kept_values) + "," + line for kept_values, line in zip(kept, lines)]
+            text = "".join(line + "\n" for line in lines)
+        elif output_format == "html":
+            if self.keep:
+                lines = ["".join(f"<td>{html.escape(str(value)) if value is not None else ''}</td>" for value in kept_values) + line for kept_values, line in zip(kept, lines)]
+            text = "".join("<tr>" + line + "</tr>\n" for line in lines)
+        else:
+            if self.keep:
+                lines = ["".join(json.dumps(column) + ": " + json.dumps(value) + ", " for column, value in zip(self.keep, kept_values)) + line for kept_values, line in zip(kept, lines)]
+            if output_format == "jsonl":
+                text = "".join("{" + line + "}\n" for line in lines)
+            else:
+                text = ("" if self.rows_written == 0 else ",\n") + ",\n".join("{" + line + "}" for line in lines)
+
+        self.file.write(text)
+        self.rows_written += len(rows)
+
+
+class _ReportTemplate:
+    """
+    A `%` template for one row and the sources of its values, in order
+    """
+    def __init__(self, template: str, sources: tuple[str | None, ...]) -> None:
+        self.template = template
+        self.sources = sources
+
+        # Reads a result's values in template order with one call, the percentage and always 0 values are filled in after
+        self._result_values = attrgetter(*(
+            f"inputs.{source}" if source in OTTO_CYCLE_INPUTS else ("thermal_efficiency" if source in (None, "thermal_efficiency_percent") else source)
+            for source in sources
+        ))
+        self._percent_positions = [index for index, source in enumerate(sources) if source == "thermal_efficiency_percent"]
+        self._zero_positions = [index for index, source in enumerate(sources) if source is None]
+
+    def result_row(self, result: OttoCycleResult) -> tuple[float, ...]:
+        row = self._result_values(result)
+        if not (self._percent_positions or self._zero_positions):
+            return row
+
+        row = list(row)
+        for index in self._percent_positions:
+            row[index] *= 100
+        for index in self._zero_positions:
+            row[index] = 0.0
+
+        return tuple(row)
+
+
+@lru_cache(maxsize=None)
+def _text_template(units: UnitSystem) -> _ReportTemplate:
+    """
+    Compile the text report body into a `%` template and the sources of its values, in the units' symbols
+    """
+    symbols = {quantity: getattr(units, quantity).symbol for quantity in ("pressure", "temperature", "volume", "mass", "energy")}
+    symbols["gas_constant_unit"] = units.gas_constant.symbol
+
+    # Specific heats have always been reported per °F, the same interval as °R
+    symbols["specific_heat"] = units.specific_heat.symbol.replace("°R", "°F")
+
+    template = []
+    sources = []
+    for literal, field, format_spec, _ in Formatter().parse(_TEXT_REPORT):
+        template.append(literal.replace("%", "%%"))
+        if field is None:
+            continue
+
+        if field in symbols:
+            template.append(symbols[field].replace("%", "%%"))
+        else:
+            template.append(f"%{format_spec}")
+            sources.append(field)
+
+    return _ReportTemplate("".join(template), tuple(sources))
+
+@lru_cache(maxsize=None)
+def _row_template(output_format: str, precision: int) -> _ReportTemplate:
+    """
+    Compile the `%` template of one row of the report columns
+    """
+    if output_format == "csv":
+        template = ",".join([f"%.{precision}g"] * len(REPORT_COLUMNS))
+    elif output_format == "html":
+        template = "".join([f"<td>%.{precision}g</td>"] * len(REPORT_COLUMNS))
+    else:
+        template = ", ".join(json.dumps(column) + f": %.{precision}g" for column, _ in REPORT_COLUMNS)
+
+    return _ReportTemplate(template, tuple(source for _, source in REPORT_COLUMNS))
+
+def _source_value(values: dict, source: str):
+    # The text report shows the efficiency as a percentage
+    if source == "thermal_efficiency_percent":
+        return values["thermal_efficiency"] * 100
+
+    return values[source]
+
+def _csv_field(value: object) -> str:
+    text = "" if value is None else str(value)
+    if any(character in text for character in ",\"\r\n"):
+        return '"' + text.replace('"', '""') + '"'
+
+    return text
+
+
+def write_results(file: TextIO, results: Iterable[OttoCycleResult], output_format: str = "text", units: UnitSystem = US, app_version: str | None = None, precision: int = 12) -> int:
+    """
+    Write solved cycles in `units` as a report in `output_format`, returning the number written
+    """
+    with ReportWriter(file, output_format, units, app_version, precision=precision) as writer:
+        return writer.write_results(results)
+
+def write_results_report(file: TextIO, result: OttoCycleResult, app_version: str | None = None) -> None:
+    """
+    Write the text report of a solved cycle, as saved from the calculator
+    """
+    write_results(file, (result,), "text", result.units, app_version)
@@ -1,27 +1,238 @@
 import numpy as np
 
 from calculations import *
+from profiling import span
+from units import US, UnitSystem
 
 
-def get_adiabatic_data(adiabatic_index: float, initial_pressure: float, initial_volume: float, final_volume: float) -> tuple[list[float], list[float]]:
+def get_adiabatic_data(adiabatic_index: float, initial_pressure: float, initial_volume: float, final_volume: float, points: int = 1000, out: tuple[np.ndarray, np.ndarray] | None = None, units: UnitSystem = US) -> tuple[np.ndarray, np.ndarray]:
     """
     Get the data for the first and thrid stages of the Otto cycle (Adiabatic Compression and Adiabatic Expansion)
+
+    Takes psf and ft^3 and returns contiguous float64 arrays of volumes (in^3) and pressures (psi), or the volume and pressure units of `units`, including both end points. If `out` is given the data is written into those arrays instead of allocating new ones
+    """
+    with span("graph.get_adiabatic_data"):
+        # Create the volumes from the initial volume to the final volume
+        if out is None:
+            volumes = np.linspace(initial_volume, final_volume, points)
+            pressures = np.empty(points, dtype=np.float64)
+        else:
+            volumes, pressures = out
+
+            # Filled in place the way np.linspace computes its points, ending exactly on the final volume
+            np.multiply(np.arange(len(volumes)), (final_volume - initial_volume) / max(len(volumes) - 1, 1), out=volumes)
+            volumes += initial_volume
+            if len(volumes) > 1:
+                volumes[-1] = final_volume
+
+        # Calculate the pressures for each volume, with the conversion from psf folded into the scale
+        np.divide(initial_volume, volumes, out=pressures)
+        np.power(pressures, adiabatic_index, out=pressures)
+        np.multiply(pressures, units.pressure.from_internal(initial_pressure), out=pressures)
+
+        # Convert the volumes from cubic feet
+        np.multiply(volumes, units.volume.from_internal(1), out=volumes)
+
+    return (volumes, pressures)
+
+
+def get_cycle_overlay_data(inputs: dict[str, np.ndarray], outputs: dict[str, np.ndarray], diagram: str = "pv", points: int = 100, units: UnitSystem = US) -> tuple[np.ndarray, np.ndarray]:
     """
-    # Calculate the step size to split the volume into 1000 parts 
-    step_size = (final_volume - initial_volume) * (10 ** (-3))
-    
-    
-    # Create a list of volumes from the initial volume to the final volume
-    volumes = [float(volume) for volume in np.arange(initial_volume, final_volume, step_size)]
-    
-    # Calculate the pressures for each volume
-    pressures = [calculate_pressure_adiabatic(adiabatic_index, initial_pressure, initial_volume, volume) for volume in volumes]
-    
-    
-    # Convert the volumes from cubic feet to cubic inches
-    volumes = [convert_cubic_feet_to_cubic_inches(volume) for volume in volumes]
-    
-    # Convert the pressures from psf to psi
-    pressures = [convert_psf_to_psi(pressure) for pressure in pressures]
-    
-    return (volumes, pressures)
\ No newline at end of file
+    Get the P-V ("pv") or T-s ("ts") curves of every valid cycle in a batch solve as one row per cycle of x and y
+
+    Takes the inputs and outputs of `solve_otto_cycle_batch` in `units`. Each row has 2 * `points` + 1 points and ends where it starts, so the rows packed end to end form one buffer that only needs breaking between cycles. The T-s diagram is entropy relative to state 1 against temperature, using each heat exchange's mean C_v so it holds for temperature-dependent specific heats too
+    """
+    if diagram not in ("pv", "ts"):
+        raise ValueError(f"Unknown diagram {diagram!r}, expected 'pv' or 'ts'")
+
+    valid = np.isfinite(np.asarray(outputs["thermal_efficiency"]))
+    shape = valid.shape
+
+    def internal(name: str, values: dict[str, np.ndarray]) -> np.ndarray:
+        return units.to_internal(name, np.broadcast_to(np.asarray(values[name], dtype=np.float64), shape)[valid])[:, np.newaxis]
+
+    fractions = np.linspace(0, 1, points)
+    x = np.empty((int(valid.sum()), (2 * points) + 1), dtype=np.float64)
+    y = np.empty_like(x)
+
+    if diagram == "pv":
+        initial_volume = internal("initial_volume", outputs)
+        final_volume = internal("stage_1_final_volume", outputs)
+        initial_pressure = internal("initial_pressure", inputs)
+        stage_2_final_pressure = internal("stage_2_final_pressure", outputs)
+
+        # Polytropic exponents through each stage's end states, these equal k unless the specific heats vary with temperature
+        log_compression_ratio = np.log(initial_volume / final_volume)
+        compression_index = np.log(internal("stage_1_final_pressure", outputs) / initial_pressure) / log_compression_ratio
+        expansion_index = np.log(stage_2_final_pressure / internal("stage_3_final_pressure", outputs)) / log_compression_ratio
+
+        # Stage 1 -> 2 (Adiabatic Compression)
+        compression = x[:, :points]
+        np.multiply(final_volume - initial_volume, fractions, out=compression)
+        np.add(compression, initial_volume, out=compression)
+        np.power(np.divide(initial_volume, compression, out=y[:, :points]), compression_index, out=y[:, :points])
+        np.multiply(y[:, :points], initial_pressure, out=y[:, :points])
+
+        # Stage 3 -> 4 (Adiabatic Expansion)
+        expansion = x[:, points:-1]
+        np.multiply(initial_volume - final_volume, fractions, out=expansion)
+        np.add(expansion, final_volume, out=expansion)
+        np.power(np.divide(final_volume, expansion, out=y[:, points:-1]), expansion_index, out=y[:, points:-1])
+        np.multiply(y[:, points:-1], stage_2_final_pressure, out=y[:, points:-1])
+
+        x_name, y_name = "initial_volume", "initial_pressure"
+    else:
+        initial_temperature = internal("initial_temperature", inputs)
+        stage_1_final_temperature = internal("stage_1_final_temperature", outputs)
+        operating_temperature = internal("operating_temperature", inputs)
+        stage_3_final_temperature = internal("stage_3_final_temperature", outputs)
+        air_mass = internal("air_mass", outputs)
+
+        # Mean C_v of each constant-volume process from its heat, exactly the C_v input for constant specific heats
+        heating_specific_heat = internal("stage_2_heat", outputs) / (air_mass * (operating_temperature - stage_1_final_temperature))
+        cooling_specific_heat = internal("stage_4_heat", outputs) / (air_mass * (initial_temperature - stage_3_final_temperature))
+
+        # State 1, stage 1 -> 2 is isentropic so it's the straight line to the first point of the heating curve
+        x[:, :1] = 0
+        y[:, :1] = initial_temperature
+
+        # Stage 2 -> 3 (Combustion), s = C_v ln(T / T_2)
+        heating = y[:, 1:points + 1]
+        np.multiply(operating_temperature - stage_1_final_temperature, fractions, out=heating)
+        np.add(heating, stage_1_final_temperature, out=heating)
+        np.multiply(np.log(np.divide(heating, stage_1_final_temperature, out=x[:, 1:points + 1]), out=x[:, 1:points + 1]), heating_specific_heat, out=x[:, 1:points + 1])
+
+        # Stage 4 -> 1 (Heat Rejection), stage 3 -> 4 is isentropic so it starts at the entropy of state 3
+        cooling = y[:, points + 1:]
+        np.multiply(initial_temperature - stage_3_final_temperature, fractions, out=cooling)
+        np.add(cooling, stage_3_final_temperature, out=cooling)
+        np.multiply(np.log(np.divide(cooling, stage_3_final_temperature, out=x[:, points + 1:]), out=x[:, points + 1:]), cooling_specific_heat, out=x[:, points + 1:])
+        np.add(x[:, points + 1:], x[:, points:points + 1], out=x[:, points + 1:])
+
+        x_name, y_name = "specific_heat_volume", "initial_temperature"
+
+    # Close every cycle on its first point
+    x[:, -1] = x[:, 0]
+    y[:, -1] = y[:, 0]
+
+    return (units.from_internal(x_name, x), units.from_internal(y_name, y))
+
+
+class CycleOverlay:
+    """
+    Many cycles from `get_cycle_overlay_data` drawn as a single curve, packed end to end with a `connect` mask breaking it between cycles
+
+    pyqtgraph's own clip-to-view and automatic downsampling assume sorted, evenly spaced x, which closed cycles aren't, so both are done here on the cycles' segments instead: only segments crossing a margin around the view are kept, decimated to about `max_points` points while always keeping each stage's end points. The data is only rebuilt once the view leaves that margin or is zoomed by more than 2x, panning in between just moves the existing curve
+    """
+    def __init__(self, x: np.ndarray, y: np.ndarray, max_points: int = 50_000) -> None:
+        self.x = np.ascontiguousarray(x)
+        self.y = np.ascontiguousarray(y)
+        self.max_points = max_points
+
+        self.x_min = self.x.min(axis=1, initial=np.inf)
+        self.x_max = self.x.max(axis=1, initial=-np.inf)
+        self.y_min = self.y.min(axis=1, initial=np.inf)
+        self.y_max = self.y.max(axis=1, initial=-np.inf)
+
+        # Stage end points of both diagrams' layouts
+        points = (self.x.shape[1] - 1) // 2
+        self._corners = np.unique(np.clip([0, 1, points - 1, points, points + 1, (2 * points) - 1, 2 * points], 0, self.x.shape[1] - 1))
+
+        # The region the current display data was clipped to and the view size it was decimated for
+        self._region: tuple[float, float, float, float] | None = None
+        self._view_size = (0.0, 0.0)
+
+    @property
+    def cycles(self) -> int:
+        return len(self.x)
+
+    @property
+    def bounds(self) -> tuple[float, float, float, float]:
+        """
+        (x_min, x_max, y_min, y_max) of all the cycles
+        """
+        if self.cycles == 0:
+            return (0.0, 1.0, 0.0, 1.0)
+
+        return (float(self.x_min.min()), float(self.x_max.max()), float(self.y_min.min()), float(self.y_max.max()))
+
+    def display_data(self, view: tuple[float, float, float, float] | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+        """
+        Get the packed x, y and connect arrays to draw for `view` (x_min, x_max, y_min, y_max), or for all the cycles if it isn't given
+
+        Returns None if the data last returned for a view still covers this one
+        """
+        if view is None:
+            self._region = None
+            stride = self._stride(self.x.size)
+            x, y = self._decimate(self.x, self.y, stride)
+
+            connect = np.ones(x.shape, dtype=bool)
+            connect[:, -1] = False
+
+            return (x.ravel(), y.ravel(), connect.ravel())
+
+        x_min, x_max, y_min, y_max = view
+        width = x_max - x_min
+        height = y_max - y_min
+
+        if self._region is not None:
+            region_x_min, region_x_max, region_y_min, region_y_max = self._region
+            last_width, last_height = self._view_size
+            if (
+                (region_x_min <= x_min) and (x_max <= region_x_max) and (region_y_min <= y_min) and (y_max <= region_y_max)
+                and (width <= (2 * last_width)) and (last_width <= (2 * width))
+                and (height <= (2 * last_height)) and (last_height <= (2 * height))
+            ):
+                return None
+
+        # Clip to the view grown by its own size on every side
+        region = (x_min - width, x_max + width, y_min - height, y_max + height)
+        self._region = region
+        self._view_size = (width, height)
+
+        # Cycles entirely outside the region are dropped before looking at their segments
+        rows = np.flatnonzero((self.x_max >= region[0]) & (self.x_min <= region[1]) & (self.y_max >= region[2]) & (self.y_min <= region[3]))
+        x = self.x[rows]
+        y = self.y[rows]
+
+        segments = _segments_in_view(x, y, region)
+        stride = self._stride(int(segments.sum()))
+        if stride > 1:
+            x, y = self._decimate(x, y, stride)
+            segments = _segments_in_view(x, y, region)
+
+        # Keep both ends of every segment in the region so lines leaving it still reach its edge
+        keep = np.zeros(x.shape, dtype=bool)
+        keep[:, :-1] = segments
+        keep[:, 1:] |= segments
+
+        connect = np.zeros(x.shape, dtype=bool)
+        connect[:, :-1] = segments
+
+        return (x[keep], y[keep], connect[keep])
+
+    def _stride(self, points: int) -> int:
+        return max(1, -(-points // self.max_points))
+
+    def _decimate(self, x: np.ndarray, y: np.ndarray, stride: int) -> tuple[np.ndarray, np.ndarray]:
+        if stride == 1:
+            return (x, y)
+
+        columns = np.union1d(np.arange(0, x.shape[1], stride), self._corners)
+
+        return (x[:, columns], y[:, columns])
+
+
+def _segments_in_view(x: np.ndarray, y: np.ndarray, view: tuple[float, float, float, float]) -> np.ndarray:
+    """
+    Which segments between consecutive points of each row have bounding boxes that overlap `view`
+    """
+    x_min, x_max, y_min, y_max = view
+
+    return (
+        (np.maximum(x[:, :-1], x[:, 1:]) >= x_min)
+        & (np.minimum(x[:, :-1], x[:, 1:]) <= x_max)
+        & (np.maximum(y[:, :-1], y[:, 1:]) >= y_min)
+        & (np.minimum(y[:, :-1], y[:, 1:]) <= y_max)
+    )
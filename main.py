@@ -1,21 +1,57 @@
+import time
+START_TIME = time.perf_counter()
+
 import sys
 
-from PyQt6 import QtWidgets
-import pyqtgraph as pg
+import profiling
+import startup
+
+# Run with --startup-profile to print how long each startup phase takes
+if "--startup-profile" in sys.argv:
+    sys.argv.remove("--startup-profile")
+    startup.PROFILE = startup.StartupProfile(START_TIME)
+
+# Set OTTO_PROFILE to a directory to record timing spans of the whole session and save them there on exit
+profiling.enable_from_environment()
+
+with startup.startup_phase("import"):
+    from PyQt6 import QtCore, QtWidgets
 
-from ui import MainWindow
+    from ui import MainWindow
 
 APP_VERSION = "v1.0.1"
 
+
+class FirstPaintFilter(QtCore.QObject):
+    """
+    Reports the startup profile once the main window has finished its first paint
+    """
+    def eventFilter(self, watched: QtCore.QObject, event: QtCore.QEvent) -> bool:
+        if event.type() == QtCore.QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+
+            # Queued so the mark is taken after the paint has been handled
+            QtCore.QTimer.singleShot(0, self.report)
+
+        return False
+
+    def report(self) -> None:
+        startup.PROFILE.mark("first paint")
+        startup.PROFILE.report()
+
+
 if __name__ == "__main__":
-    app = QtWidgets.QApplication(sys.argv)
-    app.setStyle("Fusion")
-    
-    # Set the default background and foreground color to white and black
-    pg.setConfigOption('background', 'w')
-    pg.setConfigOption('foreground', 'k')
-    
+    with startup.startup_phase("QApplication"):
+        app = QtWidgets.QApplication(sys.argv)
+        app.setStyle("Fusion")
+
     main_window = MainWindow(APP_VERSION)
-    main_window.show()
-    
-    sys.exit(app.exec())
\ No newline at end of file
+
+    if startup.PROFILE is not None:
+        first_paint_filter = FirstPaintFilter(main_window)
+        main_window.installEventFilter(first_paint_filter)
+
+    with startup.startup_phase("show"):
+        main_window.show()
+
+    sys.exit(app.exec())
@@ -0,0 +1,284 @@
+from __future__ import annotations
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+import math
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS, solve_otto_cycle_batch
+
+if TYPE_CHECKING:
+    from properties import PropertyTable
+
+
+@dataclass(frozen=True, slots=True)
+class Normal:
+    """
+    A normally distributed input
+    """
+    mean: float
+    standard_deviation: float
+
+    def sample(self, generator: np.random.Generator, size: int) -> np.ndarray:
+        return generator.normal(self.mean, self.standard_deviation, size)
+
+
+@dataclass(frozen=True, slots=True)
+class Uniform:
+    """
+    An input uniformly distributed over [low, high)
+    """
+    low: float
+    high: float
+
+    def sample(self, generator: np.random.Generator, size: int) -> np.ndarray:
+        return generator.uniform(self.low, self.high, size)
+
+
+@dataclass(frozen=True, slots=True)
+class Triangular:
+    """
+    An input with a triangular distribution between low and high, peaking at mode
+    """
+    low: float
+    mode: float
+    high: float
+
+    def sample(self, generator: np.random.Generator, size: int) -> np.ndarray:
+        return generator.triangular(self.low, self.mode, self.high, size)
+
+
+Distribution = Normal | Uniform | Triangular
+
+
+@dataclass(frozen=True, slots=True)
+class OutputStatistics:
+    """
+    Streaming statistics of one output over the valid samples
+
+    The histogram covers a fixed range chosen from the first chunk, with samples outside it counted in `underflow` and `overflow`. Quantiles are interpolated within the histogram bins, so they're accurate to about one bin width
+    """
+    count: int
+    mean: float
+    variance: float
+    minimum: float
+    maximum: float
+    bin_edges: np.ndarray
+    histogram: np.ndarray
+    underflow: int
+    overflow: int
+
+    @property
+    def standard_deviation(self) -> float:
+        return math.sqrt(self.variance)
+
+    def quantile(self, q):
+        """
+        Estimate the q-th quantile (0 to 1, scalar or array) from the histogram
+        """
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan)[()]
+
+        # The under and overflow counts are spread between the extremes and the histogram range
+        edges = np.concatenate(([min(self.minimum, self.bin_edges[0])], self.bin_edges, [max(self.maximum, self.bin_edges[-1])]))
+        cumulative = np.concatenate(([0], np.cumsum(np.concatenate(([self.underflow], self.histogram, [self.overflow])))))
+
+        return np.clip(np.interp(np.asarray(q) * self.count, cumulative, edges), self.minimum, self.maximum)[()]
+
+
+@dataclass(frozen=True, slots=True)
+class MonteCarloResult:
+    """
+    Statistics of every output over `samples` random cycles, `invalid` of which didn't form a valid cycle and are left out
+    """
+    samples: int
+    invalid: int
+    statistics: dict[str, OutputStatistics]
+    elapsed: float
+
+
+@dataclass(frozen=True, slots=True)
+class _ChunkStatistics:
+    # Per-output arrays, histograms are (outputs, bins + 2) with the under and overflow counts at either end
+    count: int
+    mean: np.ndarray
+    sum_of_squares: np.ndarray
+    minimum: np.ndarray
+    maximum: np.ndarray
+    histogram: np.ndarray
+
+
+def run_monte_carlo(
+    compression_ratio,
+    specific_heat_pressure,
+    specific_heat_volume,
+    gas_constant,
+    engine_displacement,
+    initial_pressure,
+    initial_temperature,
+    operating_temperature,
+    samples: int,
+    seed: int = 0,
+    chunk_size: int = 65536,
+    max_workers: int = 1,
+    bins: int = 1024,
+    properties: PropertyTable | None = None,
+    progress: Callable[[int, int, float], None] | None = None
+) -> MonteCarloResult:
+    """
+    Propagate input uncertainty through the cycle by solving `samples` random cycles in vectorized chunks
+
+    Each input is a distribution (`Normal`, `Uniform` or `Triangular`) or a fixed value. Only running statistics are kept, so memory doesn't grow with `samples`. Every chunk draws from its own generator spawned from `seed` and chunks are merged in order, so results are identical for any `max_workers`. `progress` is called after each chunk with the samples done, the total samples and the throughput in samples per second
+    """
+    if samples < 1:
+        raise ValueError("samples must be at least 1")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    distributions = (
+        compression_ratio,
+        specific_heat_pressure,
+        specific_heat_volume,
+        gas_constant,
+        engine_displacement,
+        initial_pressure,
+        initial_temperature,
+        operating_temperature
+    )
+    chunks = math.ceil(samples / chunk_size)
+    start_time = time.perf_counter()
+
+    def report(done: int) -> None:
+        if progress is not None:
+            elapsed = time.perf_counter() - start_time
+            progress(done, samples, (done / elapsed) if elapsed > 0 else 0.0)
+
+    # The first chunk fixes the histogram range, with a margin for the wider tails of the later chunks
+    first = _solve_chunk(distributions, seed, 0, min(chunk_size, samples), properties)
+    valid = first[:, ~np.isnan(first).any(axis=0)]
+    if valid.shape[1]:
+        lower, upper = valid.min(axis=1), valid.max(axis=1)
+        margin = np.maximum(upper - lower, np.maximum(np.abs(upper), 1) * 1e-9) / 2
+        lower, upper = lower - margin, upper + margin
+    else:
+        lower, upper = np.zeros(len(OTTO_CYCLE_OUTPUTS)), np.ones(len(OTTO_CYCLE_OUTPUTS))
+
+    total = _chunk_statistics(first, lower, upper, bins)
+    report(min(chunk_size, samples))
+
+    def chunk_bounds(index: int) -> tuple[int, int]:
+        return (index * chunk_size, min((index + 1) * chunk_size, samples))
+
+    if max_workers <= 1:
+        for index in range(1, chunks):
+            start, stop = chunk_bounds(index)
+            total = _merge(total, _chunk_statistics(_solve_chunk(distributions, seed, index, stop - start, properties), lower, upper, bins))
+            report(stop)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(distributions, seed, lower, upper, bins, properties)) as executor:
+            # Keep a bounded number of chunks in flight and merge them in chunk order
+            pending: deque[tuple[int, Future]] = deque()
+
+            for index in range(1, chunks):
+                start, stop = chunk_bounds(index)
+                pending.append((stop, executor.submit(_solve_worker_chunk, index, stop - start)))
+
+                if len(pending) >= (max_workers * 2):
+                    stop, future = pending.popleft()
+                    total = _merge(total, future.result())
+                    report(stop)
+
+            while pending:
+                stop, future = pending.popleft()
+                total = _merge(total, future.result())
+                report(stop)
+
+    statistics = {}
+    for index, name in enumerate(OTTO_CYCLE_OUTPUTS):
+        statistics[name] = OutputStatistics(
+            total.count,
+            float(total.mean[index]) if total.count else math.nan,
+            float(total.sum_of_squares[index] / (total.count - 1)) if total.count > 1 else math.nan,
+            float(total.minimum[index]),
+            float(total.maximum[index]),
+            np.linspace(lower[index], upper[index], bins + 1),
+            total.histogram[index, 1:-1],
+            int(total.histogram[index, 0]),
+            int(total.histogram[index, -1])
+        )
+
+    return MonteCarloResult(samples, samples - total.count, statistics, time.perf_counter() - start_time)
+
+
+def _solve_chunk(distributions: tuple, seed: int, index: int, size: int, properties: PropertyTable | None) -> np.ndarray:
+    """
+    Sample and solve one chunk, returning the outputs as an (outputs, size) array
+    """
+    generator = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+    inputs = {name: (distribution.sample(generator, size) if isinstance(distribution, Distribution) else distribution) for name, distribution in zip(OTTO_CYCLE_INPUTS, distributions)}
+    outputs = solve_otto_cycle_batch(**inputs, properties=properties)
+
+    return np.stack([np.broadcast_to(outputs[name], (size,)) for name in OTTO_CYCLE_OUTPUTS])
+
+def _chunk_statistics(values: np.ndarray, lower: np.ndarray, upper: np.ndarray, bins: int) -> _ChunkStatistics:
+    # Invalid rows are NaN in every output
+    values = values[:, ~np.isnan(values).any(axis=0)]
+    outputs, count = values.shape
+
+    if count == 0:
+        return _ChunkStatistics(0, np.zeros(outputs), np.zeros(outputs), np.full(outputs, np.inf), np.full(outputs, -np.inf), np.zeros((outputs, bins + 2), dtype=np.int64))
+
+    mean = values.mean(axis=1)
+
+    # Bin 0 is the underflow and bin bins + 1 the overflow, every output is counted in one bincount
+    indices = np.floor((values - lower[:, np.newaxis]) * (bins / (upper - lower))[:, np.newaxis])
+    indices = np.clip(indices, -1, bins).astype(np.int64) + 1
+    indices += np.arange(outputs)[:, np.newaxis] * (bins + 2)
+
+    return _ChunkStatistics(
+        count,
+        mean,
+        ((values - mean[:, np.newaxis]) ** 2).sum(axis=1),
+        values.min(axis=1),
+        values.max(axis=1),
+        np.bincount(indices.ravel(), minlength=outputs * (bins + 2)).reshape(outputs, bins + 2)
+    )
+
+def _merge(first: _ChunkStatistics, second: _ChunkStatistics) -> _ChunkStatistics:
+    """
+    Combine the statistics of two sets of samples (Chan et al.'s parallel variance update)
+    """
+    if second.count == 0:
+        return first
+    if first.count == 0:
+        return second
+
+    count = first.count + second.count
+    delta = second.mean - first.mean
+
+    return _ChunkStatistics(
+        count,
+        first.mean + (delta * (second.count / count)),
+        first.sum_of_squares + second.sum_of_squares + (delta ** 2 * (first.count * second.count / count)),
+        np.minimum(first.minimum, second.minimum),
+        np.maximum(first.maximum, second.maximum),
+        first.histogram + second.histogram
+    )
+
+
+# Distributions and histogram range for the current worker process, set once by the pool initializer instead of pickled with every chunk
+_worker_settings: tuple = ()
+
+def _init_worker(distributions: tuple, seed: int, lower: np.ndarray, upper: np.ndarray, bins: int, properties: PropertyTable | None) -> None:
+    global _worker_settings
+
+    _worker_settings = (distributions, seed, lower, upper, bins, properties)
+
+def _solve_worker_chunk(index: int, size: int) -> _ChunkStatistics:
+    distributions, seed, lower, upper, bins, properties = _worker_settings
+
+    return _chunk_statistics(_solve_chunk(distributions, seed, index, size, properties), lower, upper, bins)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import math
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS, mask_invalid, solve_otto_cycle_batch
+
+if TYPE_CHECKING:
+    from properties import PropertyTable
+
+
+_INVERSE_GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+
+
+@dataclass(frozen=True, slots=True)
+class OptimizationResult:
+    """
+    Optimized inputs and the cycle solved at them, one entry per variant
+
+    `feasible` is False for variants where no point within the bounds meets the constraints, their values are NaN
+    """
+    inputs: dict[str, np.ndarray]
+    outputs: dict[str, np.ndarray]
+    objective: np.ndarray
+    feasible: np.ndarray
+    evaluations: int
+
+
+def optimize_cycle(
+    objective: str,
+    variables: dict[str, tuple],
+    constraints: dict[str, tuple] | None = None,
+    maximize: bool = True,
+    tolerance: float = 1e-6,
+    properties: PropertyTable | None = None,
+    **fixed
+) -> OptimizationResult:
+    """
+    Find the `variables` (input name -> (lower, upper) bounds) that maximize (or minimize) an output of the cycle, subject to `constraints` (input or output name -> (minimum, maximum), either can be None)
+
+    The other inputs are given as keyword arguments. Every bound, constraint and fixed input can be an array with one value per variant, all variants are optimized together with vectorized cycle solves. Each variable's feasible range is found by bisection, which assumes each constraint is monotonic in each variable, and the objective is then maximized over it by golden-section search, which assumes it is unimodal. With several variables the later ones are optimized for every point tried for the earlier ones, so the cost grows quickly past two or three variables. `tolerance` is relative to each variable's bounds
+    """
+    constraints = constraints if constraints is not None else {}
+
+    if objective not in OTTO_CYCLE_OUTPUTS:
+        raise ValueError(f"Unknown objective {objective!r}, expected one of {', '.join(OTTO_CYCLE_OUTPUTS)}")
+    for name in variables:
+        if name not in OTTO_CYCLE_INPUTS:
+            raise ValueError(f"Unknown variable {name!r}, expected one of {', '.join(OTTO_CYCLE_INPUTS)}")
+    for name in constraints:
+        if name not in OTTO_CYCLE_INPUTS and name not in OTTO_CYCLE_OUTPUTS:
+            raise ValueError(f"Unknown constraint {name!r}, expected an input or output name")
+    missing = [name for name in OTTO_CYCLE_INPUTS if name not in variables and name not in fixed]
+    if missing:
+        raise TypeError(f"Missing fixed inputs: {', '.join(missing)}")
+    unknown = [name for name in fixed if name not in OTTO_CYCLE_INPUTS or name in variables]
+    if unknown:
+        raise TypeError(f"Unexpected fixed inputs: {', '.join(unknown)}")
+
+    # Every per-variant value is broadcast to one shape up front
+    bound_arrays = [value for lower, upper in variables.values() for value in (lower, upper)]
+    constraint_arrays = [(value if value is not None else np.nan) for minimum, maximum in constraints.values() for value in (minimum, maximum)]
+    shape = np.broadcast_shapes(*(np.shape(value) for value in (*fixed.values(), *bound_arrays, *constraint_arrays)))
+
+    optimizer = _Optimizer(
+        objective,
+        {name: _broadcast(lower, shape) for name, (lower, upper) in variables.items()},
+        {name: _broadcast(upper, shape) for name, (lower, upper) in variables.items()},
+        {name: (_broadcast(minimum if minimum is not None else -np.inf, shape), _broadcast(maximum if maximum is not None else np.inf, shape)) for name, (minimum, maximum) in constraints.items()},
+        1 if maximize else -1,
+        tolerance,
+        {name: _broadcast(value, shape) for name, value in fixed.items()},
+        properties
+    )
+
+    best = optimizer.optimize(0, {})
+    inputs = optimizer.fixed | best
+    outputs = optimizer.solve(inputs)
+    feasible = optimizer.feasible(inputs, outputs)
+
+    inputs = mask_invalid(inputs, ~feasible)
+    outputs = mask_invalid(outputs, ~feasible)
+
+    return OptimizationResult(
+        {name: inputs[name] for name in OTTO_CYCLE_INPUTS},
+        outputs,
+        outputs[objective],
+        feasible,
+        optimizer.evaluations
+    )
+
+
+class _Optimizer:
+    def __init__(self, objective: str, lower: dict[str, np.ndarray], upper: dict[str, np.ndarray], constraints: dict[str, tuple[np.ndarray, np.ndarray]], sign: int, tolerance: float, fixed: dict[str, np.ndarray], properties: PropertyTable | None) -> None:
+        self.objective = objective
+        self.variables = list(lower)
+        self.lower = lower
+        self.upper = upper
+        self.constraints = constraints
+        self.sign = sign
+        self.fixed = fixed
+        self.properties = properties
+
+        self.bisection_steps = max(1, math.ceil(math.log2(1 / tolerance)))
+        self.golden_steps = max(1, math.ceil(math.log(tolerance) / math.log(_INVERSE_GOLDEN_RATIO)))
+
+        self.evaluations = 0
+
+    def solve(self, inputs: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        self.evaluations += 1
+
+        return solve_otto_cycle_batch(**inputs, properties=self.properties)
+
+    def feasible(self, inputs: dict[str, np.ndarray], outputs: dict[str, np.ndarray]) -> np.ndarray:
+        feasible = np.isfinite(outputs[self.objective])
+        for name, (minimum, maximum) in self.constraints.items():
+            value = outputs[name] if name in outputs else inputs[name]
+            feasible &= (value >= minimum) & (value <= maximum)
+
+        return feasible
+
+    def any_feasible(self, level: int, assigned: dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Whether any values of the remaining variables meet the constraints, with monotonic constraints one of the bound corners does if any point does
+        """
+        if level == len(self.variables):
+            inputs = self.fixed | assigned
+            return self.feasible(inputs, self.solve(inputs))
+
+        name = self.variables[level]
+
+        return self.any_feasible(level + 1, assigned | {name: self.lower[name]}) | self.any_feasible(level + 1, assigned | {name: self.upper[name]})
+
+    def score(self, level: int, assigned: dict[str, np.ndarray]) -> np.ndarray:
+        """
+        The best (signed) objective over the remaining variables, -inf where nothing is feasible
+        """
+        if level == len(self.variables):
+            inputs = self.fixed | assigned
+            outputs = self.solve(inputs)
+            return np.where(self.feasible(inputs, outputs), self.sign * outputs[self.objective], -np.inf)
+
+        best = self.optimize(level, assigned)
+
+        return self.score(len(self.variables), assigned | best)
+
+    def optimize(self, level: int, assigned: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """
+        Optimize the variables from `level` on with the earlier ones held at `assigned`
+        """
+        if level == len(self.variables):
+            return {}
+
+        name = self.variables[level]
+        lower, upper = self.feasible_range(level, assigned)
+
+        # Golden-section search, keeping the interior points c < d and their scores
+        c = upper - (_INVERSE_GOLDEN_RATIO * (upper - lower))
+        d = lower + (_INVERSE_GOLDEN_RATIO * (upper - lower))
+        score_c = self.score(level + 1, assigned | {name: c})
+        score_d = self.score(level + 1, assigned | {name: d})
+
+        for _ in range(self.golden_steps):
+            keep_lower = score_c >= score_d
+
+            upper = np.where(keep_lower, d, upper)
+            lower = np.where(keep_lower, lower, c)
+            new_point = np.where(keep_lower, upper - (_INVERSE_GOLDEN_RATIO * (upper - lower)), lower + (_INVERSE_GOLDEN_RATIO * (upper - lower)))
+            new_score = self.score(level + 1, assigned | {name: new_point})
+
+            c, d, score_c, score_d = (
+                np.where(keep_lower, new_point, d),
+                np.where(keep_lower, c, new_point),
+                np.where(keep_lower, new_score, score_d),
+                np.where(keep_lower, score_c, new_score)
+            )
+
+        # A monotonic objective ends up against a bound, which the interior points only approach
+        candidates = (c, d, lower, upper)
+        scores = (score_c, score_d, self.score(level + 1, assigned | {name: lower}), self.score(level + 1, assigned | {name: upper}))
+        value, best_score = candidates[0], scores[0]
+        for candidate, candidate_score in zip(candidates[1:], scores[1:]):
+            better = candidate_score > best_score
+            value = np.where(better, candidate, value)
+            best_score = np.where(better, candidate_score, best_score)
+
+        return {name: value} | self.optimize(level + 1, assigned | {name: value})
+
+    def feasible_range(self, level: int, assigned: dict[str, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Narrow a variable's bounds to the range where the constraints can be met, by bisecting between a feasible and an infeasible bound
+        """
+        name = self.variables[level]
+        lower, upper = self.lower[name], self.upper[name]
+
+        lower_feasible = self.any_feasible(level + 1, assigned | {name: lower})
+        upper_feasible = self.any_feasible(level + 1, assigned | {name: upper})
+        bisect = lower_feasible != upper_feasible
+        if not bisect.any():
+            return (lower, upper)
+
+        good = np.where(lower_feasible, lower, upper)
+        bad = np.where(lower_feasible, upper, lower)
+        for _ in range(self.bisection_steps):
+            middle = (good + bad) / 2
+            middle_feasible = self.any_feasible(level + 1, assigned | {name: middle})
+            good = np.where(bisect & middle_feasible, middle, good)
+            bad = np.where(bisect & ~middle_feasible, middle, bad)
+
+        return (np.where(lower_feasible, lower, good), np.where(upper_feasible, upper, good))
+
+
+def _broadcast(value, shape: tuple[int, ...]) -> np.ndarray:
+    return np.array(np.broadcast_to(np.asarray(value, dtype=np.float64), shape))
@@ -0,0 +1,159 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+import math
+
+import numpy as np
+
+from calculations import *
+from sweep import ParameterSweep
+
+
+@dataclass(frozen=True, slots=True)
+class EngineDefinition:
+    """
+    An engine to map, in calculator units (in^3, Btu/lb-°R, lbf-ft/lbm-°R, °F)
+
+    `displacement` is for all cylinders. Friction mean effective pressure (psi) is a + b (N / 1000) + c (N / 1000)^2 with `friction_coefficients` (a, b, c) at N rpm
+    """
+    displacement: float
+    cylinders: int = 4
+    compression_ratio: float = 8
+    specific_heat_pressure: float = .24
+    specific_heat_volume: float = .17
+    gas_constant: float = 53.3
+    initial_temperature: float = 70
+    operating_temperature: float = 3670.33
+    strokes: int = 4
+    air_fuel_ratio: float = 14.7
+    friction_coefficients: tuple[float, float, float] = (14.0, 1.2, 0.6)
+
+
+@dataclass(frozen=True, slots=True)
+class PerformanceMap:
+    """
+    Engine performance over intake pressure (rows, psi) × engine speed (columns, rpm)
+
+    Mean effective pressures are in psi, torque in lbf-ft, power in hp, fuel flow in lbm/hr and BSFC in lbm/hp-hr
+    """
+    engine: EngineDefinition
+    engine_speeds: np.ndarray
+    intake_pressures: np.ndarray
+
+    indicated_mean_effective_pressure: np.ndarray
+    brake_mean_effective_pressure: np.ndarray
+    brake_torque: np.ndarray
+    brake_power: np.ndarray
+    fuel_flow: np.ndarray
+    brake_specific_fuel_consumption: np.ndarray
+    brake_thermal_efficiency: np.ndarray
+
+
+class PerformanceMapGenerator:
+    """
+    Builds performance maps, solving the cycle once per intake pressure and reusing the solution for every engine speed
+
+    The per-load cycle solutions are cached per engine definition and intake pressure axis, so changing only the speeds or friction is cheap. With `max_workers` above 1 the load axis is solved across a process pool, which only pays off for very long load axes
+    """
+    def __init__(self, max_workers: int = 1, cache_size: int = 64, chunk_size: int = 65536) -> None:
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+        self._load_cycles = lru_cache(maxsize=cache_size)(self._solve_loads)
+
+    def generate(self, engine: EngineDefinition, engine_speeds, intake_pressures) -> PerformanceMap:
+        engine_speeds = np.atleast_1d(np.asarray(engine_speeds, dtype=np.float64))
+        intake_pressures = np.atleast_1d(np.asarray(intake_pressures, dtype=np.float64))
+
+        total_work, air_mass, thermal_efficiency = self._load_cycles(_cycle_engine(engine), tuple(intake_pressures.tolist()))
+
+        # Loads down the rows, speeds across the columns
+        total_work = total_work[:, np.newaxis] * engine.cylinders
+        air_mass = air_mass[:, np.newaxis] * engine.cylinders
+        thermal_efficiency = thermal_efficiency[:, np.newaxis]
+        thousand_rpm = engine_speeds[np.newaxis, :] / 1000
+
+        displacement = convert_cubic_inches_to_cubic_feet(engine.displacement)
+        cycles_per_minute = engine_speeds[np.newaxis, :] * (2 / engine.strokes)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            indicated_mean_effective_pressure = convert_psf_to_psi(convert_btu_to_ft_lbf(total_work) / displacement)
+            friction_mean_effective_pressure = engine.friction_coefficients[0] + (engine.friction_coefficients[1] * thousand_rpm) + (engine.friction_coefficients[2] * thousand_rpm ** 2)
+            brake_mean_effective_pressure = indicated_mean_effective_pressure - friction_mean_effective_pressure
+
+            # Brake work per cycle (ft-lbf), a cycle takes strokes / 2 revolutions
+            brake_work = convert_psi_to_psf(brake_mean_effective_pressure) * displacement
+            brake_torque = brake_work / (math.pi * engine.strokes)
+            brake_power = brake_work * cycles_per_minute / 33000
+
+            fuel_flow = (air_mass / engine.air_fuel_ratio) * cycles_per_minute * 60
+            brake_specific_fuel_consumption = np.where(brake_power > 0, fuel_flow / brake_power, np.nan)
+            brake_thermal_efficiency = thermal_efficiency * (brake_mean_effective_pressure / indicated_mean_effective_pressure)
+
+        return PerformanceMap(
+            engine,
+            engine_speeds,
+            intake_pressures,
+            np.broadcast_to(indicated_mean_effective_pressure, brake_mean_effective_pressure.shape).copy(),
+            brake_mean_effective_pressure,
+            brake_torque,
+            brake_power,
+            fuel_flow,
+            brake_specific_fuel_consumption,
+            brake_thermal_efficiency
+        )
+
+    def cache_info(self):
+        return self._load_cycles.cache_info()
+
+    def clear_cache(self) -> None:
+        self._load_cycles.cache_clear()
+
+    def _solve_loads(self, engine: EngineDefinition, intake_pressures: tuple[float, ...]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Solve one cylinder's cycle at each intake pressure, returning read-only total work (Btu), air mass (lbm) and thermal efficiency
+        """
+        sweep = ParameterSweep(
+            engine.compression_ratio,
+            engine.specific_heat_pressure,
+            engine.specific_heat_volume,
+            engine.gas_constant,
+            engine.displacement / engine.cylinders,
+            intake_pressures,
+            engine.initial_temperature,
+            engine.operating_temperature,
+            chunk_size=self.chunk_size,
+            max_workers=self.max_workers
+        )
+
+        chunks = list(sweep.run())
+        values = tuple(np.concatenate([chunk.outputs[name] for chunk in chunks]) for name in ("total_work", "air_mass", "thermal_efficiency"))
+
+        # Cached arrays are shared between maps
+        for value in values:
+            value.flags.writeable = False
+
+        return values
+
+
+def _cycle_engine(engine: EngineDefinition) -> EngineDefinition:
+    # Only the fields the cycle depends on, so friction or fuel calibration changes reuse the cached cycle solutions
+    return EngineDefinition(
+        engine.displacement,
+        engine.cylinders,
+        engine.compression_ratio,
+        engine.specific_heat_pressure,
+        engine.specific_heat_volume,
+        engine.gas_constant,
+        engine.initial_temperature,
+        engine.operating_temperature
+    )
+
+
+_default_generator = PerformanceMapGenerator()
+
+def generate_performance_map(engine: EngineDefinition, engine_speeds, intake_pressures) -> PerformanceMap:
+    """
+    Build a performance map in-process, sharing one cache across calls
+    """
+    return _default_generator.generate(engine, engine_speeds, intake_pressures)
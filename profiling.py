@@ -0,0 +1,211 @@
+from __future__ import annotations
+import atexit
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import TYPE_CHECKING, ContextManager, TextIO
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+# Set to a directory to record a profile from startup and save it there on exit, with OTTO_PROFILE_CPROFILE=1 to include a cProfile of the main thread
+PROFILE_ENVIRONMENT_VARIABLE = "OTTO_PROFILE"
+CPROFILE_ENVIRONMENT_VARIABLE = "OTTO_PROFILE_CPROFILE"
+
+_DISABLED = nullcontext()
+
+
+class Profiler:
+    """
+    Records timing spans and counters from any thread, and optionally a cProfile of the thread it was created on
+
+    Spans are saved as a Chrome trace (chrome://tracing, Perfetto or speedscope show it as a flame graph) and summarized with the counters in a metrics JSON. cProfile output is a pstats file for snakeviz, flameprof or `python -m pstats`
+    """
+    def __init__(self, cprofile: bool = False) -> None:
+        self.start = time.perf_counter()
+        self.recording = True
+
+        # (name, thread id, start relative to the profiler's, duration) in seconds
+        self.spans: list[tuple[str, int, float, float]] = []
+        self.counters: dict[str, float] = {}
+
+        self._thread_names: dict[int, str] = {}
+        self._counter_lock = threading.Lock()
+
+        self._cprofile: cProfile.Profile | None = None
+        if cprofile:
+            # Imported here so it isn't loaded on startup when profiling is off
+            import cProfile
+
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+
+            thread_id = threading.get_ident()
+            if thread_id not in self._thread_names:
+                self._thread_names[thread_id] = threading.current_thread().name
+
+            self.spans.append((name, thread_id, start - self.start, end - start))
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self._counter_lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def stop(self) -> None:
+        self.recording = False
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+    def metrics(self) -> dict[str, object]:
+        """
+        Count, total, mean, median, 99th percentile and maximum duration in milliseconds of each span name, and the counters
+        """
+        durations: dict[str, list[float]] = {}
+        for name, _, _, duration in list(self.spans):
+            durations.setdefault(name, []).append(duration * 1000)
+
+        spans = {}
+        for name, values in sorted(durations.items()):
+            values.sort()
+            spans[name] = {
+                "count": len(values),
+                "total_ms": sum(values),
+                "mean_ms": sum(values) / len(values),
+                "p50_ms": values[(len(values) - 1) // 2],
+                "p99_ms": values[min(round(.99 * (len(values) - 1)), len(values) - 1)],
+                "max_ms": values[-1]
+            }
+
+        return {"duration_ms": (time.perf_counter() - self.start) * 1000, "spans": spans, "counters": dict(self.counters)}
+
+    def write_trace(self, file: TextIO) -> None:
+        """
+        Write the spans as complete ("X") events in the Chrome trace event format
+        """
+        process_id = os.getpid()
+
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": process_id, "tid": thread_id, "args": {"name": thread_name}}
+            for thread_id, thread_name in list(self._thread_names.items())
+        ]
+        events.extend(
+            {"name": name, "ph": "X", "pid": process_id, "tid": thread_id, "ts": start * 1e6, "dur": duration * 1e6}
+            for name, thread_id, start, duration in list(self.spans)
+        )
+
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def write_metrics(self, file: TextIO) -> None:
+        json.dump(self.metrics(), file, indent=4)
+
+    def save(self, directory: str | Path) -> list[Path]:
+        """
+        Save trace.json, metrics.json and, with cProfile on, profile.prof into `directory`, returning the paths written
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        paths = [directory / "trace.json", directory / "metrics.json"]
+        with open(paths[0], "w", encoding="utf-8") as file:
+            self.write_trace(file)
+        with open(paths[1], "w", encoding="utf-8") as file:
+            self.write_metrics(file)
+
+        # Dumping the stats stops cProfile, so it is restarted if still recording
+        if self._cprofile is not None:
+            paths.append(directory / "profile.prof")
+            self._cprofile.dump_stats(paths[-1])
+            if self.recording:
+                self._cprofile.enable()
+
+        return paths
+
+
+# The profiler that is recording, None while profiling is off
+PROFILER: Profiler | None = None
+
+def span(name: str) -> ContextManager[None]:
+    """
+    Time a block as a span if profiling is on, otherwise do nothing
+    """
+    if PROFILER is None:
+        return _DISABLED
+
+    return PROFILER.span(name)
+
+def count(name: str, value: float = 1) -> None:
+    """
+    Add to a counter if profiling is on
+    """
+    if PROFILER is not None:
+        PROFILER.count(name, value)
+
+def timed_steps(steps: list[tuple[str, Callable[..., float], tuple[str, ...]]], prefix: str) -> list[tuple[str, Callable[..., float], tuple[str, ...]]]:
+    """
+    Wrap the functions of (output, function, dependencies) steps so each call is a span named `prefix` + output, the steps are returned as they are while profiling is off
+    """
+    profiler = PROFILER
+    if profiler is None:
+        return steps
+
+    def timed(name: str, function: Callable[..., float]) -> Callable[..., float]:
+        def step(*args: float) -> float:
+            with profiler.span(name):
+                return function(*args)
+
+        return step
+
+    return [(output, timed(prefix + output, function), dependencies) for output, function, dependencies in steps]
+
+def enable(cprofile: bool = False) -> Profiler:
+    """
+    Start recording with a new profiler, replacing any that is recording
+    """
+    global PROFILER
+
+    disable()
+    PROFILER = Profiler(cprofile)
+
+    return PROFILER
+
+def disable() -> Profiler | None:
+    """
+    Stop recording, returning the profiler that was recording so it can still be saved
+    """
+    global PROFILER
+
+    profiler, PROFILER = PROFILER, None
+    if profiler is not None:
+        profiler.stop()
+
+    return profiler
+
+def enable_from_environment() -> Profiler | None:
+    """
+    Start recording if OTTO_PROFILE names a directory, saving the profile there when the process exits
+    """
+    directory = os.environ.get(PROFILE_ENVIRONMENT_VARIABLE)
+    if not directory:
+        return None
+
+    profiler = enable(os.environ.get(CPROFILE_ENVIRONMENT_VARIABLE, "") not in ("", "0"))
+
+    def save() -> None:
+        profiler.stop()
+        profiler.save(directory)
+
+    atexit.register(save)
+
+    return profiler
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import numpy as np
+
+from calculations import *
+from units import US, UnitSystem
+
+
+# Ideal-gas c_p = a + bT + cT^2 + dT^3 in kJ/kmol-K with T in K, valid from 273 K to 1800 K (Cengel, Thermodynamics, Table A-2c)
+_POLYNOMIALS = {
+    "N2": (28.90, -0.1571e-2, 0.8081e-5, -2.873e-9),
+    "O2": (25.48, 1.520e-2, -0.7155e-5, 1.312e-9),
+    "CO2": (22.26, 5.981e-2, -3.501e-5, 7.469e-9),
+    "H2O": (32.24, 0.1923e-2, 1.055e-5, -3.595e-9),
+    "air": (28.11, 0.1967e-2, 0.4802e-5, -1.966e-9)
+}
+_MOLAR_MASSES = {"N2": 28.013, "O2": 31.999, "CO2": 44.01, "H2O": 18.015, "air": 28.97}
+_POLYNOMIAL_RANGE_KELVIN = (273, 1800)
+
+# Gas compositions as mole fractions, combustion gas is the products of stoichiometric iso-octane (C8H18) and air
+GASES = {
+    "air": {"air": 1.0},
+    "combustion_gas": {"CO2": 8 / 64, "H2O": 9 / 64, "N2": 47 / 64}
+}
+
+# kJ/kg-K to Btu/lbm-°R
+_KJ_PER_KG_KELVIN_TO_BTU_PER_LBM_RANKINE = 0.238846
+
+# Rows of the lookup table
+_SPECIFIC_HEAT_PRESSURE, _ENTHALPY, _ENTROPY = range(3)
+
+
+class PropertyTable:
+    """
+    Temperature-dependent c_p(T), c_v(T) and k(T) of an ideal gas, compiled from polynomial data into dense lookup tables over `temperature_range` (°R)
+
+    Outside the polynomials' valid range (273 K to 1800 K) c_p is held at its value at the nearest end. c_v = c_p - R uses each cycle's gas constant, so only the gas constant input is used, not the constant C_p and C_v inputs
+    """
+    def __init__(self, gas: str = "air", temperature_range: tuple[float, float] = (360, 6000), step: float = 1.0) -> None:
+        if gas not in GASES:
+            raise ValueError(f"Unknown gas {gas!r}, expected one of {', '.join(GASES)}")
+
+        self.gas = gas
+        self.temperature_min, self.temperature_max = temperature_range
+        self.step = step
+
+        temperatures = np.arange(self.temperature_min, self.temperature_max + step, step, dtype=np.float64)
+        self.temperatures = temperatures
+
+        # c_p in Btu/lbm-°R from the mole-fraction weighted polynomials
+        composition = GASES[gas]
+        molar_mass = sum(fraction * _MOLAR_MASSES[species] for species, fraction in composition.items())
+        kelvin = np.clip(temperatures / 1.8, *_POLYNOMIAL_RANGE_KELVIN)
+        molar_specific_heat = sum(fraction * np.polynomial.polynomial.polyval(kelvin, _POLYNOMIALS[species]) for species, fraction in composition.items())
+        specific_heat_pressure = molar_specific_heat / molar_mass * _KJ_PER_KG_KELVIN_TO_BTU_PER_LBM_RANKINE
+
+        # Enthalpy h(T) = ∫c_p dT (Btu/lbm) and entropy function s°(T) = ∫c_p/T dT (Btu/lbm-°R), relative to the lowest table temperature
+        enthalpy = np.concatenate(([0.0], np.cumsum((specific_heat_pressure[1:] + specific_heat_pressure[:-1]) * (step / 2))))
+        specific_heat_over_temperature = specific_heat_pressure / temperatures
+        entropy = np.concatenate(([0.0], np.cumsum((specific_heat_over_temperature[1:] + specific_heat_over_temperature[:-1]) * (step / 2))))
+
+        # One row per property so every property at a temperature comes from a single segment lookup
+        self._table = _LookupTable(np.stack((specific_heat_pressure, enthalpy, entropy)), self.temperature_min, step)
+
+    def __repr__(self) -> str:
+        return f"PropertyTable({self.gas!r}, temperature_range=({self.temperature_min!r}, {self.temperature_max!r}), step={self.step!r})"
+
+    def specific_heat_pressure(self, temperature: np.ndarray) -> np.ndarray:
+        return self._table(temperature, _SPECIFIC_HEAT_PRESSURE)
+
+    def specific_heat_volume(self, temperature: np.ndarray, gas_constant: np.ndarray) -> np.ndarray:
+        return self.specific_heat_pressure(temperature) - _gas_constant_btu(gas_constant)
+
+    def adiabatic_index(self, temperature: np.ndarray, gas_constant: np.ndarray) -> np.ndarray:
+        specific_heat_pressure = self.specific_heat_pressure(temperature)
+
+        return specific_heat_pressure / (specific_heat_pressure - _gas_constant_btu(gas_constant))
+
+    def internal_energy(self, temperature: np.ndarray, gas_constant: np.ndarray) -> np.ndarray:
+        """
+        u(T) = h(T) - RT in Btu/lbm, relative to an arbitrary reference
+        """
+        return self._table(temperature, _ENTHALPY) - (_gas_constant_btu(gas_constant) * temperature)
+
+    def isentropic_temperature(self, initial_temperature: np.ndarray, volume_ratio: np.ndarray, gas_constant: np.ndarray, iterations: int = 2) -> np.ndarray:
+        """
+        Temperature (°R) after an isentropic process from `initial_temperature` with V_initial / V_final = `volume_ratio`
+
+        Solves ∫c_v/T dT = R ln(volume_ratio) with Newton's method, starting from the constant-property solution at the initial temperature
+        """
+        gas_constant = _gas_constant_btu(gas_constant)
+
+        specific_heat_pressure, entropy = self._table(initial_temperature, _SPECIFIC_HEAT_PRESSURE, _ENTROPY)
+        target = entropy - (gas_constant * np.log(initial_temperature / volume_ratio))
+        temperature = initial_temperature * (volume_ratio ** (gas_constant / (specific_heat_pressure - gas_constant)))
+
+        for _ in range(iterations):
+            temperature = np.clip(temperature, self.temperature_min, self.temperature_max)
+            specific_heat_pressure, entropy = self._table(temperature, _SPECIFIC_HEAT_PRESSURE, _ENTROPY)
+            error = entropy - (gas_constant * np.log(temperature)) - target
+            temperature = temperature - (error * temperature / (specific_heat_pressure - gas_constant))
+
+        return temperature
+
+    def solve_otto_cycle_batch(self, compression_ratio, specific_heat_pressure, specific_heat_volume, gas_constant, engine_displacement, initial_pressure, initial_temperature, operating_temperature, units: UnitSystem | None = None) -> dict[str, np.ndarray]:
+        """
+        Variable-property version of `solve_otto_cycle_batch`, same inputs, outputs and units
+
+        The constant C_p and C_v inputs are ignored, `adiabatic_index` is reported at the initial temperature
+        """
+        (
+            compression_ratio,
+            gas_constant,
+            engine_displacement,
+            initial_pressure,
+            initial_temperature,
+            operating_temperature
+        ) = np.broadcast_arrays(*(np.asarray(value, dtype=np.float64) for value in (
+            compression_ratio,
+            gas_constant,
+            engine_displacement,
+            initial_pressure,
+            initial_temperature,
+            operating_temperature
+        )))
+
+        units = units if units is not None else US
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            # Normalize to the internal units once
+            initial_pressure_psf = units.pressure.to_internal(initial_pressure)
+            initial_temperature_rankine = units.temperature.to_internal(initial_temperature)
+            operating_temperature_rankine = units.temperature.to_internal(operating_temperature)
+            gas_constant = units.gas_constant.to_internal(gas_constant)
+
+            adiabatic_index = self.adiabatic_index(initial_temperature_rankine, gas_constant)
+            initial_volume = calculate_initial_volume(compression_ratio, units.volume.to_internal(engine_displacement))
+            air_mass = calculate_air_mass(initial_pressure_psf, initial_temperature_rankine, initial_volume, gas_constant)
+
+            initial_energy = self.internal_energy(initial_temperature_rankine, gas_constant)
+            operating_energy = self.internal_energy(operating_temperature_rankine, gas_constant)
+
+            # Stage 1 -> 2 (Adiabatic Compression), work from the change in internal energy
+            stage_1_final_temperature = self.isentropic_temperature(initial_temperature_rankine, compression_ratio, gas_constant)
+            stage_1_final_pressure = initial_pressure_psf * compression_ratio * (stage_1_final_temperature / initial_temperature_rankine)
+            stage_1_final_volume = calculate_final_volume(compression_ratio, initial_volume)
+            stage_1_final_energy = self.internal_energy(stage_1_final_temperature, gas_constant)
+            stage_1_work = air_mass * (initial_energy - stage_1_final_energy)
+
+            # Stage 2 -> 3 (Combustion)
+            stage_2_final_pressure = calculate_final_pressure_constant_volume(stage_1_final_pressure, operating_temperature_rankine, stage_1_final_temperature)
+            stage_2_heat = air_mass * (operating_energy - stage_1_final_energy)
+
+            # Stage 3 -> 4 (Adiabatic Expansion)
+            stage_3_final_temperature = self.isentropic_temperature(operating_temperature_rankine, 1 / compression_ratio, gas_constant)
+            stage_3_final_pressure = stage_2_final_pressure * (stage_3_final_temperature / operating_temperature_rankine) / compression_ratio
+            stage_3_final_energy = self.internal_energy(stage_3_final_temperature, gas_constant)
+            stage_3_work = air_mass * (operating_energy - stage_3_final_energy)
+
+            # Stage 4 -> 1 (Heat Rejection)
+            stage_4_heat = air_mass * (initial_energy - stage_3_final_energy)
+
+            total_work = calculate_total_work(stage_1_work, stage_3_work)
+            thermal_efficiency = calculate_thermal_efficiency(total_work, stage_2_heat)
+
+        outputs = units.values_from_internal({
+            "adiabatic_index": adiabatic_index,
+            "initial_volume": initial_volume,
+            "air_mass": air_mass,
+            "stage_1_final_pressure": stage_1_final_pressure,
+            "stage_1_final_temperature": stage_1_final_temperature,
+            "stage_1_final_volume": stage_1_final_volume,
+            "stage_1_work": stage_1_work,
+            "stage_2_final_pressure": stage_2_final_pressure,
+            "stage_2_heat": stage_2_heat,
+            "stage_3_final_pressure": stage_3_final_pressure,
+            "stage_3_final_temperature": stage_3_final_temperature,
+            "stage_3_work": stage_3_work,
+            "stage_4_heat": stage_4_heat,
+            "total_work": total_work,
+            "thermal_efficiency": thermal_efficiency
+        })
+
+        # Mask rows that can't form a valid cycle or leave the table's temperature range
+        invalid = ~(
+            (compression_ratio > 1)
+            & (gas_constant > 0)
+            & (initial_temperature_rankine >= self.temperature_min)
+            & (operating_temperature_rankine <= self.temperature_max)
+            & (stage_3_final_temperature >= self.temperature_min)
+            & (stage_1_final_temperature <= self.temperature_max)
+            & np.isfinite(thermal_efficiency)
+        )
+
+        return mask_invalid(outputs, invalid)
+
+
+class _LookupTable:
+    """
+    Piecewise-linear lookup of several properties on one uniform temperature grid, the segment is found by arithmetic instead of a search
+    """
+    def __init__(self, values: np.ndarray, start: float, step: float) -> None:
+        self.values = values
+        self.slopes = np.concatenate((np.diff(values, axis=1), np.zeros((len(values), 1))), axis=1)
+        self.start = start
+        self.inverse_step = 1 / step
+        self.last_index = values.shape[1] - 1
+
+    def __call__(self, x: np.ndarray, *rows: int) -> np.ndarray | tuple[np.ndarray, ...]:
+        position = (np.asarray(x, dtype=np.float64) - self.start) * self.inverse_step
+
+        # NaN and infinite temperatures (from invalid rows) would cast to an out of range index, they are looked up at an end of the table and masked by the solver
+        index = np.clip(np.nan_to_num(position, nan=0.0, posinf=self.last_index, neginf=0.0), 0, self.last_index).astype(np.intp)
+        fraction = position - index
+
+        values = tuple(self.values[row].take(index) + (fraction * self.slopes[row].take(index)) for row in rows)
+
+        return values[0] if len(values) == 1 else values
+
+
+def _gas_constant_btu(gas_constant: np.ndarray) -> np.ndarray:
+    # lbf-ft/lbm-°R to Btu/lbm-°R
+    return convert_ft_lbf_to_btu(gas_constant)
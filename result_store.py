@@ -0,0 +1,152 @@
+from __future__ import annotations
+from collections.abc import Callable, Iterable
+import json
+import os
+import struct
+from typing import Any
+
+import numpy as np
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS
+from cycles import CYCLES
+from sweep import ParameterSweep
+
+
+STORE_VERSION = 1
+
+# File layout: magic, version and JSON header length, the JSON header (padded so rows start 64-byte aligned), then fixed-size rows until the end of the file
+_MAGIC = b"OTTOCYC\0"
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGNMENT = 64
+
+DEFAULT_FIELDS = OTTO_CYCLE_INPUTS + OTTO_CYCLE_OUTPUTS
+
+
+class ResultStore:
+    """
+    Append-only binary table of solved cycles with one structured dtype field per input and output, read through `np.memmap`
+
+    The row count comes from the file size, so rows appended by an interrupted run are kept and a partially written last row is ignored
+    """
+    def __init__(self, path: str, dtype: np.dtype, header_size: int, metadata: dict[str, Any], writable: bool) -> None:
+        self.path = path
+        self.dtype = dtype
+        self.header_size = header_size
+        self.metadata = metadata
+        self.writable = writable
+
+        self._rows: np.memmap | np.ndarray | None = None
+
+    @classmethod
+    def create(cls, path: str, fields: Iterable[str] = DEFAULT_FIELDS, dtype: Any = np.float64, metadata: dict[str, Any] | None = None) -> ResultStore:
+        """
+        Create a new, empty store, overwriting any existing file
+        """
+        store_dtype = np.dtype([(name, np.dtype(dtype).newbyteorder("<")) for name in fields])
+        metadata = metadata if metadata is not None else {}
+
+        header = json.dumps({"fields": store_dtype.descr, "metadata": metadata}).encode()
+        header_size = _PREAMBLE.size + len(header)
+        header += b" " * (-header_size % _ALIGNMENT)
+
+        with open(path, "wb") as file:
+            file.write(_PREAMBLE.pack(_MAGIC, STORE_VERSION, len(header)))
+            file.write(header)
+
+        return cls(path, store_dtype, _PREAMBLE.size + len(header), metadata, writable=True)
+
+    @classmethod
+    def open(cls, path: str, writable: bool = False) -> ResultStore:
+        with open(path, "rb") as file:
+            magic, version, header_length = _PREAMBLE.unpack(file.read(_PREAMBLE.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a result store")
+            if version != STORE_VERSION:
+                raise ValueError(f"{path} is a version {version} result store, only version {STORE_VERSION} is supported")
+
+            header = json.loads(file.read(header_length))
+
+        store_dtype = np.dtype([(name, field_dtype) for name, field_dtype in header["fields"]])
+
+        return cls(path, store_dtype, _PREAMBLE.size + header_length, header["metadata"], writable)
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return self.dtype.names
+
+    def __len__(self) -> int:
+        return (os.path.getsize(self.path) - self.header_size) // self.dtype.itemsize
+
+    @property
+    def rows(self) -> np.ndarray:
+        """
+        All rows as a read-only structured array mapped from the file
+        """
+        if self._rows is None or len(self._rows) != len(self):
+            count = len(self)
+            if count == 0:
+                self._rows = np.empty(0, dtype=self.dtype)
+            else:
+                self._rows = np.memmap(self.path, dtype=self.dtype, mode="r", offset=self.header_size, shape=(count,))
+
+        return self._rows
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        View of one field across all rows, nothing is copied or read until it is accessed
+        """
+        return self.rows[name]
+
+    def columns(self) -> dict[str, np.ndarray]:
+        rows = self.rows
+
+        return {name: rows[name] for name in self.fields}
+
+    def append(self, values: dict[str, np.ndarray]) -> None:
+        """
+        Append rows from equal-length arrays, one per field
+        """
+        if not self.writable:
+            raise PermissionError(f"{self.path} was opened read-only")
+
+        count = len(np.asarray(values[self.fields[0]]))
+        rows = np.empty(count, dtype=self.dtype)
+        for name in self.fields:
+            rows[name] = values[name]
+
+        with open(self.path, "r+b") as file:
+            # Drop a partially written row left by an interrupted append
+            file.truncate(self.header_size + (len(self) * self.dtype.itemsize))
+            file.seek(0, os.SEEK_END)
+            file.write(rows.tobytes())
+
+
+def write_sweep(sweep: ParameterSweep, path: str, progress: Callable[[int, int, float], None] | None = None, dtype: Any = np.float64) -> ResultStore:
+    """
+    Solve a sweep into a result store, resuming from the last stored row if the file already holds the same sweep
+
+    Sweeps of another cycle store that cycle's inputs and outputs, with the cycle's name in the metadata
+    """
+    metadata = {"sweep_axes": [axis.tolist() for axis in sweep.axes]}
+    if sweep.properties is not None:
+        metadata["properties"] = repr(sweep.properties)
+
+    # Otto sweeps have no cycle key, as in stores written before other cycles
+    fields = DEFAULT_FIELDS
+    if sweep.cycle is not None:
+        metadata["cycle"] = sweep.cycle
+        fields = CYCLES[sweep.cycle].inputs + CYCLES[sweep.cycle].outputs
+
+    store = None
+    if os.path.exists(path):
+        store = ResultStore.open(path, writable=True)
+        if store.metadata != metadata:
+            raise ValueError(f"{path} holds results of a different sweep")
+
+    if store is None:
+        store = ResultStore.create(path, fields, dtype=dtype, metadata=metadata)
+
+    for chunk in sweep.run(start=len(store), progress=progress):
+        store.append(chunk.inputs | chunk.outputs)
+
+    return store
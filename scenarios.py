@@ -0,0 +1,220 @@
+from __future__ import annotations
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+import sqlite3
+import time
+from typing import TYPE_CHECKING, Any
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS
+from cycle import OttoCycleInputs, OttoCycleResult
+from units import US, UnitSystem, convert
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from properties import PropertyTable
+    from sweep import ParameterSweep
+
+
+SCHEMA_VERSION = 1
+
+FIELDS = OTTO_CYCLE_INPUTS + OTTO_CYCLE_OUTPUTS
+
+# Fields with an index, the inputs scenarios are usually looked up by and the main results
+INDEXED_FIELDS = ("compression_ratio", "engine_displacement", "operating_temperature", "total_work", "thermal_efficiency")
+
+_INSERT = f"INSERT INTO scenarios (name, created, properties, {', '.join(FIELDS)}) VALUES ({', '.join('?' * (len(FIELDS) + 3))})"
+_SELECT = f"SELECT id, name, created, properties, {', '.join(FIELDS)} FROM scenarios"
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    """
+    A named set of inputs and the cycle solved from them
+
+    `properties` describes the property table the cycle was solved with, None for constant specific heats
+    """
+    id: int
+    name: str
+    created: float
+    properties: str | None
+    result: OttoCycleResult
+
+
+class ScenarioLibrary:
+    """
+    Named inputs and their solved outputs in a SQLite database, loaded back without solving again
+
+    Values are stored in the calculator's units (psi, °F, in^3, Btu) whatever units they were solved in, so range queries compare like with like. `INDEXED_FIELDS` are indexed so range queries on them only read the matching rows
+    """
+    def __init__(self, path: str = ":memory:") -> None:
+        self.path = path
+        self._connection = sqlite3.connect(path)
+
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            self._connection.close()
+            raise ValueError(f"{path} is a version {version} scenario library, only version {SCHEMA_VERSION} is supported")
+
+        # WAL commits don't rewrite the database, so saving a scenario is a single append
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+
+        with self._connection:
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS scenarios (id INTEGER PRIMARY KEY, name TEXT NOT NULL, created REAL NOT NULL, properties TEXT, {', '.join(f'{name} REAL NOT NULL' for name in FIELDS)})")
+            self._create_indexes()
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def __enter__(self) -> ScenarioLibrary:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT count(*) FROM scenarios").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def save(self, name: str, result: OttoCycleResult, properties: PropertyTable | None = None) -> int:
+        """
+        Store a solved cycle under `name`, returning the new scenario's id
+        """
+        values = {name: getattr(result.inputs, name) for name in OTTO_CYCLE_INPUTS} | {name: getattr(result, name) for name in OTTO_CYCLE_OUTPUTS}
+
+        with self._connection:
+            cursor = self._connection.execute(_INSERT, (name, time.time(), _describe(properties), *(convert(field, values[field], result.units, US) for field in FIELDS)))
+
+        return cursor.lastrowid
+
+    def save_batch(self, name: str, inputs: dict[str, Any], outputs: dict[str, np.ndarray], properties: PropertyTable | None = None, units: UnitSystem = US) -> int:
+        """
+        Store the rows of a `solve_otto_cycle_batch` solve under `name` in one transaction, returning the number of rows stored
+
+        Rows that aren't valid cycles (NaN outputs) are skipped
+        """
+        import numpy as np
+
+        size = np.broadcast_shapes(*(np.shape(value) for value in (inputs | outputs).values()))
+        with self._bulk_insert(int(np.prod(size, dtype=np.int64))):
+            return self._insert_batch(name, time.time(), _describe(properties), inputs, outputs, units)
+
+    def import_sweep(self, sweep: ParameterSweep, name: str, progress: Callable[[int, int, float], None] | None = None) -> int:
+        """
+        Solve a sweep and store every valid grid point under `name` in one transaction, so an interrupted import leaves nothing behind
+        """
+        created = time.time()
+        description = _describe(sweep.properties)
+        stored = 0
+
+        with self._bulk_insert(sweep.size):
+            for chunk in sweep.run(progress=progress):
+                stored += self._insert_batch(name, created, description, chunk.inputs, chunk.outputs, US)
+
+        return stored
+
+    def get(self, scenario_id: int, units: UnitSystem = US) -> Scenario:
+        row = self._connection.execute(f"{_SELECT} WHERE id = ?", (scenario_id,)).fetchone()
+        if row is None:
+            raise KeyError(scenario_id)
+
+        return _scenario(row, units)
+
+    def query(self, name: str | None = None, limit: int | None = None, units: UnitSystem = US, **ranges: tuple) -> list[Scenario]:
+        """
+        Scenarios whose name contains `name` and whose fields are within `ranges` (field name -> (minimum, maximum) in `units`, inclusive, either can be None), newest first
+
+        For example `query(compression_ratio=(9, 11), thermal_efficiency=(.55, None))`
+        """
+        where, parameters = _where(name, ranges, units)
+        statement = f"{_SELECT}{where} ORDER BY id DESC"
+        if limit is not None:
+            statement += " LIMIT ?"
+            parameters.append(limit)
+
+        return [_scenario(row, units) for row in self._connection.execute(statement, parameters)]
+
+    def count(self, name: str | None = None, units: UnitSystem = US, **ranges: tuple) -> int:
+        where, parameters = _where(name, ranges, units)
+
+        return self._connection.execute(f"SELECT count(*) FROM scenarios{where}", parameters).fetchone()[0]
+
+    def delete(self, scenario_id: int) -> None:
+        with self._connection:
+            self._connection.execute("DELETE FROM scenarios WHERE id = ?", (scenario_id,))
+
+    @contextmanager
+    def _bulk_insert(self, rows: int) -> Iterator[None]:
+        """
+        Run inserts of about `rows` rows as one transaction, dropping the indexes first and building them again at the end if that's faster than updating them row by row
+        """
+        # Building the indexes once after a large insert is about twice as fast
+        rebuild_indexes = rows >= len(self)
+
+        with self._connection:
+            # Begun explicitly so dropping the indexes is part of the transaction too
+            self._connection.execute("BEGIN")
+            if rebuild_indexes:
+                self._drop_indexes()
+
+            yield
+
+            if rebuild_indexes:
+                self._create_indexes()
+
+    def _create_indexes(self) -> None:
+        self._connection.execute("CREATE INDEX IF NOT EXISTS scenarios_name ON scenarios (name)")
+        for name in INDEXED_FIELDS:
+            self._connection.execute(f"CREATE INDEX IF NOT EXISTS scenarios_{name} ON scenarios ({name})")
+
+    def _drop_indexes(self) -> None:
+        for name in ("name",) + INDEXED_FIELDS:
+            self._connection.execute(f"DROP INDEX IF EXISTS scenarios_{name}")
+
+    def _insert_batch(self, name: str, created: float, description: str | None, inputs: dict[str, Any], outputs: dict[str, np.ndarray], units: UnitSystem) -> int:
+        import numpy as np
+
+        values = inputs | outputs
+        columns = np.broadcast_arrays(*(np.asarray(convert(field, values[field], units, US), dtype=np.float64) for field in FIELDS))
+        rows = np.column_stack([np.ravel(column) for column in columns])
+        rows = rows[np.isfinite(rows).all(axis=1)]
+
+        self._connection.executemany(_INSERT, ((name, created, description, *row) for row in rows.tolist()))
+
+        return len(rows)
+
+
+def _describe(properties: PropertyTable | None) -> str | None:
+    return repr(properties) if properties is not None else None
+
+def _where(name: str | None, ranges: dict[str, tuple], units: UnitSystem) -> tuple[str, list[Any]]:
+    clauses = []
+    parameters: list[Any] = []
+
+    if name is not None:
+        clauses.append("instr(name, ?) > 0")
+        parameters.append(name)
+
+    for field, (minimum, maximum) in ranges.items():
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field {field!r}, expected an input or output name")
+
+        # Every unit is an increasing affine map, so the bounds convert on their own
+        if minimum is not None:
+            clauses.append(f"{field} >= ?")
+            parameters.append(convert(field, minimum, units, US))
+        if maximum is not None:
+            clauses.append(f"{field} <= ?")
+            parameters.append(convert(field, maximum, units, US))
+
+    return ((" WHERE " + " AND ".join(clauses)) if clauses else "", parameters)
+
+def _scenario(row: tuple, units: UnitSystem) -> Scenario:
+    scenario_id, name, created, properties, *values = row
+    values = [convert(field, value, US, units) for field, value in zip(FIELDS, values)]
+
+    inputs = OttoCycleInputs(*values[:len(OTTO_CYCLE_INPUTS)])
+
+    return Scenario(scenario_id, name, created, properties, OttoCycleResult(inputs, *values[len(OTTO_CYCLE_INPUTS):], units))
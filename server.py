@@ -0,0 +1,493 @@
+from __future__ import annotations
+import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS, solve_otto_cycle_batch
+from profiling import count, enable_from_environment, span
+from properties import GASES, PropertyTable
+from units import UNIT_SYSTEMS, UnitSystem
+
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    501: "Not Implemented",
+    503: "Service Unavailable"
+}
+
+# Response to a single solve with every output finite, precompiled with %r (the same text as the JSON encoder) for each output
+_SOLVE_RESPONSE = '{"units": "%s", "outputs": {' + ", ".join(f'"{name}": %r' for name in OTTO_CYCLE_OUTPUTS) + "}}"
+_EFFICIENCY_INDEX = OTTO_CYCLE_OUTPUTS.index("thermal_efficiency")
+
+# Values encoded per call, small enough that a worker thread encoding a large batch hands the GIL back to the event loop every few milliseconds
+_ENCODE_CHUNK = 4096
+
+
+class RequestError(Exception):
+    """
+    A request that can't be served, answered with `status` and the message as the JSON error
+    """
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+
+        self.status = status
+
+
+@dataclass(slots=True)
+class _PendingSolve:
+    # One row of inputs from a single solve, or a (rows, inputs) array from a batch
+    inputs: tuple[float, ...] | np.ndarray
+    units: UnitSystem
+    future: asyncio.Future
+
+
+class MicroBatcher:
+    """
+    Coalesces the solves submitted within `window` seconds of each other into one vectorized `solve_otto_cycle_batch` call per unit system
+
+    Pending solves wait in a queue of at most `max_queue` requests, new ones raise a 503 `RequestError` instead of queueing once it is full. Batches are solved one at a time on a worker thread, so the next batch gathers while the current one is solved
+    """
+    def __init__(self, properties: PropertyTable | None = None, window: float = .002, max_batch_rows: int = 65536, max_queue: int = 4096) -> None:
+        self.properties = properties
+        self.window = window
+        self.max_batch_rows = max_batch_rows
+        self.queue: asyncio.Queue[_PendingSolve] = asyncio.Queue(max_queue)
+
+        self.batches = 0
+        self.batched_rows = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="solver")
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        self._executor.shutdown(wait=False)
+
+    async def solve_one(self, inputs: tuple[float, ...], units: UnitSystem) -> list[float]:
+        """
+        Solve one set of inputs, in `OTTO_CYCLE_INPUTS` order, as part of the next batch, returning the outputs in `OTTO_CYCLE_OUTPUTS` order
+        """
+        return await self._submit(inputs, units)
+
+    async def solve(self, inputs: np.ndarray, units: UnitSystem) -> np.ndarray:
+        """
+        Solve a (rows, inputs) array as part of the next batch, returning a (rows, outputs) array
+        """
+        return await self._submit(inputs, units)
+
+    async def _submit(self, inputs: tuple[float, ...] | np.ndarray, units: UnitSystem):
+        future = asyncio.get_running_loop().create_future()
+
+        try:
+            self.queue.put_nowait(_PendingSolve(inputs, units, future))
+        except asyncio.QueueFull:
+            raise RequestError(503, "The solver queue is full, retry shortly") from None
+
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            rows = _rows(batch[0])
+
+            # Let concurrent requests arrive, then take everything queued up to the row limit
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+            while rows < self.max_batch_rows and not self.queue.empty():
+                pending = self.queue.get_nowait()
+                batch.append(pending)
+                rows += _rows(pending)
+
+            # Rows in different units can't share a solve, within a unit system the single rows go first
+            groups: dict[UnitSystem, tuple[list[_PendingSolve], list[_PendingSolve]]] = {}
+            for pending in batch:
+                groups.setdefault(pending.units, ([], []))[isinstance(pending.inputs, np.ndarray)].append(pending)
+
+            for units, (singles, arrays) in groups.items():
+                try:
+                    single_outputs, array_outputs = await loop.run_in_executor(self._executor, _solve_group, singles, arrays, units, self.properties)
+                except Exception as error:
+                    for pending in singles + arrays:
+                        if not pending.future.done():
+                            pending.future.set_exception(error)
+                    continue
+
+                for pending, outputs in zip(singles, single_outputs):
+                    if not pending.future.done():
+                        pending.future.set_result(outputs)
+
+                start = 0
+                for pending in arrays:
+                    stop = start + len(pending.inputs)
+                    if not pending.future.done():
+                        pending.future.set_result(array_outputs[start:stop])
+                    start = stop
+
+                self.batches += 1
+                self.batched_rows += len(singles) + start
+
+
+def _rows(pending: _PendingSolve) -> int:
+    return len(pending.inputs) if isinstance(pending.inputs, np.ndarray) else 1
+
+def _solve_group(singles: list[_PendingSolve], arrays: list[_PendingSolve], units: UnitSystem, properties: PropertyTable | None) -> tuple[list[list[float]], np.ndarray]:
+    blocks = [pending.inputs for pending in arrays]
+    if singles:
+        blocks.insert(0, np.array([pending.inputs for pending in singles], dtype=np.float64))
+    inputs = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+
+    with span("server.solve_batch"):
+        outputs = solve_otto_cycle_batch(*inputs.T, properties=properties, units=units)
+        outputs = np.column_stack([outputs[name] for name in OTTO_CYCLE_OUTPUTS])
+    count("server.rows", len(inputs))
+
+    # Single rows are handed back as lists, converted all at once
+    return (outputs[:len(singles)].tolist(), outputs[len(singles):])
+
+
+class ServerMetrics:
+    """
+    Request counts, latency percentiles over the last `latency_samples` requests and throughput over the last `window` seconds
+    """
+    def __init__(self, latency_samples: int = 10000, window: int = 10) -> None:
+        self.started = time.monotonic()
+        self.window = window
+
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.rejected = 0
+
+        self._latencies: deque[float] = deque(maxlen=latency_samples)
+
+        # [second, completed requests] for each recent second
+        self._completions: deque[list[int]] = deque()
+
+    def record(self, status: int, latency: float, rows: int = 0) -> None:
+        self.requests += 1
+        self.rows += rows
+        if status == 503:
+            self.rejected += 1
+        elif status >= 400:
+            self.errors += 1
+
+        self._latencies.append(latency)
+
+        second = int(time.monotonic())
+        if self._completions and self._completions[-1][0] == second:
+            self._completions[-1][1] += 1
+        else:
+            self._completions.append([second, 1])
+            while self._completions[0][0] < second - self.window:
+                self._completions.popleft()
+
+    def snapshot(self) -> dict[str, object]:
+        now = time.monotonic()
+
+        # Only whole seconds count towards the throughput
+        current = int(now)
+        completed = sum(count for second, count in self._completions if (current - self.window) <= second < current)
+        window = min(self.window, max(current - int(self.started), 1))
+
+        p50, p99 = np.percentile(self._latencies, (50, 99)).tolist() if self._latencies else (0.0, 0.0)
+
+        return {
+            "uptime": now - self.started,
+            "requests": self.requests,
+            "rows": self.rows,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "requests_per_second": completed / window,
+            "latency_ms": {"p50": p50 * 1000, "p99": p99 * 1000}
+        }
+
+
+class CycleServer:
+    """
+    HTTP/JSON service for the cycle solver, bound to localhost by default
+
+    POST /solve takes one set of inputs, POST /solve/batch takes arrays (scalars are broadcast), both as JSON objects keyed by input name with an optional "units" of "us" (default) or "si". GET /metrics reports the request counts, latency and throughput, GET /health that the server is up. Concurrent solves are coalesced by a `MicroBatcher`
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, properties: PropertyTable | None = None, window: float = .002, max_batch_rows: int = 65536, max_queue: int = 4096, max_body_size: int = 16 * 1024 * 1024) -> None:
+        self.host = host
+        self.port = port
+        self.max_body_size = max_body_size
+
+        self.batcher = MicroBatcher(properties, window, max_batch_rows, max_queue)
+        self.metrics = ServerMetrics()
+
+        self._server: asyncio.Server | None = None
+        self._connections: set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=64 * 1024)
+
+        # Port 0 binds any free port
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+
+            # Idle keep-alive connections would otherwise hold their handlers open
+            for writer in list(self._connections):
+                writer.close()
+
+            await self._server.wait_closed()
+            self._server = None
+
+        await self.batcher.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(writer)
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {"error": "Request headers are too large"}, False)
+                    return
+
+                start = time.perf_counter()
+                path = ""
+                rows = 0
+
+                try:
+                    method, path, version, headers = _parse_head(head)
+                    keep_alive = (headers.get("connection", "").lower() != "close") if version == "HTTP/1.1" else (headers.get("connection", "").lower() == "keep-alive")
+
+                    if "chunked" in headers.get("transfer-encoding", "").lower():
+                        keep_alive = False
+                        raise RequestError(501, "Chunked request bodies aren't supported")
+
+                    length = int(headers.get("content-length", "0") or 0)
+                    if length > self.max_body_size:
+                        keep_alive = False
+                        raise RequestError(413, f"Request bodies are limited to {self.max_body_size} bytes")
+                    body = await reader.readexactly(length) if length else b""
+
+                    status, payload, rows = await self._handle_request(method, path, body)
+                except RequestError as error:
+                    status, payload = error.status, {"error": str(error)}
+                except (ValueError, UnicodeDecodeError):
+                    status, payload, keep_alive = 400, {"error": "Malformed request"}, False
+                except asyncio.IncompleteReadError:
+                    return
+                except Exception as error:
+                    status, payload = 500, {"error": f"{type(error).__name__}: {error}"}
+
+                await self._respond(writer, status, payload, keep_alive)
+
+                # Requests for the metrics themselves aren't counted
+                if path != "/metrics":
+                    self.metrics.record(status, time.perf_counter() - start, rows)
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _handle_request(self, method: str, path: str, body: bytes) -> tuple[int, dict[str, object] | str, int]:
+        """
+        Serve one request, returning the status, the JSON payload (or its encoded text) and the number of cycles solved
+        """
+        path = path.split("?", 1)[0]
+
+        if path == "/health":
+            _require_method(method, "GET")
+            return (200, {"status": "ok"}, 0)
+
+        if path == "/metrics":
+            _require_method(method, "GET")
+            return (200, self.metrics.snapshot() | {
+                "queue_depth": self.batcher.queue.qsize(),
+                "batches": self.batcher.batches,
+                "rows_per_batch": (self.batcher.batched_rows / self.batcher.batches) if self.batcher.batches else 0.0
+            }, 0)
+
+        if path not in ("/solve", "/solve/batch"):
+            raise RequestError(404, f"Unknown path {path}, expected /solve, /solve/batch, /metrics or /health")
+        _require_method(method, "POST")
+
+        request = _parse_json(body)
+        units_key = request.pop("units", "us")
+        if not isinstance(units_key, str) or units_key not in UNIT_SYSTEMS:
+            raise RequestError(400, f"Unknown units {units_key!r}, expected one of {', '.join(UNIT_SYSTEMS)}")
+        units = UNIT_SYSTEMS[units_key]
+
+        if path == "/solve":
+            outputs = await self.batcher.solve_one(tuple(_request_inputs(request, scalar=True)), units)
+
+            if math.isnan(outputs[_EFFICIENCY_INDEX]):
+                raise RequestError(422, "The inputs don't form a valid cycle")
+
+            if all(map(math.isfinite, outputs)):
+                return (200, _SOLVE_RESPONSE % (units_key, *outputs), 1)
+            return (200, {"units": units_key, "outputs": dict(zip(OTTO_CYCLE_OUTPUTS, _json_list(outputs)))}, 1)
+
+        try:
+            inputs = np.column_stack(np.broadcast_arrays(*map(np.atleast_1d, _request_inputs(request, scalar=False))))
+        except ValueError:
+            raise RequestError(400, "Input arrays must have the same length, or be scalars") from None
+
+        rows = len(inputs)
+        outputs = await self.batcher.solve(inputs, units) if rows else np.empty((0, len(OTTO_CYCLE_OUTPUTS)))
+
+        # Encoding takes about a microsecond per value, large responses are encoded off the event loop
+        if rows * len(OTTO_CYCLE_OUTPUTS) > _ENCODE_CHUNK:
+            return (200, await asyncio.get_running_loop().run_in_executor(None, _encode_batch, units_key, outputs), rows)
+        return (200, _encode_batch(units_key, outputs), rows)
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: dict[str, object] | str, keep_alive: bool) -> None:
+        body = (payload if isinstance(payload, str) else json.dumps(payload, allow_nan=False)).encode()
+        retry_after = "Retry-After: 1\r\n" if status == 503 else ""
+
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n{retry_after}Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+
+def _parse_head(head: bytes) -> tuple[str, str, str, dict[str, str]]:
+    lines = head.decode("latin-1").split("\r\n")
+    method, path, version = lines[0].split(" ", 2)
+
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    return (method, path, version, headers)
+
+def _parse_json(body: bytes) -> dict[str, object]:
+    try:
+        request = json.loads(body)
+    except json.JSONDecodeError as error:
+        raise RequestError(400, f"Invalid JSON: {error}") from None
+
+    if not isinstance(request, dict):
+        raise RequestError(400, "Expected a JSON object keyed by input name")
+
+    return request
+
+def _request_inputs(request: dict[str, object], scalar: bool) -> list[float] | list[np.ndarray]:
+    missing = [name for name in OTTO_CYCLE_INPUTS if name not in request]
+    if missing:
+        raise RequestError(400, f"Missing inputs: {', '.join(missing)}")
+
+    unknown = [name for name in request if name not in OTTO_CYCLE_INPUTS]
+    if unknown:
+        raise RequestError(400, f"Unknown inputs: {', '.join(unknown)}")
+
+    inputs = []
+    for name in OTTO_CYCLE_INPUTS:
+        value = request[name]
+        try:
+            inputs.append(float(value) if scalar else np.asarray(value, dtype=np.float64))
+        except (TypeError, ValueError):
+            raise RequestError(400, f"{name} must be a number{'' if scalar else ' or an array of numbers'}") from None
+
+        if not scalar and inputs[-1].ndim > 1:
+            raise RequestError(400, f"{name} must be a number or a flat array of numbers")
+
+    return inputs
+
+def _require_method(method: str, expected: str) -> None:
+    if method != expected:
+        raise RequestError(405, f"Expected {expected}, got {method}")
+
+def _encode_batch(units_key: str, outputs: np.ndarray) -> str:
+    """
+    Encode the response to a batch solve, with rows that can't form a valid cycle as null
+    """
+    parts = [f'{{"units": "{units_key}", "rows": {len(outputs)}, "outputs": {{']
+    for index, name in enumerate(OTTO_CYCLE_OUTPUTS):
+        column = outputs[:, index]
+        values = ", ".join(json.dumps(_json_list(column[start:start + _ENCODE_CHUNK].tolist()))[1:-1] for start in range(0, len(column), _ENCODE_CHUNK))
+        parts.append(f'{", " if index else ""}"{name}": [{values}]')
+    parts.append("}}")
+
+    return "".join(parts)
+
+def _json_list(values: list[float]) -> list[float | None]:
+    if not all(map(math.isfinite, values)):
+        return [value if math.isfinite(value) else None for value in values]
+
+    return values
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the Otto cycle solver over HTTP/JSON without the GUI")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1, localhost only)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="How long to gather concurrent requests into one solve (default: 2 ms)")
+    parser.add_argument("--max-batch-rows", type=int, default=65536, help="Most rows solved together (default: 65536)")
+    parser.add_argument("--max-queue", type=int, default=4096, help="Most requests waiting to be solved before new ones get 503 (default: 4096)")
+    parser.add_argument("--variable-specific-heats", choices=tuple(GASES), metavar="GAS", help=f"Use temperature-dependent specific heats of {' or '.join(GASES)} instead of the constant C_p and C_v")
+    args = parser.parse_args(argv)
+
+    if args.max_queue < 1:
+        parser.error("--max-queue must be at least 1")
+
+    enable_from_environment()
+
+    properties = PropertyTable(args.variable_specific_heats) if args.variable_specific_heats else None
+    server = CycleServer(args.host, args.port, properties, args.window_ms / 1000, args.max_batch_rows, args.max_queue)
+
+    async def serve() -> None:
+        await server.start()
+        print(f"Serving the Otto cycle solver on http://{server.host}:{server.port}", file=sys.stderr)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
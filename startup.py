@@ -0,0 +1,61 @@
+from __future__ import annotations
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+import sys
+import time
+from typing import ContextManager, TextIO
+
+
+# Time from the start of main.py to the first paint of the main window that the calculator should stay under
+STARTUP_TARGET_SECONDS = 1.0
+
+
+class StartupProfile:
+    """
+    Records how long each startup phase takes, relative to when the profile was created
+    """
+    def __init__(self, start: float | None = None) -> None:
+        self.start = start if start is not None else time.perf_counter()
+
+        self.phases: list[tuple[str, float, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        phase_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, phase_start - self.start, time.perf_counter() - phase_start))
+
+    def mark(self, name: str) -> None:
+        """
+        Record an instant, such as the first paint, as a phase without a duration
+        """
+        self.phases.append((name, time.perf_counter() - self.start, 0.0))
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def report(self, file: TextIO = sys.stderr) -> None:
+        file.write("Startup profile:\n")
+        for name, offset, duration in self.phases:
+            file.write(f"\t{name:<28} at {offset * 1000:8.1f} ms  took {duration * 1000:8.1f} ms\n")
+
+        time_to_interactive = max((offset + duration for _, offset, duration in self.phases), default=0.0)
+        status = "within" if time_to_interactive <= STARTUP_TARGET_SECONDS else "OVER"
+        file.write(f"\tTime to interactive: {time_to_interactive * 1000:.1f} ms ({status} the {STARTUP_TARGET_SECONDS * 1000:.0f} ms target)\n")
+        file.flush()
+
+
+# Set by main.py when started with --startup-profile
+PROFILE: StartupProfile | None = None
+
+def startup_phase(name: str) -> ContextManager[None]:
+    """
+    Time a phase if startup profiling is on, otherwise do nothing
+    """
+    if PROFILE is None:
+        return nullcontext()
+
+    return PROFILE.phase(name)
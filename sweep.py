@@ -0,0 +1,216 @@
+from __future__ import annotations
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+import os
+import time
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from cache import CycleCache
+from calculations import OTTO_CYCLE_INPUTS, solve_otto_cycle_batch
+from compact_results import CompactResults
+from cycles import CYCLES
+from units import US
+
+if TYPE_CHECKING:
+    from properties import PropertyTable
+
+
+@dataclass(frozen=True, slots=True)
+class SweepChunk:
+    """
+    A contiguous block of solved grid points, [start, stop) in flat grid order
+    """
+    start: int
+    stop: int
+    inputs: dict[str, np.ndarray]
+    outputs: dict[str, np.ndarray]
+
+
+class ParameterSweep:
+    """
+    Lazy Cartesian grid over the eight Otto cycle inputs, solved in chunks across a process pool
+
+    If a `cache` is given, only the points it doesn't already hold are sent to the workers. Points are solved with temperature-dependent specific heats if a `properties` table is given
+
+    With a `cycle` name from `CYCLES`, that cycle is solved instead and its extra inputs are given as keyword axes, so cycle types can be compared over the same grid
+    """
+    def __init__(self, compression_ratio, specific_heat_pressure, specific_heat_volume, gas_constant, engine_displacement, initial_pressure, initial_temperature, operating_temperature, chunk_size: int = 65536, max_workers: int | None = None, cache: CycleCache | None = None, properties: PropertyTable | None = None, cycle: str | None = None, **cycle_inputs) -> None:
+        if cycle is not None and cycle not in CYCLES:
+            raise ValueError(f"Unknown cycle {cycle}, expected one of {', '.join(CYCLES)}")
+        if cycle is not None and properties is not None:
+            raise ValueError("Only the Otto solver supports temperature-dependent specific heats")
+
+        extra_inputs = CYCLES[cycle].extra_inputs if cycle is not None else ()
+        if set(cycle_inputs) != set(extra_inputs):
+            raise ValueError(f"Expected the extra inputs {', '.join(extra_inputs) or '(none)'}, not {', '.join(cycle_inputs) or '(none)'}")
+
+        self.cycle = cycle
+        self.input_names = OTTO_CYCLE_INPUTS + extra_inputs
+
+        # Each axis can be a scalar, list, range or array, the grid itself is never built
+        self.axes = tuple(np.atleast_1d(np.asarray(values, dtype=np.float64)).ravel() for values in (
+            compression_ratio,
+            specific_heat_pressure,
+            specific_heat_volume,
+            gas_constant,
+            engine_displacement,
+            initial_pressure,
+            initial_temperature,
+            operating_temperature,
+            *(cycle_inputs[name] for name in extra_inputs)
+        ))
+        self.shape = tuple(len(axis) for axis in self.axes)
+        self.size = int(np.prod(self.shape, dtype=np.int64))
+
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        if cache is not None and cache.properties is not properties:
+            raise ValueError("cache must solve with the same property table as the sweep")
+        if cache is not None and cache.units is not US:
+            raise ValueError("cache must solve in the calculator's units, sweep axes are in psi, °F and in^3")
+        if cache is not None and cache.cycle != cycle:
+            raise ValueError("cache must solve the same cycle as the sweep")
+        self.cache = cache
+        self.properties = properties
+
+        self.points_computed = 0
+        self.elapsed = 0.0
+
+    @property
+    def points_per_second(self) -> float:
+        return (self.points_computed / self.elapsed) if self.elapsed > 0 else 0.0
+
+    def chunks(self, start: int = 0) -> Iterator[tuple[int, int]]:
+        for chunk_start in range(start, self.size, self.chunk_size):
+            yield (chunk_start, min(chunk_start + self.chunk_size, self.size))
+
+    def points(self, start: int, stop: int) -> dict[str, np.ndarray]:
+        """
+        Get the inputs for the grid points [start, stop) in flat grid order
+        """
+        return _grid_points(self.input_names, self.axes, self.shape, start, stop)
+
+    def run(self, start: int = 0, progress: Callable[[int, int, float], None] | None = None) -> Iterator[SweepChunk]:
+        """
+        Solve the grid from `start`, yielding chunks in order as they finish
+
+        `progress` is called after each chunk with the points done, the total points and the throughput in points per second
+        """
+        self.points_computed = 0
+        self.elapsed = 0.0
+        start_time = time.perf_counter()
+
+        for chunk in self._run_chunks(start):
+            self.points_computed += chunk.stop - chunk.start
+            self.elapsed = time.perf_counter() - start_time
+
+            if progress is not None:
+                progress(chunk.stop, self.size, self.points_per_second)
+
+            yield chunk
+
+    def collect(self, dtype: Any = np.float32, drop_derived: bool = False, progress: Callable[[int, int, float], None] | None = None) -> CompactResults:
+        """
+        Solve the whole grid into compact results, the axes with a single value are held as constants
+        """
+        if self.cycle is not None:
+            raise ValueError("Compact results only hold Otto cycles")
+
+        constants = {name: float(axis[0]) for name, axis in zip(OTTO_CYCLE_INPUTS, self.axes) if len(axis) == 1}
+        results = CompactResults(self.size, dtype, drop_derived, constants)
+
+        for chunk in self.run(progress=progress):
+            results.set_rows(chunk.start, chunk.inputs | chunk.outputs)
+
+        return results
+
+    def _run_chunks(self, start: int) -> Iterator[SweepChunk]:
+        if self.max_workers <= 1:
+            for chunk_start, chunk_stop in self.chunks(start):
+                if self.cache is None:
+                    yield SweepChunk(chunk_start, chunk_stop, *_solve_chunk(self.input_names, self.axes, self.shape, chunk_start, chunk_stop, self.properties, self.cycle))
+                else:
+                    inputs = self.points(chunk_start, chunk_stop)
+                    yield SweepChunk(chunk_start, chunk_stop, inputs, self.cache.solve_batch(**inputs))
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker, initargs=(self.input_names, self.axes, self.shape, self.properties, self.cycle)) as executor:
+            # Keep a bounded number of chunks in flight so results stream out in order without piling up
+            pending: deque[Callable[[], SweepChunk]] = deque()
+
+            for chunk_start, chunk_stop in self.chunks(start):
+                pending.append(self._submit_chunk(executor, chunk_start, chunk_stop))
+
+                if len(pending) >= (self.max_workers * 2):
+                    yield pending.popleft()()
+
+            while pending:
+                yield pending.popleft()()
+
+    def _submit_chunk(self, executor: ProcessPoolExecutor, start: int, stop: int) -> Callable[[], SweepChunk]:
+        """
+        Submit a chunk to the pool, returning a function that waits for it and builds the finished chunk
+        """
+        if self.cache is None:
+            future = executor.submit(_solve_worker_chunk, start, stop)
+
+            return lambda: SweepChunk(start, stop, *future.result())
+
+        # Look up the chunk in the cache here and only send the missing rows to a worker
+        inputs = self.points(start, stop)
+        keys, values, missing = self.cache.lookup_batch(inputs)
+        missing_future: Future | None = None
+        if missing.any():
+            missing_future = executor.submit(_solve_points, {name: value[missing] for name, value in inputs.items()}, self.properties, self.cycle)
+
+        def finish() -> SweepChunk:
+            if missing_future is not None:
+                self.cache.store_batch(keys, values, missing, missing_future.result())
+
+            return SweepChunk(start, stop, inputs, {name: np.ascontiguousarray(values[:, index]) for index, name in enumerate(self.cache.outputs)})
+
+        return finish
+
+
+def _grid_points(names: tuple[str, ...], axes: tuple[np.ndarray, ...], shape: tuple[int, ...], start: int, stop: int) -> dict[str, np.ndarray]:
+    indices = np.unravel_index(np.arange(start, stop, dtype=np.int64), shape)
+
+    return {name: axis[index] for name, axis, index in zip(names, axes, indices)}
+
+
+def _solve_points(inputs: dict[str, np.ndarray], properties: PropertyTable | None = None, cycle: str | None = None) -> dict[str, np.ndarray]:
+    if cycle is not None:
+        return CYCLES[cycle].solve_batch(**inputs)
+
+    return solve_otto_cycle_batch(**inputs, properties=properties)
+
+def _solve_chunk(names: tuple[str, ...], axes: tuple[np.ndarray, ...], shape: tuple[int, ...], start: int, stop: int, properties: PropertyTable | None = None, cycle: str | None = None) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    inputs = _grid_points(names, axes, shape, start, stop)
+
+    return (inputs, _solve_points(inputs, properties, cycle))
+
+
+# Grid axes (and property table and cycle) for the current worker process, set once by the pool initializer instead of pickled with every chunk
+_worker_names: tuple[str, ...] = ()
+_worker_axes: tuple[np.ndarray, ...] = ()
+_worker_shape: tuple[int, ...] = ()
+_worker_properties: PropertyTable | None = None
+_worker_cycle: str | None = None
+
+def _init_worker(names: tuple[str, ...], axes: tuple[np.ndarray, ...], shape: tuple[int, ...], properties: PropertyTable | None = None, cycle: str | None = None) -> None:
+    global _worker_names, _worker_axes, _worker_shape, _worker_properties, _worker_cycle
+
+    _worker_names = names
+    _worker_axes = axes
+    _worker_shape = shape
+    _worker_properties = properties
+    _worker_cycle = cycle
+
+def _solve_worker_chunk(start: int, stop: int) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    return _solve_chunk(_worker_names, _worker_axes, _worker_shape, start, stop, _worker_properties, _worker_cycle)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+from collections.abc import Callable
+import threading
+import traceback
+from typing import Any
+
+from PyQt6 import QtCore
+
+
+class TaskCancelled(Exception):
+    """
+    Raised inside a task function to stop it after `Task.cancel` has been called
+    """
+
+
+class TaskSignals(QtCore.QObject):
+    """
+    Signals of a task, created on the GUI thread so they are delivered there through queued connections
+    """
+    progress = QtCore.pyqtSignal(float)
+    finished = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+
+
+class Task(QtCore.QRunnable):
+    """
+    Runs `function(task, *args, **kwargs)` on a thread pool thread
+
+    The function can call `task.report_progress` with a fraction between 0 and 1 and should call `task.check_cancelled` between units of work. Its return value is delivered through `signals.finished` on the GUI thread
+    """
+    def __init__(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        super().__init__()
+
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+        self.signals = TaskSignals()
+
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel_event.is_set():
+            raise TaskCancelled()
+
+    def report_progress(self, fraction: float) -> None:
+        self.signals.progress.emit(fraction)
+
+    def run(self) -> None:
+        try:
+            self.check_cancelled()
+            result = self.function(self, *self.args, **self.kwargs)
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except Exception:
+            self.signals.failed.emit(traceback.format_exc())
+        else:
+            self.signals.finished.emit(result)
+
+
+class TaskRunner(QtCore.QObject):
+    """
+    Starts tasks on a thread pool and keeps them alive until they finish
+    """
+    # Emitted with the number of running tasks whenever it changes
+    running_changed = QtCore.pyqtSignal(int)
+
+    def __init__(self, parent: QtCore.QObject | None = None, thread_pool: QtCore.QThreadPool | None = None) -> None:
+        super().__init__(parent)
+
+        self.thread_pool = thread_pool if thread_pool is not None else QtCore.QThreadPool.globalInstance()
+
+        self.tasks: set[Task] = set()
+
+    def start(self, function: Callable[..., Any], *args: Any, on_finished: Callable[[Any], None] | None = None, on_failed: Callable[[str], None] | None = None, on_progress: Callable[[float], None] | None = None, on_cancelled: Callable[[], None] | None = None, **kwargs: Any) -> Task:
+        task = Task(function, *args, **kwargs)
+        task.setAutoDelete(False)
+
+        if on_finished is not None:
+            task.signals.finished.connect(on_finished)
+        if on_failed is not None:
+            task.signals.failed.connect(on_failed)
+        if on_progress is not None:
+            task.signals.progress.connect(on_progress)
+        if on_cancelled is not None:
+            task.signals.cancelled.connect(on_cancelled)
+
+        for signal in (task.signals.finished, task.signals.failed, task.signals.cancelled):
+            signal.connect(lambda *_, task=task: self._remove(task))
+
+        self.tasks.add(task)
+        self.running_changed.emit(len(self.tasks))
+
+        self.thread_pool.start(task)
+
+        return task
+
+    def cancel_all(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+
+    def wait(self, timeout: int = -1) -> bool:
+        return self.thread_pool.waitForDone(timeout)
+
+    def _remove(self, task: Task) -> None:
+        self.tasks.discard(task)
+        self.running_changed.emit(len(self.tasks))
+
+
+def run_sweep(task: Task, sweep: Any, consume: Callable[[Any], None]) -> tuple[int, float]:
+    """
+    Task function that runs a `ParameterSweep`, passing each chunk to `consume` on the worker thread
+
+    Returns the points solved and the throughput in points per second
+    """
+    for chunk in sweep.run(progress=lambda done, total, _: task.report_progress(done / total)):
+        consume(chunk)
+        task.check_cancelled()
+
+    return (sweep.points_computed, sweep.points_per_second)
@@ -0,0 +1,38 @@
+import json
+
+import batch
+from calculations import solve_otto_cycle_batch
+
+HEADER = "compression_ratio,specific_heat_pressure,specific_heat_volume,gas_constant,engine_displacement,initial_pressure,initial_temperature,operating_temperature\n"
+
+
+def test_batch_stream_keeps_going_past_a_non_numeric_row(tmp_path):
+    input_path = tmp_path / "inputs.csv"
+    input_path.write_text(
+        HEADER +
+        "8,.24,.17,53.3,258,14.7,70,3670\n"
+        "eight,.24,.17,53.3,258,14.7,70,3670\n"
+        "9,.24,.17,53.3,258,14.7,70,3670\n"
+    )
+    output_path = tmp_path / "outputs.jsonl"
+
+    assert batch.main([str(input_path), "-o", str(output_path), "--variable-specific-heats", "air"]) == 0
+
+    lines = output_path.read_text().splitlines()
+    assert len(lines) == 3
+    assert '"thermal_efficiency": null' in lines[1]
+    assert '"thermal_efficiency": null' not in lines[0] and '"thermal_efficiency": null' not in lines[2]
+
+def test_blocks_match_one_solve_with_constants_and_kept_columns(tmp_path):
+    input_path = tmp_path / "inputs.csv"
+    input_path.write_text("timestamp,compression_ratio,operating_temperature\n" + "".join(f"t{index},{6 + index / 10},{3000 + index}\n" for index in range(25)))
+    output_path = tmp_path / "outputs.jsonl"
+    constants = ["specific_heat_pressure=.24", "specific_heat_volume=.17", "gas_constant=53.3", "engine_displacement=258", "initial_pressure=14.7", "initial_temperature=70"]
+
+    assert batch.main([str(input_path), "-o", str(output_path), "--block-size", "4", "--keep", "timestamp", *(argument for constant in constants for argument in ("--set", constant))]) == 0
+
+    rows = [json.loads(line) for line in output_path.read_text().splitlines()]
+    expected = solve_otto_cycle_batch([6 + index / 10 for index in range(25)], .24, .17, 53.3, 258, 14.7, 70, [3000 + index for index in range(25)])
+    assert [row["timestamp"] for row in rows] == [f"t{index}" for index in range(25)]
+    for index, row in enumerate(rows):
+        assert abs(row["thermal_efficiency"] - expected["thermal_efficiency"][index]) <= 1e-11
@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cache import CycleCache
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS, solve_otto_cycle_batch
+from cycle import OttoCycleInputs
+
+
+def test_shared_between_threads():
+    # Small enough that the threads keep evicting each other's entries
+    cache = CycleCache(max_entries=64)
+    generator = np.random.default_rng(0)
+    batches = [dict(zip(OTTO_CYCLE_INPUTS, (generator.integers(6, 12, 200).astype(float), .24, .17, 53.3, 258, 14.7, 70, generator.integers(3000, 3010, 200).astype(float)))) for _ in range(64)]
+
+    def solve(inputs):
+        single = cache.solve(OttoCycleInputs(*(float(np.ravel(inputs[name])[0]) for name in OTTO_CYCLE_INPUTS)))
+
+        return (cache.solve_batch(**inputs), single)
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(solve, batches))
+
+    for inputs, (outputs, single) in zip(batches, results):
+        expected = solve_otto_cycle_batch(**inputs)
+        for name in OTTO_CYCLE_OUTPUTS:
+            np.testing.assert_array_equal(outputs[name], expected[name], err_msg=name)
+            assert getattr(single, name) == expected[name][0]
+
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 64 * 201
+    assert stats["entries"] == len(cache) <= 64
+    assert stats["misses"] >= stats["entries"]
@@ -0,0 +1,40 @@
+import math
+
+import numpy as np
+import pytest
+
+from calculations import OTTO_CYCLE_OUTPUTS, solve_otto_cycle_batch
+from properties import PropertyTable
+
+VALID = (8, .24, .17, 53.3, 258, 14.7, 70, 3670.33)
+
+
+# Variable specific heats take C_v from the table, so C_v = 0 is only invalid with constant specific heats
+@pytest.mark.parametrize(("inputs", "properties"), [
+    pytest.param((1,) + VALID[1:], None, id="compression_ratio-constant"),
+    pytest.param((1,) + VALID[1:], PropertyTable(), id="compression_ratio-variable"),
+    pytest.param(VALID[:2] + (0,) + VALID[3:], None, id="specific_heat_volume-constant"),
+    pytest.param(VALID[:3] + (0,) + VALID[4:], None, id="gas_constant-constant"),
+    pytest.param(VALID[:3] + (0,) + VALID[4:], PropertyTable(), id="gas_constant-variable")
+])
+def test_scalar_invalid_inputs_are_nan(inputs, properties):
+    outputs = solve_otto_cycle_batch(*inputs, properties=properties)
+
+    for name in OTTO_CYCLE_OUTPUTS:
+        assert np.shape(outputs[name]) == ()
+        assert math.isnan(outputs[name]), name
+
+def test_scalar_inputs_give_0d_arrays():
+    outputs = solve_otto_cycle_batch(*VALID)
+
+    for name in OTTO_CYCLE_OUTPUTS:
+        assert isinstance(outputs[name], np.ndarray) and outputs[name].shape == ()
+    assert float(outputs["thermal_efficiency"]) == pytest.approx(.5629, abs=1e-4)
+
+def test_invalid_rows_do_not_touch_the_inputs():
+    compression_ratio = np.array([8.0, 1.0, 10.0])
+
+    outputs = solve_otto_cycle_batch(compression_ratio, *VALID[1:])
+
+    np.testing.assert_array_equal(compression_ratio, [8.0, 1.0, 10.0])
+    np.testing.assert_array_equal(np.isnan(outputs["thermal_efficiency"]), [False, True, False])
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS, solve_otto_cycle_batch
+from compact_results import DERIVED_OUTPUTS, FLOAT32_RELATIVE_ERROR, CompactResults
+from units import SI
+
+
+def _batch(size, compression_ratio_low=6.0):
+    generator = np.random.default_rng(0)
+    inputs = dict(zip(OTTO_CYCLE_INPUTS, (generator.uniform(compression_ratio_low, 12, size), .24, .17, 53.3, generator.uniform(100, 400, size), 14.7, generator.uniform(40, 100, size), generator.uniform(3000, 4000, size))))
+
+    return (inputs, solve_otto_cycle_batch(**inputs))
+
+@pytest.mark.parametrize("compression_ratio_low", [6.0, 1.0001])
+def test_float32_stays_within_documented_error(compression_ratio_low):
+    inputs, outputs = _batch(100000, compression_ratio_low)
+    derived = {output for output, _, _ in DERIVED_OUTPUTS}
+
+    errors = CompactResults.from_batch(inputs, outputs, np.float32, drop_derived=True).max_relative_error(inputs | outputs)
+
+    assert set(errors) == set(OTTO_CYCLE_INPUTS + OTTO_CYCLE_OUTPUTS)
+    for name, error in errors.items():
+        # Stored values are rounded once, the dropped derived outputs are recomputed from two rounded values
+        bound = (2 if name in derived else 1) * FLOAT32_RELATIVE_ERROR + 1e-15
+        assert error <= bound, f"float32 {name} is off by {error:.3g} relative, more than the documented {bound:.3g}"
+
+def test_float64_is_exact_apart_from_derived_outputs():
+    inputs, outputs = _batch(10000)
+    derived = {output for output, _, _ in DERIVED_OUTPUTS}
+
+    errors = CompactResults.from_batch(inputs, outputs, np.float64, drop_derived=True).max_relative_error(inputs | outputs)
+
+    for name, error in errors.items():
+        assert error <= (1e-14 if name in derived else 0.0), name
+
+def test_invalid_rows_stay_nan_when_derived():
+    inputs, outputs = _batch(10)
+    inputs["compression_ratio"][3] = .5
+    outputs = solve_otto_cycle_batch(**inputs)
+
+    results = CompactResults.from_batch(inputs, outputs, np.float32, drop_derived=True)
+
+    for name, _, _ in DERIVED_OUTPUTS:
+        assert np.isnan(results[name][3])
+        assert np.isfinite(np.delete(results[name], 3)).all()
+
+def test_constant_inputs_are_held_once():
+    inputs, outputs = _batch(1000)
+
+    results = CompactResults.from_batch(inputs, outputs, np.float32, drop_derived=True, units=SI)
+
+    assert set(results.constants) == {"specific_heat_pressure", "specific_heat_volume", "gas_constant", "initial_pressure"}
+    assert results.nbytes == (4 * 1000 * (len(OTTO_CYCLE_INPUTS) + len(OTTO_CYCLE_OUTPUTS) - 4 - len(DERIVED_OUTPUTS))) + (4 * 4)
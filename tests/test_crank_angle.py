@@ -0,0 +1,20 @@
+import numpy as np
+
+from crank_angle import simulate_crank_angle
+
+ENGINE = (.24, .17, 53.3, 258, 14.7, 70, 3670.33)
+
+
+def test_invalid_engine_gives_nan_results():
+    result = simulate_crank_angle(1, *ENGINE)
+
+    for name in ("heat_added", "work", "thermal_efficiency", "peak_pressure"):
+        assert np.isnan(getattr(result, name)).all(), name
+
+def test_invalid_engine_does_not_affect_the_others():
+    result = simulate_crank_angle(np.array([1, 8]), *ENGINE)
+    expected = simulate_crank_angle(8, *ENGINE)
+
+    assert np.isnan(result.thermal_efficiency[0])
+    np.testing.assert_allclose(result.thermal_efficiency[1], expected.thermal_efficiency[0], rtol=1e-12)
+    np.testing.assert_allclose(result.pressures[1], expected.pressures[0], rtol=1e-12)
@@ -0,0 +1,50 @@
+import math
+
+import pytest
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS, solve_otto_cycle_batch
+from cycle import OttoCycleInputs, recompute, solve
+from units import SI, US
+
+INPUTS = OttoCycleInputs(8, .24, .17, 53.3, 258, 14.7, 70, 3670.33)
+
+# A different valid value for each input
+CHANGES = {
+    "compression_ratio": 10.5,
+    "specific_heat_pressure": .26,
+    "specific_heat_volume": .18,
+    "gas_constant": 55.2,
+    "engine_displacement": 350,
+    "initial_pressure": 13.2,
+    "initial_temperature": 95,
+    "operating_temperature": 3300
+}
+
+
+def _values(result):
+    return {name: getattr(result.inputs, name) for name in OTTO_CYCLE_INPUTS} | {name: getattr(result, name) for name in OTTO_CYCLE_OUTPUTS}
+
+@pytest.mark.parametrize("units", [US, SI], ids=["us", "si"])
+@pytest.mark.parametrize("name", OTTO_CYCLE_INPUTS)
+def test_recompute_matches_full_solve(name, units):
+    inputs = OttoCycleInputs(*(units.from_internal(field, US.to_internal(field, getattr(INPUTS, field))) for field in OTTO_CYCLE_INPUTS))
+    values = _values(solve(inputs, units=units))
+
+    changed = OttoCycleInputs(**{field: getattr(inputs, field) for field in OTTO_CYCLE_INPUTS} | {name: units.from_internal(name, US.to_internal(name, CHANGES[name]))})
+    values[name] = getattr(changed, name)
+    updated = recompute(values, {name}, units)
+
+    expected = _values(solve(changed, units=units))
+    assert "thermal_efficiency" in updated
+    for output in OTTO_CYCLE_OUTPUTS:
+        assert math.isclose(values[output], expected[output], rel_tol=1e-12), output
+        # Outputs that don't depend on the input are left alone
+        if output not in updated:
+            assert values[output] == expected[output], output
+
+def test_single_solve_matches_batch_solver():
+    result = solve(INPUTS)
+    outputs = solve_otto_cycle_batch(**{name: getattr(INPUTS, name) for name in OTTO_CYCLE_INPUTS})
+
+    for name in OTTO_CYCLE_OUTPUTS:
+        assert getattr(result, name) == pytest.approx(float(outputs[name]), rel=1e-15), name
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS, solve_otto_cycle_batch
+from cycles import CYCLES, solve_cycle_batch
+from units import SI, US, convert
+
+# Outputs every cycle has whatever its number of stages
+CYCLE_OUTPUTS = ("adiabatic_index", "initial_volume", "air_mass", "heat_added", "total_work", "thermal_efficiency", "mean_effective_pressure")
+
+
+def _inputs(size, units=US):
+    generator = np.random.default_rng(0)
+    inputs = dict(zip(OTTO_CYCLE_INPUTS, (generator.uniform(6, 12, size), .24, .17, 53.3, generator.uniform(100, 400, size), 14.7, generator.uniform(40, 100, size), generator.uniform(3000, 4000, size))))
+
+    return {name: convert(name, value, US, units) for name, value in inputs.items()}
+
+@pytest.mark.parametrize("units", [US, SI], ids=["us", "si"])
+def test_otto_from_shared_processes_matches_otto_solver(units):
+    inputs = _inputs(10000, units)
+
+    outputs = solve_cycle_batch("otto", units, **inputs)
+    expected = solve_otto_cycle_batch(**inputs, units=units)
+
+    for name in OTTO_CYCLE_OUTPUTS:
+        np.testing.assert_allclose(outputs[name], expected[name], rtol=1e-12, atol=0, err_msg=name)
+
+@pytest.mark.parametrize("units", [US, SI], ids=["us", "si"])
+def test_dual_without_constant_volume_combustion_is_diesel(units):
+    inputs = _inputs(10000, units)
+
+    outputs = solve_cycle_batch("dual", units, **inputs, pressure_ratio=1)
+    expected = solve_cycle_batch("diesel", units, **inputs)
+
+    for name in CYCLE_OUTPUTS:
+        np.testing.assert_allclose(outputs[name], expected[name], rtol=1e-12, atol=0, err_msg=name)
+    # The constant volume stage does nothing, the rest line up one stage later
+    np.testing.assert_allclose(outputs["stage_2_heat"], 0, atol=1e-9)
+    for number in range(2, 5):
+        for quantity in ("final_pressure", "final_temperature", "final_volume", "work", "heat"):
+            np.testing.assert_allclose(outputs[f"stage_{number + 1}_{quantity}"], expected[f"stage_{number}_{quantity}"], rtol=1e-12, atol=1e-9, err_msg=f"stage_{number}_{quantity}")
+
+@pytest.mark.parametrize("units", [US, SI], ids=["us", "si"])
+def test_miller_without_overexpansion_is_otto(units):
+    inputs = _inputs(10000, units)
+
+    outputs = solve_cycle_batch("miller", units, **inputs, expansion_ratio=inputs["compression_ratio"])
+    expected = solve_cycle_batch("otto", units, **inputs)
+
+    for name in CYCLE_OUTPUTS:
+        np.testing.assert_allclose(outputs[name], expected[name], rtol=1e-12, atol=0, err_msg=name)
+    # The exhaust stroke is back at the intake volume already
+    np.testing.assert_allclose(outputs["stage_5_work"], 0, atol=1e-9)
+
+@pytest.mark.parametrize("cycle", list(CYCLES))
+def test_invalid_rows_are_nan(cycle):
+    inputs = _inputs(4)
+    inputs["compression_ratio"][1] = .5
+    inputs |= {"pressure_ratio": 1.5, "expansion_ratio": 14}
+
+    outputs = CYCLES[cycle].solve_batch(US, **{name: inputs[name] for name in CYCLES[cycle].inputs})
+
+    assert set(outputs) == set(CYCLES[cycle].outputs)
+    assert np.isnan(outputs["thermal_efficiency"][1])
+    assert np.isfinite(np.delete(outputs["thermal_efficiency"], 1)).all()
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS, solve_otto_cycle_batch
+from dual import Dual
+from units import SI, US
+
+POINT = dict(zip(OTTO_CYCLE_INPUTS, (8.0, .24, .17, 53.3, 258.0, 14.7, 70.0, 3670.33)))
+
+
+def test_dual_arithmetic():
+    x = Dual.variable("x", np.array([2.0, 3.0]))
+    y = Dual.variable("y", np.array([5.0, 7.0]))
+
+    value = ((x * y) - (x / y) + (1 - x) + (2 ** x) + (x ** y) - (3 / x)) * 2
+
+    np.testing.assert_allclose(value.value, 2 * ((x.value * y.value) - (x.value / y.value) + (1 - x.value) + (2 ** x.value) + (x.value ** y.value) - (3 / x.value)))
+    np.testing.assert_allclose(value.derivatives["x"], 2 * (y.value - (1 / y.value) - 1 + (np.log(2) * (2 ** x.value)) + (y.value * (x.value ** (y.value - 1))) + (3 / x.value ** 2)))
+    np.testing.assert_allclose(value.derivatives["y"], 2 * (x.value + (x.value / y.value ** 2) + (np.log(x.value) * (x.value ** y.value))))
+
+def test_values_only_carry_the_inputs_they_depend_on():
+    x = Dual.variable("x", np.array([2.0]))
+
+    assert set((x * 3 + 1).derivatives) == {"x"}
+    assert set((-x).derivatives) == {"x"}
+
+@pytest.mark.parametrize("units", [US, SI], ids=["us", "si"])
+def test_jacobian_matches_central_differences(units):
+    point = {name: units.from_internal(name, US.to_internal(name, value)) for name, value in POINT.items()}
+    outputs, jacobian = solve_otto_cycle_batch(**point, jacobian=True, units=units)
+
+    for input_name in OTTO_CYCLE_INPUTS:
+        # Relative steps, at least an absolute 1e-6 for inputs near 0 (such as temperatures in °C)
+        step = 1e-6 * max(abs(point[input_name]), 1.0)
+        above = solve_otto_cycle_batch(**(point | {input_name: point[input_name] + step}), units=units)
+        below = solve_otto_cycle_batch(**(point | {input_name: point[input_name] - step}), units=units)
+
+        for name in OTTO_CYCLE_OUTPUTS:
+            difference = float((above[name] - below[name]) / (2 * step))
+            assert float(jacobian[name][input_name]) == pytest.approx(difference, rel=1e-5, abs=1e-9 * abs(float(outputs[name]))), (name, input_name)
+
+def test_jacobian_across_chunks_with_invalid_rows():
+    # More rows than the 4096-row chunks, with invalid rows on both sides of the first chunk boundary
+    size = 10000
+    generator = np.random.default_rng(0)
+    compression_ratio = generator.uniform(6, 12, size)
+    operating_temperature = generator.uniform(3000, 4000, size)
+    invalid = np.array([0, 4095, 4096, 9999])
+    compression_ratio[invalid] = 1
+
+    outputs, jacobian = solve_otto_cycle_batch(compression_ratio, .24, .17, 53.3, 258, 14.7, 70, operating_temperature, jacobian=True)
+    expected = solve_otto_cycle_batch(compression_ratio, .24, .17, 53.3, 258, 14.7, 70, operating_temperature)
+
+    valid = np.ones(size, dtype=bool)
+    valid[invalid] = False
+    for name in OTTO_CYCLE_OUTPUTS:
+        np.testing.assert_allclose(outputs[name], expected[name], rtol=1e-13, equal_nan=True, err_msg=name)
+        assert np.isnan(outputs[name][invalid]).all(), name
+        for input_name in OTTO_CYCLE_INPUTS:
+            assert jacobian[name][input_name].shape == (size,)
+            assert np.isnan(jacobian[name][input_name][invalid]).all(), (name, input_name)
+            assert np.isfinite(jacobian[name][input_name][valid]).all(), (name, input_name)
+
+    # Each row's derivatives are the same as solving that row alone
+    for row in (4094, 4097, 8191, 8192):
+        _, single = solve_otto_cycle_batch(compression_ratio[row], .24, .17, 53.3, 258, 14.7, 70, operating_temperature[row], jacobian=True)
+        for name in ("total_work", "thermal_efficiency", "stage_3_final_pressure"):
+            for input_name in ("compression_ratio", "operating_temperature", "specific_heat_volume"):
+                assert jacobian[name][input_name][row] == pytest.approx(float(single[name][input_name]), rel=1e-13)
@@ -0,0 +1,20 @@
+import math
+
+from monte_carlo import Uniform, run_monte_carlo
+
+FIXED = (.24, .17, 53.3, 258, 14.7, 70, 3670.33)
+
+
+def test_fixed_invalid_inputs_count_every_sample_as_invalid():
+    result = run_monte_carlo(1, *FIXED, samples=1000, chunk_size=300)
+
+    assert result.invalid == 1000
+    assert result.statistics["thermal_efficiency"].count == 0
+    assert math.isnan(result.statistics["thermal_efficiency"].mean)
+
+def test_invalid_samples_are_left_out():
+    result = run_monte_carlo(Uniform(.5, 2), *FIXED, samples=1000, chunk_size=300)
+
+    assert 0 < result.invalid < 1000
+    assert result.statistics["thermal_efficiency"].count == 1000 - result.invalid
+    assert 0 < result.statistics["thermal_efficiency"].minimum <= result.statistics["thermal_efficiency"].maximum < 1
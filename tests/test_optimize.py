@@ -0,0 +1,28 @@
+import math
+
+import numpy as np
+
+from optimize import optimize_cycle
+
+FIXED = {"specific_heat_pressure": .24, "specific_heat_volume": .17, "gas_constant": 53.3, "engine_displacement": 258, "initial_pressure": 14.7, "initial_temperature": 70, "operating_temperature": 3670.33}
+
+
+def test_probes_at_an_invalid_bound_are_infeasible():
+    result = optimize_cycle("thermal_efficiency", {"compression_ratio": (1, 14)}, **FIXED)
+
+    assert result.feasible
+    assert math.isclose(result.inputs["compression_ratio"], 14, rel_tol=1e-6)
+
+def test_nothing_feasible_is_nan():
+    result = optimize_cycle("thermal_efficiency", {"compression_ratio": (.5, 1)}, **FIXED)
+
+    assert not result.feasible
+    assert math.isnan(result.objective)
+    assert all(math.isnan(value) for value in result.outputs.values())
+
+def test_variants_with_invalid_bounds():
+    result = optimize_cycle("thermal_efficiency", {"compression_ratio": (np.array([1, .5, 6]), np.array([12, 1, 10]))}, **FIXED)
+
+    np.testing.assert_array_equal(result.feasible, [True, False, True])
+    np.testing.assert_allclose(result.inputs["compression_ratio"][[0, 2]], [12, 10], rtol=1e-6)
+    assert np.isnan(result.objective[1])
@@ -0,0 +1,16 @@
+import numpy as np
+
+from calculations import solve_otto_cycle_batch
+from properties import PropertyTable
+
+
+def test_invalid_rows_are_nan_with_variable_specific_heats():
+    compression_ratio = np.array([8, np.nan, np.inf, -np.inf, 8])
+    initial_temperature = np.array([70, 70, 70, 70, np.nan])
+
+    outputs = solve_otto_cycle_batch(compression_ratio, .24, .17, 53.3, 258, 14.7, initial_temperature, 3670, properties=PropertyTable())
+    expected = solve_otto_cycle_batch(8, .24, .17, 53.3, 258, 14.7, 70, 3670, properties=PropertyTable())
+
+    for name, value in outputs.items():
+        assert value[0] == expected[name]
+        assert np.isnan(value[1:]).all(), name
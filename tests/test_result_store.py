@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from calculations import OTTO_CYCLE_INPUTS, OTTO_CYCLE_OUTPUTS
+from cycles import CYCLES, solve_cycle_batch
+from result_store import ResultStore, write_sweep
+from sweep import ParameterSweep
+
+AXES = dict(zip(OTTO_CYCLE_INPUTS, ([6, 8, 10], .24, .17, 53.3, [200, 300], 14.7, 70, [3000, 3500])))
+
+
+def test_otto_sweep_round_trip(tmp_path):
+    sweep = ParameterSweep(**AXES, chunk_size=5, max_workers=1)
+
+    store = write_sweep(sweep, str(tmp_path / "otto.bin"))
+
+    reopened = ResultStore.open(str(tmp_path / "otto.bin"))
+    assert reopened.fields == OTTO_CYCLE_INPUTS + OTTO_CYCLE_OUTPUTS
+    assert "cycle" not in reopened.metadata
+    assert len(reopened) == len(store) == 12
+
+@pytest.mark.parametrize(("cycle", "extra_inputs"), [("diesel", {}), ("dual", {"pressure_ratio": [1.2, 1.5]}), ("miller", {"expansion_ratio": 12})])
+def test_cycle_sweep_round_trip(tmp_path, cycle, extra_inputs):
+    sweep = ParameterSweep(**AXES, chunk_size=5, max_workers=1, cycle=cycle, **extra_inputs)
+    path = str(tmp_path / f"{cycle}.bin")
+
+    write_sweep(sweep, path)
+
+    store = ResultStore.open(path)
+    assert store.fields == CYCLES[cycle].inputs + CYCLES[cycle].outputs
+    assert store.metadata["cycle"] == cycle
+
+    columns = store.columns()
+    expected = solve_cycle_batch(cycle, **{name: columns[name] for name in CYCLES[cycle].inputs})
+    for name in CYCLES[cycle].outputs:
+        np.testing.assert_array_equal(columns[name], expected[name], err_msg=name)
+
+def test_resuming_a_different_cycle_is_refused(tmp_path):
+    path = str(tmp_path / "sweep.bin")
+    write_sweep(ParameterSweep(**AXES, max_workers=1, cycle="diesel"), path)
+
+    with pytest.raises(ValueError, match="different sweep"):
+        write_sweep(ParameterSweep(**AXES, max_workers=1), path)
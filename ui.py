@@ -1,14 +1,55 @@
 from __future__ import annotations
-import datetime as dt
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from PyQt6 import QtCore, QtGui, QtWidgets
-import pyqtgraph as pg
 
+from cache import CycleCache
 from calculations import *
+from cycle import OttoCycleInputs, OttoCycleResult, recompute
+from export import ReportWriter, write_results
 from file_path import get_file_path
-from graph import get_adiabatic_data
+import profiling
+from scenarios import Scenario, ScenarioLibrary
+from startup import startup_phase
+from tasks import Task, TaskCancelled, TaskRunner, run_sweep
+from units import UNIT_SYSTEMS, US, UnitSystem, convert
+
+# NumPy and pyqtgraph are only imported once something is graphed, keeping them out of the startup path
+if TYPE_CHECKING:
+    import numpy as np
+    import pyqtgraph as pg
+
+    from graph import CycleOverlay
+    from profiling import Profiler
+    from properties import PropertyTable
+    from sweep import ParameterSweep, SweepChunk
+
+# File dialog filters of the formats results can be saved in
+SAVE_RESULTS_FILTERS = {
+    "Text Files (*.txt)": "text",
+    "CSV Files (*.csv)": "csv",
+    "JSON Files (*.json)": "json",
+    "HTML Files (*.html)": "html"
+}
+
+# The scenario library shared by every session, opened the first time a scenario is saved or loaded
+SCENARIO_LIBRARY_PATH = Path.home() / ".otto_cycle_calculator" / "scenarios.sqlite3"
+
+
+def import_pyqtgraph():
+    """
+    Import pyqtgraph and apply the calculator's plot style the first time it is needed
+    """
+    import pyqtgraph as pg
+    
+    if pg.getConfigOption("background") != "w":
+        # Set the default background and foreground color to white and black
+        pg.setConfigOption('background', 'w')
+        pg.setConfigOption('foreground', 'k')
+    
+    return pg
+
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -50,14 +91,45 @@ class MainWindow(QtWidgets.QMainWindow):
         
         self.stage_4_heat: float | None = None
         
-        self.setup_ui()
+        self.result: OttoCycleResult | None = None
+        self.cache = CycleCache(max_entries=1024)
+        
+        # Temperature-dependent specific heats, None while the constant C_p and C_v are used
+        self.properties: PropertyTable | None = None
+        
+        # Units the inputs are entered in and the outputs shown in
+        self.units: UnitSystem = US
+        
+        # The profiler recording or last recorded, already recording if started with OTTO_PROFILE set
+        self.profiler: Profiler | None = profiling.PROFILER
+        
+        self.scenarios: ScenarioLibrary | None = None
+        
+        with startup_phase("MainWindow.setup_ui"):
+            self.setup_ui()
         
         self.graph_window: pg.PlotWidget | None = None
+        self.graph_curve: pg.PlotDataItem | None = None
+        self.graph_points = 1000
         
-        self.inputs = self.add_inputs()
-        self.outputs = self.add_outputs()
+        self.overlay_window: pg.PlotWidget | None = None
+        self.overlay_curve: pg.PlotDataItem | None = None
+        self.overlay: CycleOverlay | None = None
         
-        self.set_input_defaults()
+        # Inputs changed since the last live update
+        self.pending_changes: set[str] = set()
+        
+        self.task_runner = TaskRunner(self)
+        self.task_runner.running_changed.connect(self.handle_running_tasks_changed)
+        
+        # Incremented whenever the outputs are cleared so results of calculations started before are dropped
+        self.calculation_id = 0
+        
+        with startup_phase("MainWindow inputs/outputs"):
+            self.inputs = self.add_inputs()
+            self.outputs = self.add_outputs()
+            
+            self.set_input_defaults()
         
     def setup_ui(self) -> None:
         self.setMinimumSize(QtCore.QSize(1160, 900))
@@ -80,6 +152,21 @@ class MainWindow(QtWidgets.QMainWindow):
         self.menubar = QtWidgets.QMenuBar(self)
         self.setMenuBar(self.menubar)
         
+        self.statusbar = QtWidgets.QStatusBar(self)
+        self.setStatusBar(self.statusbar)
+        
+        self.task_progress_bar = QtWidgets.QProgressBar(self.statusbar)
+        self.task_progress_bar.setMaximumWidth(200)
+        self.task_progress_bar.setMaximumHeight(16)
+        self.task_progress_bar.hide()
+        
+        self.cancel_tasks_button = QtWidgets.QPushButton(self.statusbar)
+        self.cancel_tasks_button.setText("Cancel")
+        self.cancel_tasks_button.hide()
+        
+        self.statusbar.addPermanentWidget(self.task_progress_bar)
+        self.statusbar.addPermanentWidget(self.cancel_tasks_button)
+        
         self.file_menu = QtWidgets.QMenu(self.menubar)
         self.file_menu.setTitle("File")
         
@@ -88,9 +175,91 @@ class MainWindow(QtWidgets.QMainWindow):
         self.save_results_action.setShortcut("Ctrl+S")
         self.save_results_action.setDisabled(True)
         
+        self.save_scenario_action = QtGui.QAction(self)
+        self.save_scenario_action.setText("Save Scenario...")
+        self.save_scenario_action.setDisabled(True)
+        
+        self.load_scenario_action = QtGui.QAction(self)
+        self.load_scenario_action.setText("Load Scenario...")
+        self.load_scenario_action.setShortcut("Ctrl+O")
+        
+        self.export_sweep_action = QtGui.QAction(self)
+        self.export_sweep_action.setText("Export Sweep...")
+        
         self.file_menu.addAction(self.save_results_action)
+        self.file_menu.addAction(self.export_sweep_action)
+        self.file_menu.addSeparator()
+        self.file_menu.addAction(self.save_scenario_action)
+        self.file_menu.addAction(self.load_scenario_action)
+        
+        self.options_menu = QtWidgets.QMenu(self.menubar)
+        self.options_menu.setTitle("Options")
+        
+        self.live_update_action = QtGui.QAction(self)
+        self.live_update_action.setText("Live Update")
+        self.live_update_action.setCheckable(True)
+        
+        self.variable_specific_heats_action = QtGui.QAction(self)
+        self.variable_specific_heats_action.setText("Variable Specific Heats")
+        self.variable_specific_heats_action.setCheckable(True)
+        
+        self.units_menu = QtWidgets.QMenu(self.options_menu)
+        self.units_menu.setTitle("Units")
+        
+        # Only one unit system can be checked at a time
+        self.units_action_group = QtGui.QActionGroup(self)
+        for key, units in UNIT_SYSTEMS.items():
+            units_action = QtGui.QAction(self)
+            units_action.setText(units.name)
+            units_action.setData(key)
+            units_action.setCheckable(True)
+            units_action.setChecked(units is self.units)
+            self.units_action_group.addAction(units_action)
+            self.units_menu.addAction(units_action)
+        
+        self.profiling_menu = QtWidgets.QMenu(self.options_menu)
+        self.profiling_menu.setTitle("Profiling")
+        
+        self.record_profile_action = QtGui.QAction(self)
+        self.record_profile_action.setText("Record Profile")
+        self.record_profile_action.setCheckable(True)
+        self.record_profile_action.setChecked(self.profiler is not None)
+        
+        self.cprofile_action = QtGui.QAction(self)
+        self.cprofile_action.setText("Include cProfile")
+        self.cprofile_action.setCheckable(True)
+        self.cprofile_action.setDisabled(self.profiler is not None)
+        
+        self.save_profile_action = QtGui.QAction(self)
+        self.save_profile_action.setText("Save Profile...")
+        self.save_profile_action.setDisabled(self.profiler is None)
+        
+        self.profiling_menu.addAction(self.record_profile_action)
+        self.profiling_menu.addAction(self.cprofile_action)
+        self.profiling_menu.addSeparator()
+        self.profiling_menu.addAction(self.save_profile_action)
+        
+        self.options_menu.addAction(self.live_update_action)
+        self.options_menu.addAction(self.variable_specific_heats_action)
+        self.options_menu.addMenu(self.units_menu)
+        self.options_menu.addMenu(self.profiling_menu)
+        
+        self.graph_menu = QtWidgets.QMenu(self.menubar)
+        self.graph_menu.setTitle("Graph")
+        
+        self.sweep_overlay_action = QtGui.QAction(self)
+        self.sweep_overlay_action.setText("Sweep Overlay...")
+        
+        self.graph_menu.addAction(self.sweep_overlay_action)
         
         self.menubar.addAction(self.file_menu.menuAction())
+        self.menubar.addAction(self.options_menu.menuAction())
+        self.menubar.addAction(self.graph_menu.menuAction())
+        
+        # Coalesces input changes so live updates run at most once per frame
+        self.live_update_timer = QtCore.QTimer(self)
+        self.live_update_timer.setSingleShot(True)
+        self.live_update_timer.setInterval(16)
         
         self.output_groupbox = QtWidgets.QGroupBox(self.central_widget)
         self.output_groupbox.setTitle("Output")
@@ -171,6 +340,17 @@ class MainWindow(QtWidgets.QMainWindow):
         self.grid_layout.addWidget(self.reset_inputs_button, 3, 3, 1, 1)
         
         self.save_results_action.triggered.connect(self.handle_save_results_action)
+        self.export_sweep_action.triggered.connect(self.handle_export_sweep_action)
+        self.save_scenario_action.triggered.connect(self.handle_save_scenario_action)
+        self.load_scenario_action.triggered.connect(self.handle_load_scenario_action)
+        self.live_update_action.toggled.connect(self.handle_live_update_toggled)
+        self.variable_specific_heats_action.toggled.connect(self.handle_variable_specific_heats_toggled)
+        self.units_action_group.triggered.connect(self.handle_units_triggered)
+        self.sweep_overlay_action.triggered.connect(self.handle_sweep_overlay_action)
+        self.record_profile_action.toggled.connect(self.handle_record_profile_toggled)
+        self.save_profile_action.triggered.connect(self.handle_save_profile_action)
+        self.live_update_timer.timeout.connect(self.handle_live_update_timeout)
+        self.cancel_tasks_button.clicked.connect(self.handle_cancel_tasks_button)
         self.calculate_button.clicked.connect(self.handle_calculate_button)
         self.graph_button.clicked.connect(self.handle_graph_button)
         self.clear_output_button.clicked.connect(self.handle_clear_output_button)
@@ -344,45 +524,99 @@ class MainWindow(QtWidgets.QMainWindow):
     
     def handle_compression_ratio_change(self, new_value: float) -> None:
         self.compression_ratio = new_value
+        
+        self.queue_live_update("compression_ratio")
     
     def handle_specific_heat_pressure_change(self, new_value: float) -> None:
         self.specific_heat_pressure = new_value
         
-        self.adiabatic_index = calculate_adiabatic_index(self.specific_heat_pressure, self.specific_heat_volume)
-        if self.adiabatic_index is not None:
-            self.adiabatic_index_display.value = self.adiabatic_index
+        # With variable specific heats k comes from the property table, not C_p and C_v
+        if self.properties is None:
+            self.adiabatic_index = calculate_adiabatic_index(self.specific_heat_pressure, self.specific_heat_volume)
+            if self.adiabatic_index is not None:
+                self.adiabatic_index_display.value = self.adiabatic_index
+        
+        self.queue_live_update("specific_heat_pressure")
     
     def handle_specific_heat_volume_change(self, new_value: float) -> None:
         self.specific_heat_volume = new_value
         
-        self.adiabatic_index = calculate_adiabatic_index(self.specific_heat_pressure, self.specific_heat_volume)
-        if self.adiabatic_index is not None:
-            self.adiabatic_index_display.value = self.adiabatic_index
+        # With variable specific heats k comes from the property table, not C_p and C_v
+        if self.properties is None:
+            self.adiabatic_index = calculate_adiabatic_index(self.specific_heat_pressure, self.specific_heat_volume)
+            if self.adiabatic_index is not None:
+                self.adiabatic_index_display.value = self.adiabatic_index
+        
+        self.queue_live_update("specific_heat_volume")
     
     def handle_gas_constant_change(self, new_value: float) -> None:
         self.gas_constant = new_value
+        
+        self.queue_live_update("gas_constant")
     
     def handle_engine_displacement_change(self, new_value: float) -> None:
         self.engine_displacement = new_value
+        
+        self.queue_live_update("engine_displacement")
     
     def handle_initial_pressure_change(self, new_value: float) -> None:
         self.initial_pressure = new_value
+        
+        self.queue_live_update("initial_pressure")
     
     def handle_initial_temeprature_change(self, new_value: float) -> None:
         self.initial_temperature = new_value
+        
+        self.queue_live_update("initial_temperature")
     
     def handle_operating_temperature_change(self, new_value: float) -> None:
         self.operating_temperature = new_value
+        
+        self.queue_live_update("operating_temperature")
+    
+    def queue_live_update(self, name: str) -> None:
+        if not (self.live_update_action.isChecked() and self.calculated):
+            return
+        
+        # Calculations still running are for the inputs before this change, their results would overwrite the live ones
+        self.calculation_id += 1
+        
+        self.pending_changes.add(name)
+        if not self.live_update_timer.isActive():
+            self.live_update_timer.start()
     
     def set_input_defaults(self) -> None:
+        # The defaults are in the calculator's (US) units
         self.compression_ratio_input.value = 8
-        self.specific_heat_pressure_input.value = .24
-        self.specific_heat_volume_input.value = .17
-        self.gas_constant_input.value = 53.3
-        self.engine_displacement_input.value = 258
-        self.initial_pressure_input.value = 14.7
-        self.initial_temperature_input.value = 70
-        self.operating_temperature_input.value = convert_rankine_to_farhenheit(4130)
+        self.specific_heat_pressure_input.value = convert("specific_heat_pressure", .24, US, self.units)
+        self.specific_heat_volume_input.value = convert("specific_heat_volume", .17, US, self.units)
+        self.gas_constant_input.value = convert("gas_constant", 53.3, US, self.units)
+        self.engine_displacement_input.value = convert("engine_displacement", 258, US, self.units)
+        self.initial_pressure_input.value = convert("initial_pressure", 14.7, US, self.units)
+        self.initial_temperature_input.value = convert("initial_temperature", 70, US, self.units)
+        self.operating_temperature_input.value = convert("operating_temperature", convert_rankine_to_farhenheit(4130), US, self.units)
+    
+    def update_unit_suffixes(self) -> None:
+        widgets = [
+            (self.specific_heat_pressure_input, "specific_heat"),
+            (self.specific_heat_volume_input, "specific_heat"),
+            (self.gas_constant_input, "gas_constant"),
+            (self.engine_displacement_input, "volume"),
+            (self.initial_pressure_input, "pressure"),
+            (self.initial_temperature_input, "temperature"),
+            (self.operating_temperature_input, "temperature"),
+            (self.air_mass_display, "mass"),
+            (self.total_work_display, "energy")
+        ]
+        for stage in range(1, 5):
+            for quantity in ("pressure", "temperature", "volume"):
+                widgets.append((getattr(self, f"stage_{stage}_initial_{quantity}_display"), quantity))
+                widgets.append((getattr(self, f"stage_{stage}_final_{quantity}_display"), quantity))
+            widgets.append((getattr(self, f"stage_{stage}_heat_display"), "energy"))
+            widgets.append((getattr(self, f"stage_{stage}_work_display"), "energy"))
+        
+        for widget, quantity in widgets:
+            widget.set_suffix(getattr(self.units, quantity).symbol)
         
     def refresh_output_display(self, clear: bool = False) -> None:
         if clear:
@@ -390,6 +624,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 output.value = 0
             return
         
+        self.adiabatic_index_display.value = self.adiabatic_index
         self.air_mass_display.value = self.air_mass
         self.total_work_display.value = self.total_work
         self.thermal_efficiency_display.value = (self.thermal_efficiency * 100)
@@ -426,215 +661,328 @@ class MainWindow(QtWidgets.QMainWindow):
         self.stage_4_final_volume_display.value = self.initial_volume
         self.stage_4_heat_display.value = self.stage_4_heat
     
-    def calculate(self) -> None:
-        self.initial_volume = convert_cubic_feet_to_cubic_inches(
-            calculate_initial_volume(
-                self.compression_ratio,
-                convert_cubic_inches_to_cubic_feet(self.engine_displacement)
-            )
+    def get_inputs(self) -> OttoCycleInputs:
+        return OttoCycleInputs(
+            self.compression_ratio,
+            self.specific_heat_pressure,
+            self.specific_heat_volume,
+            self.gas_constant,
+            self.engine_displacement,
+            self.initial_pressure,
+            self.initial_temperature,
+            self.operating_temperature
         )
+    
+    def solve_cycle(self, task: Task, cache: CycleCache, inputs: OttoCycleInputs) -> OttoCycleResult:
+        """
+        Solve on the thread pool with the cache current when the task was started, `self.cache` can be replaced meanwhile
+        """
+        with profiling.span("MainWindow.solve_cycle"):
+            return cache.solve(inputs)
+    
+    def set_result(self, result: OttoCycleResult) -> None:
+        self.result = result
         
-        self.air_mass = calculate_air_mass(
-            convert_psi_to_psf(self.initial_pressure),
-            convert_farhenheit_to_rankine(self.initial_temperature),
-            convert_cubic_inches_to_cubic_feet(self.initial_volume),
-            self.gas_constant
-        )
+        for name in OTTO_CYCLE_OUTPUTS:
+            setattr(self, name, getattr(self.result, name))
+    
+    def run_task(self, function: Any, *args: Any, **kwargs: Any) -> Task:
+        """
+        Run `function(task, *args)` on the thread pool, showing its progress in the status bar
+        """
+        self.task_progress_bar.setRange(0, 0)
         
-        self.stage_1_final_pressure = convert_psf_to_psi(
-            calculate_final_pressure_adiabatic(
-                self.compression_ratio,
-                self.adiabatic_index,
-                convert_psi_to_psf(self.initial_pressure)
-            )
-        )
-        self.stage_1_final_temperature = convert_rankine_to_farhenheit(
-            calculate_final_temperature_adiabatic(
-                self.compression_ratio,
-                self.adiabatic_index,
-                convert_farhenheit_to_rankine(self.initial_temperature)
-            )
-        )
-        self.stage_1_final_volume = convert_cubic_feet_to_cubic_inches(
-            calculate_final_volume(
-                self.compression_ratio,
-                convert_cubic_inches_to_cubic_feet(self.initial_volume)
-            )
-        )
-        self.stage_1_work = convert_ft_lbf_to_btu(
-            calculate_work_adiabatic(
-                self.adiabatic_index,
-                convert_psi_to_psf(self.initial_pressure),
-                convert_cubic_inches_to_cubic_feet(self.initial_volume),
-                convert_psi_to_psf(self.stage_1_final_pressure), 
-                convert_cubic_inches_to_cubic_feet(self.stage_1_final_volume)
-            )
-        )
+        kwargs.setdefault("on_cancelled", self.handle_task_cancelled)
+        kwargs.setdefault("on_failed", self.handle_task_failed)
         
-        self.stage_2_final_pressure = convert_psf_to_psi(
-            calculate_final_pressure_constant_volume(
-                convert_psi_to_psf(self.stage_1_final_pressure),
-                convert_farhenheit_to_rankine(self.operating_temperature), 
-                convert_farhenheit_to_rankine(self.stage_1_final_temperature)
-            )
-        )
-        self.stage_2_heat = calculate_heat(
-            self.specific_heat_volume,
-            self.air_mass,
-            convert_farhenheit_to_rankine(self.operating_temperature),
-            convert_farhenheit_to_rankine(self.stage_1_final_temperature)
-        )
+        return self.task_runner.start(function, *args, on_progress=self.handle_task_progress, **kwargs)
+    
+    def get_graph_data(self, result: OttoCycleResult) -> tuple[np.ndarray, np.ndarray]:
+        import math
         
-        self.stage_3_final_pressure = convert_psf_to_psi(
-            calculate_final_pressure_adiabatic(
-                self.compression_ratio,
-                self.adiabatic_index,
-                convert_psi_to_psf(self.stage_2_final_pressure),
-                compression=False # Expansion stroke
-            )
-        )
-        self.stage_3_final_temperature = convert_rankine_to_farhenheit(
-            calculate_final_temperature_adiabatic(
-                self.compression_ratio,
-                self.adiabatic_index,
-                convert_farhenheit_to_rankine(self.operating_temperature), 
-                compression=False # Expansion stroke
-            )
-        )
-        self.stage_3_work = convert_ft_lbf_to_btu(
-            calculate_work_adiabatic(
-                self.adiabatic_index,
-                convert_psi_to_psf(self.stage_2_final_pressure),
-                convert_cubic_inches_to_cubic_feet(self.stage_1_final_volume),
-                convert_psi_to_psf(self.stage_3_final_pressure),
-                convert_cubic_inches_to_cubic_feet(self.initial_volume)
-            )
+        import numpy as np
+        
+        from graph import get_adiabatic_data
+        
+        units = result.units
+        
+        # Polytropic exponents through each stage's end states, these equal k unless the specific heats vary with temperature
+        compression_ratio = result.inputs.compression_ratio
+        compression_index = math.log(result.stage_1_final_pressure / result.inputs.initial_pressure) / math.log(compression_ratio)
+        expansion_index = math.log(result.stage_2_final_pressure / result.stage_3_final_pressure) / math.log(compression_ratio)
+        
+        # Both adiabatic stages and the closing point are written into one buffer that is handed to pyqtgraph as is
+        volumes = np.empty((2 * self.graph_points) + 1, dtype=np.float64)
+        pressures = np.empty((2 * self.graph_points) + 1, dtype=np.float64)
+        
+        get_adiabatic_data(
+            compression_index,
+            units.pressure.to_internal(result.inputs.initial_pressure),
+            units.volume.to_internal(result.initial_volume),
+            units.volume.to_internal(result.stage_1_final_volume),
+            out=(volumes[:self.graph_points], pressures[:self.graph_points]),
+            units=units
         )
         
-        self.stage_4_heat = calculate_heat(
-            self.specific_heat_volume,
-            self.air_mass,
-            convert_farhenheit_to_rankine(self.initial_temperature),
-            convert_farhenheit_to_rankine(self.stage_3_final_temperature)
+        get_adiabatic_data(
+            expansion_index,
+            units.pressure.to_internal(result.stage_2_final_pressure),
+            units.volume.to_internal(result.stage_1_final_volume),
+            units.volume.to_internal(result.initial_volume),
+            out=(volumes[self.graph_points:-1], pressures[self.graph_points:-1]),
+            units=units
         )
         
-        self.total_work = calculate_total_work(self.stage_1_work, self.stage_3_work)
-        self.thermal_efficiency = calculate_thermal_efficiency(self.total_work, self.stage_2_heat)
+        volumes[-1] = volumes[0]
+        pressures[-1] = pressures[0]
+        
+        return (volumes, pressures)
     
-    def graph(self) -> None:
-        stage_1_data = get_adiabatic_data(
-            self.adiabatic_index,
-            convert_psi_to_psf(self.initial_pressure),
-            convert_cubic_inches_to_cubic_feet(self.initial_volume),
-            convert_cubic_inches_to_cubic_feet(self.stage_1_final_volume)
-        )
+    def graph(self, combined_data: tuple[np.ndarray, np.ndarray]) -> None:
+        with profiling.span("MainWindow.graph"):
+            pg = import_pyqtgraph()
+            
+            # Create a plot window
+            self.graph_window = pg.plot(*combined_data, title="Otto Cycle", labels={"left": f"Pressure ({self.units.pressure.symbol})", "bottom": f"Volume ({self.units.volume.symbol})"}, pen=(59, 166, 237), antialias=True, skipFiniteCheck=True)
+            self.graph_window.setWindowIcon(QtGui.QIcon(get_file_path("assets/Trine.ico")))
+            self.graph_curve = self.graph_window.getPlotItem().listDataItems()[0]
+            
+            self.graph_window.closeEvent = self.handle_graph_window_close
+    
+    def update_graph(self) -> None:
+        if self.graph_curve is None:
+            return
         
-        stage_3_data = get_adiabatic_data(
-            self.adiabatic_index,
-            convert_psi_to_psf(self.stage_2_final_pressure),
-            convert_cubic_inches_to_cubic_feet(self.stage_1_final_volume),
-            convert_cubic_inches_to_cubic_feet(self.initial_volume)
-        )
+        with profiling.span("MainWindow.update_graph"):
+            self.graph_curve.setData(*self.get_graph_data(self.result), skipFiniteCheck=True)
+    
+    def get_sweep_overlay(self, task: Task, inputs: OttoCycleInputs, name: str, start: float, stop: float, cycles: int, diagram: str, properties: PropertyTable | None, units: UnitSystem) -> CycleOverlay:
+        import numpy as np
         
-        combined_data = (
-            stage_1_data[0] + stage_3_data[0] + stage_1_data[0][0:1],
-            stage_1_data[1] + stage_3_data[1] + stage_1_data[1][0:1]
-        )
+        from graph import CycleOverlay, get_cycle_overlay_data
+        
+        values = {input_name: getattr(inputs, input_name) for input_name in OTTO_CYCLE_INPUTS}
+        values[name] = np.linspace(start, stop, cycles)
+        
+        with profiling.span("MainWindow.get_sweep_overlay.solve"):
+            outputs = solve_otto_cycle_batch(**values, properties=properties, units=units)
+        task.check_cancelled()
+        
+        with profiling.span("MainWindow.get_sweep_overlay.overlay"):
+            overlay = CycleOverlay(*get_cycle_overlay_data(values, outputs, diagram, units=units))
+        if overlay.cycles == 0:
+            raise ValueError("None of the swept inputs form a valid cycle")
+        
+        return overlay
+    
+    def graph_overlay(self, overlay: CycleOverlay, diagram: str, units: UnitSystem) -> None:
+        pg = import_pyqtgraph()
+        
+        if diagram == "pv":
+            labels = {"left": f"Pressure ({units.pressure.symbol})", "bottom": f"Volume ({units.volume.symbol})"}
+        else:
+            labels = {"left": f"Temperature ({units.temperature.symbol})", "bottom": f"Entropy, s - s_1 ({units.specific_heat.symbol})"}
+        
+        if self.overlay_window is not None:
+            self.overlay_window.close()
+        
+        self.overlay_window = pg.plot(title=f"Otto Cycle Overlay ({overlay.cycles} Cycles)", labels=labels)
+        self.overlay_window.setWindowIcon(QtGui.QIcon(get_file_path("assets/Trine.ico")))
+        self.overlay_window.closeEvent = self.handle_overlay_window_close
+        
+        # All the cycles are one translucent curve so dense regions show up darker, the view is set from the data once so it isn't fitted to the clipped curve
+        self.overlay = overlay
+        self.overlay_curve = pg.PlotDataItem(pen=pg.mkPen((59, 166, 237, 60)), antialias=False, skipFiniteCheck=True)
+        plot_item = self.overlay_window.getPlotItem()
+        plot_item.addItem(self.overlay_curve)
+        plot_item.hideButtons()
         
-        # Create a plot window
-        self.graph_window = pg.plot(*combined_data, title="Otto Cycle", labels={"left": "Pressure (psi)", "bottom": "Volume (in^3)"}, pen=(59, 166, 237), antialias=True, skipFiniteCheck=True)
-        self.graph_window.setWindowIcon(QtGui.QIcon(get_file_path("assets/Trine.ico")))
+        x_min, x_max, y_min, y_max = overlay.bounds
+        plot_item.setRange(xRange=(x_min, x_max), yRange=(y_min, y_max))
+        plot_item.getViewBox().sigRangeChanged.connect(self.update_overlay)
         
-        self.graph_window.closeEvent = self.handle_graph_window_close
+        self.update_overlay()
+    
+    def update_overlay(self) -> None:
+        if self.overlay_curve is None:
+            return
+        
+        with profiling.span("MainWindow.update_overlay"):
+            view = self.overlay_window.getPlotItem().getViewBox().viewRect()
+            data = self.overlay.display_data((view.left(), view.right(), min(view.top(), view.bottom()), max(view.top(), view.bottom())))
+            if data is None:
+                return
+            
+            x, y, connect = data
+            self.overlay_curve.setData(x, y, connect=connect, skipFiniteCheck=True)
     
     def handle_save_results_action(self) -> None:
         if not self.calculated:
             return
         
-        file_path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Results", str(Path.home() / "Documents"), "Text Files (*.txt)")
+        file_path, selected_filter = QtWidgets.QFileDialog.getSaveFileName(self, "Save Results", str(Path.home() / "Documents"), ";;".join(SAVE_RESULTS_FILTERS))
         
         if file_path:
-            with open(file_path, "w") as file:
-                # Header
-                file.write("Otto Cycle Calculator Results:\n")
-                if self._app_version is not None:
-                    file.write(f"Generated by Otto Cycle Calculator {self._app_version} on {dt.datetime.now().strftime('%B %d, %Y %I:%M:%S %p')}\n\n\n")
-                else:
-                    file.write(f"Generated by Otto Cycle Calculator on {dt.datetime.now().strftime('%B %d, %Y %I:%M:%S %p')}\n\n\n")
-                
-                
-                # Inputs
-                file.write("Inputs:\n")
-                file.write(f"\tCompression Ratio (CR): {self.compression_ratio:.2f}\n")
-                file.write(f"\tSpecific Heat at Constant Pressure (C_p): {self.specific_heat_pressure:.3f} Btu/lb-°F\n")
-                file.write(f"\tSpecific Heat at Constant Volume (C_v): {self.specific_heat_volume:.3f} Btu/lb-°F\n")
-                file.write(f"\tAdiabatic Index (k): {self.adiabatic_index:.4f}\n")
-                file.write(f"\tGas Constant (R): {self.gas_constant:.4f} lbf-ft/lbm-°R\n")
-                file.write(f"\tEngine Displacement (deltaV): {self.engine_displacement:.2f} in^3\n")
-                file.write(f"\tInitial Pressure (P_1): {self.initial_pressure:.2f} psi\n")
-                file.write(f"\tInitial Temperature (T_1): {self.initial_temperature:.2f} °F\n")
-                file.write(f"\tOperating Temperature (T_3): {self.operating_temperature:.2f} °F\n\n\n")
-                
-                
-                # Outputs
-                file.write("Outputs:\n")
-                
-                file.write("\tGeneral:\n")
-                file.write(f"\t\tAir Mass (m_air): {self.air_mass:.4f} lbm\n")
-                file.write(f"\t\tTotal Work (Work_total): {self.total_work:.2f} Btu\n")
-                file.write(f"\t\tThermal Efficiency (Efficiency): {(self.thermal_efficiency * 100):.2f}%\n\n")
-                
-                file.write("\tStage 1 -> 2 (Adiabatic Compression):\n")
-                file.write(f"\t\tInitial Pressure (P_1): {self.initial_pressure:.2f} psi\n")
-                file.write(f"\t\tInitial Temperature (T_1): {self.initial_temperature:.2f} °F\n")
-                file.write(f"\t\tInitial Volume (V_1): {self.initial_volume:.2f} in^3\n")
-                file.write(f"\t\tFinal Pressure (P_2): {self.stage_1_final_pressure:.2f} psi\n")
-                file.write(f"\t\tFinal Temperature (T_2): {self.stage_1_final_temperature:.2f} °F\n")
-                file.write(f"\t\tFinal Volume (V_2): {self.stage_1_final_volume:.2f} in^3\n")
-                file.write(f"\t\tHeat (Q_1): 0 Btu\n")
-                file.write(f"\t\tWork (Work_1): {self.stage_1_work:.2f} Btu\n\n")
-                
-                file.write("\tStage 2 -> 3 (Combustion):\n")
-                file.write(f"\t\tInitial Pressure (P_2): {self.stage_1_final_pressure:.2f} psi\n")
-                file.write(f"\t\tInitial Temperature (T_2): {self.stage_1_final_temperature:.2f} °F\n")
-                file.write(f"\t\tInitial Volume (V_2): {self.stage_1_final_volume:.2f} in^3\n")
-                file.write(f"\t\tFinal Pressure (P_3): {self.stage_2_final_pressure:.2f} psi\n")
-                file.write(f"\t\tFinal Temperature (T_3): {self.operating_temperature:.2f} °F\n")
-                file.write(f"\t\tFinal Volume (V_3): {self.stage_1_final_volume:.2f} in^3\n")
-                file.write(f"\t\tHeat (Q_2): {self.stage_2_heat:.2f} Btu\n")
-                file.write(f"\t\tWork (Work_2): 0 Btu\n\n")
-                
-                file.write("\tStage 3 -> 4 (Adiabatic Expansion):\n")
-                file.write(f"\t\tInitial Pressure (P_3): {self.stage_2_final_pressure:.2f} psi\n")
-                file.write(f"\t\tInitial Temperature (T_3): {self.operating_temperature:.2f} °F\n")
-                file.write(f"\t\tInitial Volume (V_3): {self.stage_1_final_volume:.2f} in^3\n")
-                file.write(f"\t\tFinal Pressure (P_4): {self.stage_3_final_pressure:.2f} psi\n")
-                file.write(f"\t\tFinal Temperature (T_4): {self.stage_3_final_temperature:.2f} °F\n")
-                file.write(f"\t\tFinal Volume (V_4): {self.initial_volume:.2f} in^3\n")
-                file.write(f"\t\tHeat (Q_3): 0 Btu\n")
-                file.write(f"\t\tWork (Work_3): {self.stage_3_work:.2f} Btu\n\n")
-                
-                file.write("\tStage 4 -> 1 (Heat Rejection):\n")
-                file.write(f"\t\tInitial Pressure (P_4): {self.stage_3_final_pressure:.2f} psi\n")
-                file.write(f"\t\tInitial Temperature (T_4): {self.stage_3_final_temperature:.2f} °F\n")
-                file.write(f"\t\tInitial Volume (V_4): {self.initial_volume:.2f} in^3\n")
-                file.write(f"\t\tFinal Pressure (P_1): {self.initial_pressure:.2f} psi\n")
-                file.write(f"\t\tFinal Temperature (T_1): {self.initial_temperature:.2f} °F\n")
-                file.write(f"\t\tFinal Volume (V_1): {self.initial_volume:.2f} in^3\n")
-                file.write(f"\t\tHeat (Q_4): {self.stage_4_heat:.2f} Btu\n")
-                file.write(f"\t\tWork (Work_4): 0 Btu\n\n\n")
-                
-                file.write("Otto Cycle Calcultor. © 2025 Nicholas Ewing. All rights reserved.")
+            self.run_task(self.save_results, file_path, self.result, SAVE_RESULTS_FILTERS.get(selected_filter, "text"), on_finished=self.handle_save_results_finished)
+    
+    def save_results(self, task: Task, file_path: str, result: OttoCycleResult, output_format: str = "text") -> str:
+        # Text reports keep the platform's default encoding they have always been saved in
+        with open(file_path, "w", encoding=None if output_format == "text" else "utf-8", newline=None if output_format == "text" else "") as file:
+            # Timed on the pool thread where the report is written, submitting the task takes no time worth measuring
+            with profiling.span("MainWindow.save_results"):
+                write_results(file, (result,), output_format, result.units, self._app_version)
+        
+        return file_path
+    
+    def handle_save_results_finished(self, file_path: str) -> None:
+        QtWidgets.QMessageBox.information(self, "Results Saved", f"Results saved to <a href=\"file:///{file_path}\">{file_path.split('/')[-1]}</a>")
+    
+    def handle_export_sweep_action(self) -> None:
+        dialog = SweepDialog(self, [(name, getattr(self, f"{name}_input").label_text, getattr(self, name)) for name in OTTO_CYCLE_INPUTS], "Export Sweep", max_cycles=100000000, choose_diagram=False)
+        if dialog.exec() != QtWidgets.QDialog.DialogCode.Accepted:
+            return
+        
+        file_path, selected_filter = QtWidgets.QFileDialog.getSaveFileName(self, "Export Sweep", str(Path.home() / "Documents"), ";;".join(SAVE_RESULTS_FILTERS))
+        if not file_path:
+            return
+        
+        import numpy as np
+        
+        from sweep import ParameterSweep
+        
+        # Sweeps run in the calculator's units, the swept input is spaced evenly in the units it was entered in
+        name, start, stop, cycles = dialog.sweep()
+        axes = {input_name: convert(input_name, getattr(self, input_name), self.units, US) for input_name in OTTO_CYCLE_INPUTS}
+        axes[name] = convert(name, np.linspace(start, stop, cycles), self.units, US)
+        
+        # Solved on the task's own thread, a process pool can't be started safely from a running Qt application
+        sweep = ParameterSweep(**axes, max_workers=1, properties=self.properties)
+        
+        self.run_task(self.export_sweep, sweep, file_path, SAVE_RESULTS_FILTERS.get(selected_filter, "text"), self.units, on_finished=self.handle_export_sweep_finished)
+    
+    def export_sweep(self, task: Task, sweep: ParameterSweep, file_path: str, output_format: str, units: UnitSystem) -> tuple[str, int, float]:
+        """
+        Solve a sweep chunk by chunk, streaming each chunk to a report in `units` with progress, a cancelled export's partial file is deleted
+        """
+        def write_chunk(chunk: SweepChunk) -> None:
+            with profiling.span("MainWindow.export_sweep.write_chunk"):
+                writer.write_block({name: convert(name, value, US, units) for name, value in (chunk.inputs | chunk.outputs).items()})
+        
+        try:
+            with open(file_path, "w", encoding=None if output_format == "text" else "utf-8", newline=None if output_format == "text" else "") as file, ReportWriter(file, output_format, units, self._app_version) as writer:
+                points, points_per_second = run_sweep(task, sweep, write_chunk)
+        except TaskCancelled:
+            Path(file_path).unlink(missing_ok=True)
+            raise
+        
+        return (file_path, points, points_per_second)
+    
+    def handle_export_sweep_finished(self, exported: tuple[str, int, float]) -> None:
+        file_path, points, points_per_second = exported
+        QtWidgets.QMessageBox.information(self, "Sweep Exported", f"Exported {points:,} cycles ({points_per_second:,.0f} per second) to <a href=\"file:///{file_path}\">{file_path.split('/')[-1]}</a>")
+    
+    def get_scenarios(self) -> ScenarioLibrary:
+        if self.scenarios is None:
+            SCENARIO_LIBRARY_PATH.parent.mkdir(parents=True, exist_ok=True)
+            self.scenarios = ScenarioLibrary(str(SCENARIO_LIBRARY_PATH))
+        
+        return self.scenarios
+    
+    def handle_save_scenario_action(self) -> None:
+        if not self.calculated:
+            return
+        
+        name, accepted = QtWidgets.QInputDialog.getText(self, "Save Scenario", "Scenario name:")
+        if not accepted or not name.strip():
+            return
+        
+        self.get_scenarios().save(name.strip(), self.result, self.properties)
+        self.statusbar.showMessage(f"Saved scenario {name.strip()}", 5000)
+    
+    def handle_load_scenario_action(self) -> None:
+        dialog = ScenarioDialog(self, self.get_scenarios(), self.units)
+        if dialog.exec() != QtWidgets.QDialog.DialogCode.Accepted or dialog.scenario() is None:
+            return
+        
+        self.load_scenario(dialog.scenario())
+    
+    def get_scenario_gas(self, scenario: Scenario) -> str | None:
+        """
+        The gas of a variable-property scenario if its property table is one the GUI builds, None otherwise
+        """
+        from properties import GASES, PropertyTable
+        
+        if self.properties is not None and repr(self.properties) == scenario.properties:
+            return self.properties.gas
+        
+        return next((gas for gas in GASES if repr(PropertyTable(gas)) == scenario.properties), None)
+    
+    def load_scenario(self, scenario: Scenario) -> None:
+        """
+        Show a stored scenario's inputs and outputs as they were solved, without solving it again
+        
+        Scenarios solved with a property table the GUI can't build (a custom temperature range or step from scripts) aren't loaded, as recalculating them would silently switch property models
+        """
+        gas = None
+        if scenario.properties is not None:
+            gas = self.get_scenario_gas(scenario)
+            if gas is None:
+                QtWidgets.QMessageBox.warning(self, "Load Scenario", f"\"{scenario.name}\" was solved with {scenario.properties}, which can't be used from the GUI")
+                return
+        
+        with profiling.span("MainWindow.load_scenario"):
+            # Drop calculations still running for the previous inputs
+            self.calculation_id += 1
+            
+            if scenario.properties != (repr(self.properties) if self.properties is not None else None):
+                with QtCore.QSignalBlocker(self.variable_specific_heats_action):
+                    self.variable_specific_heats_action.setChecked(gas is not None)
+                self.set_variable_specific_heats(gas is not None, gas or "air")
+            
+            for name in OTTO_CYCLE_INPUTS:
+                getattr(self, f"{name}_input").value = getattr(scenario.result.inputs, name)
             
-            QtWidgets.QMessageBox.information(self, "Results Saved", f"Results saved to <a href=\"file:///{file_path}\">{file_path.split('/')[-1]}</a>")
+            # The inputs were set from the scenario, there is nothing to update live
+            self.live_update_timer.stop()
+            self.pending_changes.clear()
+            
+            self.set_result(scenario.result)
+            self.refresh_output_display()
+            self.update_graph()
+        
+        self.calculated = True
+        self.save_results_action.setEnabled(True)
+        self.save_scenario_action.setEnabled(True)
+        self.graph_button.setEnabled(True)
     
     def handle_calculate_button(self) -> None:
-        self.calculate()
+        self.calculate_button.setEnabled(False)
+        
+        calculation_id = self.calculation_id
+        cache = self.cache
+        self.run_task(
+            self.solve_cycle,
+            cache,
+            self.get_inputs(),
+            on_finished=lambda result: self.handle_calculate_finished(result, calculation_id, cache)
+        )
+    
+    def handle_calculate_finished(self, result: OttoCycleResult, calculation_id: int, cache: CycleCache) -> None:
+        self.calculate_button.setEnabled(True)
         
-        self.refresh_output_display()
+        # The outputs were cleared while calculating, or the result is for a property model or unit system no longer selected
+        if calculation_id != self.calculation_id or cache is not self.cache:
+            return
+        
+        with profiling.span("MainWindow.handle_calculate_finished"):
+            self.set_result(result)
+            
+            self.refresh_output_display()
+            self.update_graph()
         
         self.calculated = True
         self.save_results_action.setEnabled(True)
+        self.save_scenario_action.setEnabled(True)
         self.graph_button.setEnabled(True)
     
     def handle_graph_button(self) -> None:
@@ -646,33 +994,224 @@ class MainWindow(QtWidgets.QMainWindow):
             self.graph_window.activateWindow()
             return
         
-        self.graph()
+        self.graph_button.setEnabled(False)
+        self.run_task(lambda task, result: self.get_graph_data(result), self.result, on_finished=self.handle_graph_data_finished)
+    
+    def handle_graph_data_finished(self, combined_data: tuple[np.ndarray, np.ndarray]) -> None:
+        self.graph_button.setEnabled(self.calculated)
+        
+        if self.calculated and self.graph_window is None:
+            self.graph(combined_data)
+    
+    def handle_sweep_overlay_action(self) -> None:
+        dialog = SweepDialog(self, [(name, getattr(self, f"{name}_input").label_text, getattr(self, name)) for name in OTTO_CYCLE_INPUTS])
+        if dialog.exec() != QtWidgets.QDialog.DialogCode.Accepted:
+            return
+        
+        diagram = dialog.diagram()
+        units = self.units
+        self.run_task(self.get_sweep_overlay, self.get_inputs(), *dialog.sweep(), diagram, self.properties, units, on_finished=lambda overlay: self.graph_overlay(overlay, diagram, units))
+    
+    def handle_task_progress(self, fraction: float) -> None:
+        self.task_progress_bar.setRange(0, 1000)
+        self.task_progress_bar.setValue(round(fraction * 1000))
+    
+    def handle_task_failed(self, error: str) -> None:
+        self.calculate_button.setEnabled(True)
+        self.graph_button.setEnabled(self.calculated)
+        
+        QtWidgets.QMessageBox.critical(self, "Error", error.strip().splitlines()[-1])
+    
+    def handle_task_cancelled(self) -> None:
+        self.calculate_button.setEnabled(True)
+        self.graph_button.setEnabled(self.calculated)
+    
+    def handle_running_tasks_changed(self, running: int) -> None:
+        self.task_progress_bar.setVisible(running > 0)
+        self.cancel_tasks_button.setVisible(running > 0)
+    
+    def handle_cancel_tasks_button(self) -> None:
+        self.task_runner.cancel_all()
+    
+    def handle_live_update_toggled(self, checked: bool) -> None:
+        self.pending_changes.clear()
+        
+        if checked:
+            self.handle_calculate_button()
+    
+    def handle_live_update_timeout(self) -> None:
+        if not (self.live_update_action.isChecked() and self.calculated):
+            self.pending_changes.clear()
+            return
+        
+        # The variable-property cycle isn't split into steps, it is solved again in full on the thread pool like Calculate
+        if self.properties is not None:
+            self.pending_changes.clear()
+            
+            calculation_id = self.calculation_id
+            cache = self.cache
+            self.run_task(
+                self.solve_cycle,
+                cache,
+                self.get_inputs(),
+                on_finished=lambda result: self.handle_live_update_finished(result, calculation_id, cache),
+                # The last valid outputs stay in place while an input passes through an invalid value
+                on_failed=lambda error: None
+            )
+            return
+        
+        values = {name: getattr(self, name) for name in (OTTO_CYCLE_INPUTS + OTTO_CYCLE_OUTPUTS)}
+        
+        try:
+            updated = recompute(values, self.pending_changes, self.units)
+        except (ArithmeticError, TypeError):
+            # Leave the last valid outputs (and the pending changes) in place while an input passes through an invalid value (e.g. CR = 1 while typing)
+            return
+        
+        self.pending_changes.clear()
+        
+        for name in updated:
+            setattr(self, name, values[name])
+        
+        self.result = OttoCycleResult(
+            OttoCycleInputs(*(values[name] for name in OTTO_CYCLE_INPUTS)),
+            *(values[name] for name in OTTO_CYCLE_OUTPUTS),
+            self.units
+        )
+        
+        self.refresh_output_display()
+        self.update_graph()
+    
+    def handle_live_update_finished(self, result: OttoCycleResult, calculation_id: int, cache: CycleCache) -> None:
+        # The inputs changed again or the outputs were cleared while solving, or the property model or units changed
+        if calculation_id != self.calculation_id or cache is not self.cache or not self.calculated:
+            return
+        
+        self.set_result(result)
+        self.refresh_output_display()
+        self.update_graph()
+    
+    def handle_record_profile_toggled(self, checked: bool) -> None:
+        if checked:
+            self.profiler = profiling.enable(self.cprofile_action.isChecked())
+        else:
+            profiling.disable()
+        
+        # cProfile can only be chosen before recording starts
+        self.cprofile_action.setDisabled(checked)
+        self.save_profile_action.setEnabled(self.profiler is not None)
+    
+    def handle_save_profile_action(self) -> None:
+        if self.profiler is None:
+            return
+        
+        directory = QtWidgets.QFileDialog.getExistingDirectory(self, "Save Profile", str(Path.home() / "Documents"))
+        if not directory:
+            return
+        
+        # Saved on the GUI thread, the thread cProfile runs on
+        paths = self.profiler.save(directory)
+        QtWidgets.QMessageBox.information(self, "Profile Saved", f"Saved {', '.join(path.name for path in paths)} to <a href=\"file:///{directory}\">{directory}</a>")
+    
+    def set_variable_specific_heats(self, variable: bool, gas: str = "air") -> None:
+        if variable:
+            from properties import PropertyTable
+            
+            self.properties = PropertyTable(gas)
+        else:
+            self.properties = None
+        
+        # Cached results are only valid for the property model they were solved with
+        self.cache = CycleCache(max_entries=1024, properties=self.properties, units=self.units)
+        
+        self.specific_heat_pressure_input.setEnabled(not variable)
+        self.specific_heat_volume_input.setEnabled(not variable)
+    
+    def handle_variable_specific_heats_toggled(self, checked: bool) -> None:
+        self.set_variable_specific_heats(checked)
+        
+        if self.calculated:
+            self.handle_calculate_button()
+        elif not checked:
+            self.adiabatic_index = calculate_adiabatic_index(self.specific_heat_pressure, self.specific_heat_volume)
+            if self.adiabatic_index is not None:
+                self.adiabatic_index_display.value = self.adiabatic_index
+    
+    def handle_units_triggered(self, action: QtGui.QAction) -> None:
+        units = UNIT_SYSTEMS[action.data()]
+        if units is self.units:
+            return
+        
+        previous_units = self.units
+        self.units = units
+        
+        # Cached results are only valid for the unit system they were solved in
+        self.cache = CycleCache(max_entries=1024, properties=self.properties, units=self.units)
+        
+        # Convert the entered inputs so they describe the same cycle, the change handlers store the new values
+        for name in OTTO_CYCLE_INPUTS:
+            getattr(self, f"{name}_input").value = convert(name, getattr(self, name), previous_units, self.units)
+        
+        self.update_unit_suffixes()
+        
+        if self.graph_window is not None:
+            self.graph_window.setLabel("left", f"Pressure ({self.units.pressure.symbol})")
+            self.graph_window.setLabel("bottom", f"Volume ({self.units.volume.symbol})")
+        
+        # The outputs are solved again in the new units instead of being converted
+        self.live_update_timer.stop()
+        self.pending_changes.clear()
+        if self.calculated:
+            self.handle_calculate_button()
     
     def handle_clear_output_button(self) -> None:
+        self.calculation_id += 1
+        
         self.refresh_output_display(clear=True)
 
         self.calculated = False
         self.save_results_action.setEnabled(False)
+        self.save_scenario_action.setEnabled(False)
         self.graph_button.setEnabled(False)
     
     def handle_reset_inputs_button(self) -> None:
+        self.calculation_id += 1
+        
         self.set_input_defaults()
         
         self.refresh_output_display(clear=True)
 
         self.calculated = False
         self.save_results_action.setEnabled(False)
+        self.save_scenario_action.setEnabled(False)
         self.graph_button.setEnabled(False)
     
     def handle_graph_window_close(self, event: QtGui.QCloseEvent) -> None:    
-        pg.PlotWidget.closeEvent(self.graph_window, event)
+        import_pyqtgraph().PlotWidget.closeEvent(self.graph_window, event)
         
         self.graph_window = None
+        self.graph_curve = None
+    
+    def handle_overlay_window_close(self, event: QtGui.QCloseEvent) -> None:
+        import_pyqtgraph().PlotWidget.closeEvent(self.overlay_window, event)
+        
+        self.overlay_window = None
+        self.overlay_curve = None
+        self.overlay = None
     
     def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        self.task_runner.cancel_all()
+        self.task_runner.wait()
+        
         if self.graph_window is not None:
             self.graph_window.close()
         
+        if self.overlay_window is not None:
+            self.overlay_window.close()
+        
+        if self.scenarios is not None:
+            self.scenarios.close()
+        
         return super().closeEvent(event)
         
         
@@ -753,6 +1292,181 @@ class ValueWidget(QtWidgets.QWidget):
         
     def set_label(self, label: str) -> None:
         self.label.setText(label)
+    
+    def set_suffix(self, suffix: str) -> None:
+        self.suffix = suffix
+        self.field.setSuffix(f" {suffix}")
         
     def tie_change_function(self, function: Any) -> None:
-        self.field.valueChanged.connect(function)
\ No newline at end of file
+        self.field.valueChanged.connect(function)
+
+
+class SweepDialog(QtWidgets.QDialog):
+    """
+    Asks for an input to sweep from the current inputs, the range and number of cycles and, for overlays, the diagram to overlay them on
+    """
+    def __init__(self, parent: QtWidgets.QWidget | None, inputs: list[tuple[str, str, float]], title: str = "Sweep Overlay", max_cycles: int = 100000, choose_diagram: bool = True) -> None:
+        super().__init__(parent)
+        
+        # (name, label, current value) of each input
+        self.inputs = inputs
+        
+        self.title = title
+        self.max_cycles = max_cycles
+        self.choose_diagram = choose_diagram
+        
+        self.setup_ui()
+        
+        self.handle_input_changed(self.input_combo_box.currentIndex())
+    
+    def setup_ui(self) -> None:
+        self.setWindowTitle(self.title)
+        
+        self.form_layout = QtWidgets.QFormLayout(self)
+        
+        self.input_combo_box = QtWidgets.QComboBox(self)
+        for name, label, _ in self.inputs:
+            self.input_combo_box.addItem(label, name)
+        
+        self.start_spin_box = QtWidgets.QDoubleSpinBox(self)
+        self.stop_spin_box = QtWidgets.QDoubleSpinBox(self)
+        for spin_box in (self.start_spin_box, self.stop_spin_box):
+            spin_box.setDecimals(4)
+            spin_box.setRange(-1e+21, 1e+21)
+        
+        self.cycles_spin_box = QtWidgets.QSpinBox(self)
+        self.cycles_spin_box.setRange(2, self.max_cycles)
+        self.cycles_spin_box.setValue(1000)
+        
+        self.diagram_combo_box = QtWidgets.QComboBox(self)
+        self.diagram_combo_box.addItem("Pressure-Volume (P-V)", "pv")
+        self.diagram_combo_box.addItem("Temperature-Entropy (T-s)", "ts")
+        
+        self.button_box = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.StandardButton.Ok | QtWidgets.QDialogButtonBox.StandardButton.Cancel, self)
+        
+        self.form_layout.addRow("Sweep", self.input_combo_box)
+        self.form_layout.addRow("From", self.start_spin_box)
+        self.form_layout.addRow("To", self.stop_spin_box)
+        self.form_layout.addRow("Cycles", self.cycles_spin_box)
+        if self.choose_diagram:
+            self.form_layout.addRow("Diagram", self.diagram_combo_box)
+        else:
+            self.diagram_combo_box.hide()
+        self.form_layout.addRow(self.button_box)
+        
+        self.input_combo_box.currentIndexChanged.connect(self.handle_input_changed)
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+    
+    def handle_input_changed(self, index: int) -> None:
+        # Default to ±25% around the current value
+        value = self.inputs[index][2]
+        self.start_spin_box.setValue(value * .75)
+        self.stop_spin_box.setValue(value * 1.25)
+    
+    def sweep(self) -> tuple[str, float, float, int]:
+        """
+        (input name, start, stop, cycles)
+        """
+        return (self.input_combo_box.currentData(), self.start_spin_box.value(), self.stop_spin_box.value(), self.cycles_spin_box.value())
+    
+    def diagram(self) -> str:
+        return self.diagram_combo_box.currentData()
+
+
+class ScenarioDialog(QtWidgets.QDialog):
+    """
+    Lists the saved scenarios, newest first and filtered by name, to pick one to load
+    """
+    # Only the newest matches are listed so the list fills instantly however large the library is
+    MAX_ROWS = 1000
+    
+    def __init__(self, parent: QtWidgets.QWidget | None, scenarios: ScenarioLibrary, units: UnitSystem) -> None:
+        super().__init__(parent)
+        
+        self.scenarios = scenarios
+        self.units = units
+        self.listed: list[Scenario] = []
+        
+        self.setup_ui()
+        
+        self.handle_search_changed("")
+    
+    def setup_ui(self) -> None:
+        self.setWindowTitle("Load Scenario")
+        self.resize(640, 420)
+        
+        self.vertical_layout = QtWidgets.QVBoxLayout(self)
+        
+        self.search_line_edit = QtWidgets.QLineEdit(self)
+        self.search_line_edit.setPlaceholderText("Search by name")
+        self.search_line_edit.setClearButtonEnabled(True)
+        
+        self.table = QtWidgets.QTableWidget(self)
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels([
+            "Name",
+            "Compression Ratio",
+            f"Operating Temperature ({self.units.temperature.symbol})",
+            "Thermal Efficiency (%)",
+            "Saved"
+        ])
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setStretchLastSection(True)
+        
+        self.button_box = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.StandardButton.Open | QtWidgets.QDialogButtonBox.StandardButton.Cancel, self)
+        self.delete_button = self.button_box.addButton("Delete", QtWidgets.QDialogButtonBox.ButtonRole.DestructiveRole)
+        
+        self.vertical_layout.addWidget(self.search_line_edit)
+        self.vertical_layout.addWidget(self.table)
+        self.vertical_layout.addWidget(self.button_box)
+        
+        self.search_line_edit.textChanged.connect(self.handle_search_changed)
+        self.table.itemSelectionChanged.connect(self.handle_selection_changed)
+        self.table.cellDoubleClicked.connect(lambda row, column: self.accept())
+        self.delete_button.clicked.connect(self.handle_delete_button)
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+    
+    def handle_search_changed(self, text: str) -> None:
+        self.listed = self.scenarios.query(name=text or None, limit=self.MAX_ROWS, units=self.units)
+        
+        self.table.setRowCount(len(self.listed))
+        for row, scenario in enumerate(self.listed):
+            saved = QtCore.QDateTime.fromSecsSinceEpoch(int(scenario.created)).toString("yyyy-MM-dd hh:mm")
+            for column, text in enumerate((
+                scenario.name,
+                f"{scenario.result.inputs.compression_ratio:.2f}",
+                f"{scenario.result.inputs.operating_temperature:.2f}",
+                f"{scenario.result.thermal_efficiency * 100:.2f}",
+                saved
+            )):
+                self.table.setItem(row, column, QtWidgets.QTableWidgetItem(text))
+        
+        if self.listed:
+            self.table.selectRow(0)
+        self.handle_selection_changed()
+    
+    def handle_selection_changed(self) -> None:
+        selected = self.scenario() is not None
+        self.button_box.button(QtWidgets.QDialogButtonBox.StandardButton.Open).setEnabled(selected)
+        self.delete_button.setEnabled(selected)
+    
+    def handle_delete_button(self) -> None:
+        scenario = self.scenario()
+        if scenario is None:
+            return
+        
+        self.scenarios.delete(scenario.id)
+        self.handle_search_changed(self.search_line_edit.text())
+    
+    def scenario(self) -> Scenario | None:
+        """
+        The selected scenario, None if nothing is selected
+        """
+        rows = self.table.selectionModel().selectedRows()
+        
+        return self.listed[rows[0].row()] if rows else None
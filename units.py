@@ -0,0 +1,168 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+
+
+# Exact definitions of the internal (US) units in SI
+_PASCALS_PER_PSF = 47.88025898033584
+_CUBIC_CENTIMETERS_PER_CUBIC_FOOT = 28316.846592
+_KILOGRAMS_PER_POUND = 0.45359237
+_KILOJOULES_PER_BTU = 1.05505585262
+_JOULES_PER_FOOT_POUND = 1.3558179483314004
+_KELVINS_PER_RANKINE = 5 / 9
+
+# The quantity of every cycle input and output, None for dimensionless values
+QUANTITIES: dict[str, str | None] = {
+    # Inputs
+    "compression_ratio": None,
+    "specific_heat_pressure": "specific_heat",
+    "specific_heat_volume": "specific_heat",
+    "gas_constant": "gas_constant",
+    "engine_displacement": "volume",
+    "initial_pressure": "pressure",
+    "initial_temperature": "temperature",
+    "operating_temperature": "temperature",
+
+    # Outputs
+    "adiabatic_index": None,
+    "initial_volume": "volume",
+    "air_mass": "mass",
+    "stage_1_final_pressure": "pressure",
+    "stage_1_final_temperature": "temperature",
+    "stage_1_final_volume": "volume",
+    "stage_1_work": "energy",
+    "stage_2_final_pressure": "pressure",
+    "stage_2_heat": "energy",
+    "stage_3_final_pressure": "pressure",
+    "stage_3_final_temperature": "temperature",
+    "stage_3_work": "energy",
+    "stage_4_heat": "energy",
+    "total_work": "energy",
+    "thermal_efficiency": None
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Unit:
+    """
+    A unit as an affine map onto the solver's internal unit for its quantity, internal = value * scale + offset
+    """
+    symbol: str
+    scale: float
+    offset: float = 0.0
+
+    def to_internal(self, value):
+        # Identity factors are skipped so they cost nothing on arrays
+        if self.offset == 0:
+            return value if self.scale == 1 else value * self.scale
+        return (value if self.scale == 1 else value * self.scale) + self.offset
+
+    def from_internal(self, value):
+        if self.offset == 0:
+            return value if self.scale == 1 else value / self.scale
+        return (value - self.offset) if self.scale == 1 else (value - self.offset) / self.scale
+
+
+@dataclass(frozen=True, slots=True)
+class UnitSystem:
+    """
+    The units the cycle's inputs are given in and its outputs returned in
+
+    The solver works internally in psf, °R, ft^3, lbm, Btu, Btu/lbm-°R and lbf-ft/lbm-°R. Each unit is a single precomputed affine map onto those, so inputs are normalized once on the way into a solve and outputs converted once on the way out
+    """
+    name: str
+    pressure: Unit
+    temperature: Unit
+    volume: Unit
+    mass: Unit
+    energy: Unit
+    specific_heat: Unit
+    gas_constant: Unit
+
+    # The unit of every input and output that needs converting, None where the unit is the internal one
+    _conversions: dict[str, Unit | None] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        conversions = {}
+        for name in QUANTITIES:
+            unit = self.unit(name)
+            conversions[name] = unit if unit is not None and (unit.scale != 1 or unit.offset != 0) else None
+
+        object.__setattr__(self, "_conversions", conversions)
+
+    def unit(self, name: str) -> Unit | None:
+        """
+        The unit of a cycle input or output, None if it is dimensionless
+        """
+        quantity = QUANTITIES[name]
+
+        return getattr(self, quantity) if quantity is not None else None
+
+    def symbol(self, name: str) -> str:
+        unit = self.unit(name)
+
+        return unit.symbol if unit is not None else ""
+
+    def to_internal(self, name: str, value):
+        unit = self._conversions[name]
+
+        return unit.to_internal(value) if unit is not None else value
+
+    def from_internal(self, name: str, value):
+        unit = self._conversions[name]
+
+        return unit.from_internal(value) if unit is not None else value
+
+    def values_to_internal(self, values: dict) -> dict:
+        conversions = self._conversions
+        converted = dict(values)
+        for name, value in values.items():
+            unit = conversions[name]
+            if unit is not None:
+                converted[name] = unit.to_internal(value)
+
+        return converted
+
+    def values_from_internal(self, values: dict) -> dict:
+        conversions = self._conversions
+        converted = dict(values)
+        for name, value in values.items():
+            unit = conversions[name]
+            if unit is not None:
+                converted[name] = unit.from_internal(value)
+
+        return converted
+
+
+def convert(name: str, value, from_units: UnitSystem, to_units: UnitSystem):
+    """
+    Convert a cycle input or output between unit systems
+    """
+    if from_units is to_units:
+        return value
+
+    return to_units.from_internal(name, from_units.to_internal(name, value))
+
+
+US = UnitSystem(
+    "US Customary",
+    pressure=Unit("psi", 144),
+    temperature=Unit("°F", 1, 459.67),
+    volume=Unit("in^3", 1 / 1728),
+    mass=Unit("lbm", 1),
+    energy=Unit("Btu", 1),
+    specific_heat=Unit("Btu/lb-°R", 1),
+    gas_constant=Unit("lbf-ft/lbm-°R", 1)
+)
+
+SI = UnitSystem(
+    "SI",
+    pressure=Unit("kPa", 1000 / _PASCALS_PER_PSF),
+    temperature=Unit("°C", 1 / _KELVINS_PER_RANKINE, 273.15 / _KELVINS_PER_RANKINE),
+    volume=Unit("cm^3", 1 / _CUBIC_CENTIMETERS_PER_CUBIC_FOOT),
+    mass=Unit("kg", 1 / _KILOGRAMS_PER_POUND),
+    energy=Unit("kJ", 1 / _KILOJOULES_PER_BTU),
+    specific_heat=Unit("kJ/kg-K", _KILOGRAMS_PER_POUND * _KELVINS_PER_RANKINE / _KILOJOULES_PER_BTU),
+    gas_constant=Unit("J/kg-K", _KILOGRAMS_PER_POUND * _KELVINS_PER_RANKINE / _JOULES_PER_FOOT_POUND)
+)
+
+UNIT_SYSTEMS: dict[str, UnitSystem] = {"us": US, "si": SI}